@@ -1,99 +1,537 @@
 import sqlite3
-from typing import Optional, Union
+import atexit
+import json
+import re
+from typing import Callable, Optional, Sequence, Union
 from tkinter import Tk, Label, Frame, Button, PhotoImage, \
-    StringVar, Toplevel, Canvas, Scrollbar, Entry, Checkbutton
+    StringVar, Toplevel, Canvas, Scrollbar, Entry, Checkbutton, OptionMenu
 from tkinter.constants import VERTICAL
 from tkinter.messagebox import askokcancel, showinfo, WARNING
-from random import sample
-from os.path import exists
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.figure import Figure
+from random import sample, randrange
+from os import environ, makedirs, listdir, remove, replace
+from os.path import exists, join, dirname, abspath, basename
+from hashlib import sha1
+from multiprocessing import cpu_count
+from concurrent.futures import ProcessPoolExecutor
+from threading import Lock, RLock, Thread, Timer, local
+from time import time, perf_counter
+from struct import Struct
+from bisect import bisect_left
+from functools import wraps
+from types import FunctionType
+import numpy as np
+
+
+class _Histogram:
+    """Amount of calls, their total time and amount of calls per latency bucket"""
+    __slots__ = ('count', 'sum', 'buckets')
+
+    # upper bounds of buckets in seconds, one more bucket after them is +Inf
+    BOUNDS: tuple[float, ...] = (
+        1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+        1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+    )
+
+    def __init__(self):
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.buckets: list[int] = [0] * (len(self.BOUNDS) + 1)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.sum += seconds
+        self.buckets[bisect_left(self.BOUNDS, seconds)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of bucket which contains q quantile"""
+        rank, total = q * self.count, 0
+        for bound, amount in zip(self.BOUNDS, self.buckets):
+            total += amount
+            if total >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """Opt-in instrumentation: call counts and latency histograms of hot paths and sql statements
+
+    enabled by WORDLE_METRICS environment variable with path of file to dump results to
+    (.prom file gets Prometheus text format, any other gets JSON), results are dumped on exit.
+    When variable isn't set, timed and timed_methods return functions and classes as they are,
+    so there is no overhead at all"""
+
+    # literals in sql, statements are grouped without them
+    SQL_LITERALS: re.Pattern = re.compile(r"[xX]?'(?:[^']|'')*'|\b-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+
+    def __init__(self, path: str):
+        self.path: str = path
+        self.__calls: dict[str, _Histogram] = {}  # function name: histogram
+        self.__sql: dict[str, _Histogram] = {}  # statement without literals: histogram
+        # calls are observed from timer and worker threads too
+        self.__lock: Lock = Lock()
+        # statement which is running in thread and its start time
+        self.__running: local = local()
+
+    def __observe(self, histograms: dict[str, _Histogram], name: str, seconds: float):
+        with self.__lock:
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = _Histogram()
+            histogram.observe(seconds)
+
+    def timed(self, func: Callable) -> Callable:
+        """Wrap func, so amount and latency of its calls are recorded"""
+        name = func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            t = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                end = perf_counter()
+                self.end_sql(end)
+                self.__observe(self.__calls, name, end - t)
+
+        return wrapper
+
+    def trace_sql(self, statement: str):
+        """Callback for sqlite3.Connection.set_trace_callback
+
+        it's called when statement starts, statement lasts until the next one starts
+        or until timed function which ran it returns"""
+        now = perf_counter()
+        self.end_sql(now)
+        self.__running.statement = statement
+        self.__running.start = now
+
+    def end_sql(self, now: Optional[float] = None):
+        """Record statement running in this thread as finished"""
+        statement = getattr(self.__running, 'statement', None)
+        if statement is None:
+            return
+
+        now = perf_counter() if now is None else now
+        self.__running.statement = None
+        name = ' '.join(self.SQL_LITERALS.sub('?', statement).split())
+        self.__observe(self.__sql, name, now - self.__running.start)
+
+    def to_dict(self) -> dict:
+        """Get results as dict: {"calls": {name: histogram}, "sql": {statement: histogram}}"""
+        def convert(histograms: dict[str, _Histogram]) -> dict:
+            result = {}
+            for name, h in sorted(histograms.items()):
+                result[name] = {
+                    'count': h.count, 'sum': h.sum, 'p50': h.quantile(0.5), 'p99': h.quantile(0.99),
+                    'buckets': {str(bound): amount for bound, amount in zip((*h.BOUNDS, '+Inf'), h.buckets)},
+                }
+            return result
+
+        with self.__lock:
+            return {'calls': convert(self.__calls), 'sql': convert(self.__sql)}
+
+    def to_prometheus(self) -> str:
+        """Get results in Prometheus text format, as cumulative histograms"""
+        def escape(value: str) -> str:
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        lines = []
+        with self.__lock:
+            for metric, label, histograms, help_text in (
+                ('wordle_call_seconds', 'name', self.__calls, 'Latency of instrumented calls'),
+                ('wordle_sql_seconds', 'statement', self.__sql, 'Latency of sql statements'),
+            ):
+                lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} histogram']
+                for name, h in sorted(histograms.items()):
+                    labels = f'{label}="{escape(name)}"'
+                    total = 0
+                    for bound, amount in zip((*h.BOUNDS, '+Inf'), h.buckets):
+                        total += amount
+                        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {total}')
+                    lines.append(f'{metric}_sum{{{labels}}} {h.sum}')
+                    lines.append(f'{metric}_count{{{labels}}} {h.count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def dump(self):
+        """Write results to file, format is chosen by its extension"""
+        if self.path.endswith('.prom'):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.to_dict(), indent=4, ensure_ascii=False)
+
+        # whole file or nothing, it may be read by scraper at any moment
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        replace(tmp, self.path)
+
+
+# opt-in instrumentation, None when disabled (see Metrics)
+METRICS: Optional[Metrics] = Metrics(environ['WORDLE_METRICS']) if environ.get('WORDLE_METRICS') else None
+if METRICS is not None:
+    atexit.register(METRICS.dump)
+
+
+def timed(func: Callable) -> Callable:
+    """Record amount and latency of calls of func if instrumentation is enabled, func is returned as is otherwise"""
+    return func if METRICS is None else METRICS.timed(func)
+
+
+def timed_methods(cls: type) -> type:
+    """timed for every method of class (except dunder ones), class is returned as is if instrumentation is disabled"""
+    if METRICS is None:
+        return cls
+
+    for name, value in list(vars(cls).items()):
+        if isinstance(value, FunctionType) and not (name.startswith('__') and name.endswith('__')):
+            setattr(cls, name, METRICS.timed(value))
+    return cls
 
 
+@timed_methods
 class DBHandler:
     """Create object with connection to db (sqlite3)"""
 
     # committing after every query so i can see how db changes in console
+    # (unless write-behind mode is on, then mutations are committed in batches)
     # errors cannot occur ... so fuck try except
-    def __init__(self, db_file: str):
-        """:param db_file: path to db file"""
+    def __init__(self, db_file: str, write_behind: bool = False, flush_interval: float = 0.05,
+                 synchronous: Optional[str] = None):
+        """params:
+            db_file - path to db file
+
+            write_behind - queue mutations and commit them in one transaction on timer,
+                on any read, on close and on interpreter shutdown; db is switched to WAL mode
+
+            flush_interval - seconds between first queued mutation and commit
+
+            synchronous - value for PRAGMA synchronous (OFF, NORMAL, FULL, EXTRA), left as is if not provided"""
         if not exists(db_file):
             raise sqlite3.Error("U lost y db lol")
 
-        self.__conn: sqlite3.Connection = sqlite3.connect(db_file)
+        # timer flushes from its own thread, so connection is shared and guarded by lock
+        self.__conn: sqlite3.Connection = sqlite3.connect(db_file, check_same_thread=False)
+        if METRICS is not None:
+            self.__conn.set_trace_callback(METRICS.trace_sql)
         self.__cur: sqlite3.Cursor = self.__conn.cursor()
-        self.__on_connect()
+        self.__lock: RLock = RLock()
+        self.__write_behind: bool = write_behind
+        self.__flush_interval: float = flush_interval
+        self.__pending: list[tuple[str, tuple]] = []  # queued mutations: (sql, params)
+        self.__timer: Optional[Timer] = None
+        # error of flush made by timer, nobody sees it there, so it's raised by the next flush
+        self.__flush_error: Optional[sqlite3.Error] = None
+        self.__closed: bool = False
+        self.__on_connect(synchronous)
 
         if not self.__check_db_init():
             self.__setup_empty_db()
 
-        # creates a list of callable funcs to change certain value
+        # win rate in whole percents, -1 if nothing is played, {0} is table name or NEW/OLD in triggers
+        win_rate = "CASE WHEN {0}.played = 0 THEN -1 ELSE {0}.games_won * 100 / {0}.played END"
+        distribution_cols = ['first_try', 'second_try', 'third_try', 'fourth_try', 'fifth_try', 'sixth_try']
+
+        # schema changes for dbs created by older versions, index is PRAGMA user_version after migration
+        self.__migrations: list[tuple[str, ...]] = [
+            (
+                "CREATE UNIQUE INDEX IF NOT EXISTS user_nick_name ON user (nick_name)",
+                "CREATE INDEX IF NOT EXISTS stats_user_id ON stats (user_id)",
+                "CREATE INDEX IF NOT EXISTS distribution_user_id ON distribution (user_id)",
+                "CREATE INDEX IF NOT EXISTS game_state_user_id ON game_state (user_id)",
+            ),
+            (
+                # binary snapshot of game, str columns are kept only to load games saved by older versions
+                "ALTER TABLE game_state ADD COLUMN state BLOB",
+            ),
+            (
+                # records of current game appended after each guess, see GameEngine.JOURNAL_* for format
+                "CREATE TABLE IF NOT EXISTS guess_journal (id INTEGER, user_id INTEGER, record BLOB, "
+                "PRIMARY KEY (id), FOREIGN KEY (user_id) REFERENCES user(id) ON DELETE CASCADE ON UPDATE NO ACTION)",
+                "CREATE INDEX IF NOT EXISTS guess_journal_user_id ON guess_journal (user_id)",
+            ),
+            (
+                # aggregates over all users, kept up to date by triggers in the same transaction
+                # as changes of stats and distribution, so comparing with others doesn't scan users
+                "CREATE TABLE IF NOT EXISTS win_rate_hist (bucket INTEGER, users INTEGER, PRIMARY KEY (bucket))",
+                "CREATE TABLE IF NOT EXISTS max_streak_hist (streak INTEGER, users INTEGER, PRIMARY KEY (streak))",
+                "CREATE TABLE IF NOT EXISTS global_distribution ("
+                + ", ".join(f"{col} INTEGER" for col in distribution_cols) + ")",
+                f"INSERT INTO win_rate_hist (bucket, users) SELECT {win_rate.format('stats')}, COUNT(*) "
+                "FROM stats GROUP BY 1",
+                "INSERT INTO max_streak_hist (streak, users) SELECT max_streak, COUNT(*) FROM stats GROUP BY 1",
+                "INSERT INTO global_distribution SELECT "
+                + ", ".join(f"COALESCE(SUM({col}), 0)" for col in distribution_cols) + " FROM distribution",
+                "CREATE TRIGGER IF NOT EXISTS stats_insert_aggregates AFTER INSERT ON stats BEGIN "
+                f"INSERT INTO win_rate_hist (bucket, users) VALUES ({win_rate.format('NEW')}, 1) "
+                "ON CONFLICT (bucket) DO UPDATE SET users = users + 1; "
+                "INSERT INTO max_streak_hist (streak, users) VALUES (NEW.max_streak, 1) "
+                "ON CONFLICT (streak) DO UPDATE SET users = users + 1; END",
+                "CREATE TRIGGER IF NOT EXISTS stats_delete_aggregates AFTER DELETE ON stats BEGIN "
+                f"UPDATE win_rate_hist SET users = users - 1 WHERE bucket = {win_rate.format('OLD')}; "
+                "UPDATE max_streak_hist SET users = users - 1 WHERE streak = OLD.max_streak; END",
+                "CREATE TRIGGER IF NOT EXISTS stats_update_win_rate AFTER UPDATE OF played, games_won ON stats "
+                f"WHEN {win_rate.format('OLD')} != {win_rate.format('NEW')} BEGIN "
+                f"UPDATE win_rate_hist SET users = users - 1 WHERE bucket = {win_rate.format('OLD')}; "
+                f"INSERT INTO win_rate_hist (bucket, users) VALUES ({win_rate.format('NEW')}, 1) "
+                "ON CONFLICT (bucket) DO UPDATE SET users = users + 1; END",
+                "CREATE TRIGGER IF NOT EXISTS stats_update_max_streak AFTER UPDATE OF max_streak ON stats "
+                "WHEN OLD.max_streak != NEW.max_streak BEGIN "
+                "UPDATE max_streak_hist SET users = users - 1 WHERE streak = OLD.max_streak; "
+                "INSERT INTO max_streak_hist (streak, users) VALUES (NEW.max_streak, 1) "
+                "ON CONFLICT (streak) DO UPDATE SET users = users + 1; END",
+                "CREATE TRIGGER IF NOT EXISTS distribution_insert_aggregates AFTER INSERT ON distribution BEGIN "
+                "UPDATE global_distribution SET "
+                + ", ".join(f"{col} = {col} + NEW.{col}" for col in distribution_cols) + "; END",
+                "CREATE TRIGGER IF NOT EXISTS distribution_delete_aggregates AFTER DELETE ON distribution BEGIN "
+                "UPDATE global_distribution SET "
+                + ", ".join(f"{col} = {col} - OLD.{col}" for col in distribution_cols) + "; END",
+                "CREATE TRIGGER IF NOT EXISTS distribution_update_aggregates AFTER UPDATE ON distribution BEGIN "
+                "UPDATE global_distribution SET "
+                + ", ".join(f"{col} = {col} + NEW.{col} - OLD.{col}" for col in distribution_cols) + "; END",
+            ),
+            (
+                # append-only history of finished games, stats and distribution can be rebuilt from it
+                "CREATE TABLE IF NOT EXISTS games (id INTEGER, user_id INTEGER, word TEXT, attempts INTEGER, "
+                "won INTEGER, played_at REAL, PRIMARY KEY (id), FOREIGN KEY (user_id) REFERENCES user(id) "
+                "ON DELETE CASCADE ON UPDATE NO ACTION)",
+                "CREATE INDEX IF NOT EXISTS games_user_id_played_at ON games (user_id, played_at)",
+            ),
+            (
+                # version is bumped by any change of words, checksum of compiled word list (see WordList)
+                # is stored for the version it was built from, so cache is validated without reading words
+                "CREATE TABLE IF NOT EXISTS words_meta (version INTEGER, checksum TEXT)",
+                "INSERT INTO words_meta (version, checksum) VALUES (0, NULL)",
+                "CREATE TRIGGER IF NOT EXISTS words_insert_meta AFTER INSERT ON words BEGIN "
+                "UPDATE words_meta SET version = version + 1, checksum = NULL; END",
+                "CREATE TRIGGER IF NOT EXISTS words_update_meta AFTER UPDATE ON words BEGIN "
+                "UPDATE words_meta SET version = version + 1, checksum = NULL; END",
+                "CREATE TRIGGER IF NOT EXISTS words_delete_meta AFTER DELETE ON words BEGIN "
+                "UPDATE words_meta SET version = version + 1, checksum = NULL; END",
+            ),
+            (
+                # state of WordScheduler of each user, checksum is of dictionary the permutation was made for
+                "CREATE TABLE IF NOT EXISTS word_schedule (user_id INTEGER, seed INTEGER, position INTEGER, "
+                "used BLOB, checksum TEXT, PRIMARY KEY (user_id), FOREIGN KEY (user_id) REFERENCES user(id) "
+                "ON DELETE CASCADE ON UPDATE NO ACTION)",
+            ),
+            (
+                # word packs: each one has its own alphabet, word length, amount of attempts and keyboard layout
+                # (rows separated by |). Words table becomes the first pack, version and checksum of compiled
+                # word list move from words_meta to packs
+                "CREATE TABLE IF NOT EXISTS packs (id INTEGER, name TEXT NOT NULL, alphabet TEXT, length INTEGER, "
+                "attempts INTEGER, layout TEXT, version INTEGER DEFAULT 0, checksum TEXT, PRIMARY KEY (id))",
+                "CREATE UNIQUE INDEX IF NOT EXISTS packs_name ON packs (name)",
+                "CREATE TABLE IF NOT EXISTS pack_words (pack_id INTEGER, word TEXT, FOREIGN KEY (pack_id) "
+                "REFERENCES packs(id) ON DELETE CASCADE ON UPDATE NO ACTION)",
+                "CREATE INDEX IF NOT EXISTS pack_words_pack_id ON pack_words (pack_id)",
+                "INSERT INTO packs (id, name, alphabet, length, attempts, layout) VALUES (1, 'Русский, 5 букв', "
+                "'абвгдеёжзийклмнопрстуфхцчшщъыьэюя', 5, 6, 'йцукенгшщзхъ|фывапролджэё|ячсмитьбю')",
+                "INSERT INTO pack_words (pack_id, word) SELECT 1, word FROM words",
+                "CREATE TRIGGER IF NOT EXISTS pack_words_insert_meta AFTER INSERT ON pack_words BEGIN "
+                "UPDATE packs SET version = version + 1, checksum = NULL WHERE id = NEW.pack_id; END",
+                "CREATE TRIGGER IF NOT EXISTS pack_words_update_meta AFTER UPDATE ON pack_words BEGIN "
+                "UPDATE packs SET version = version + 1, checksum = NULL WHERE id IN (OLD.pack_id, NEW.pack_id); END",
+                "CREATE TRIGGER IF NOT EXISTS pack_words_delete_meta AFTER DELETE ON pack_words BEGIN "
+                "UPDATE packs SET version = version + 1, checksum = NULL WHERE id = OLD.pack_id; END",
+                "DROP TRIGGER IF EXISTS words_insert_meta",
+                "DROP TRIGGER IF EXISTS words_update_meta",
+                "DROP TRIGGER IF EXISTS words_delete_meta",
+                "DROP TABLE IF EXISTS words_meta",
+                "CREATE TABLE IF NOT EXISTS current_pack (pack_id INTEGER)",
+                "INSERT INTO current_pack (pack_id) VALUES (1)",
+                # each pack has its own saved game, since it can be restored only with alphabet it was saved with
+                "ALTER TABLE game_state ADD COLUMN pack_id INTEGER DEFAULT 1",
+                "CREATE UNIQUE INDEX IF NOT EXISTS game_state_user_id_pack_id ON game_state (user_id, pack_id)",
+                "ALTER TABLE guess_journal ADD COLUMN pack_id INTEGER DEFAULT 1",
+                # each pack has its own schedule, existing ones were made for words table, which is the first pack
+                "ALTER TABLE word_schedule RENAME TO word_schedule_old",
+                "CREATE TABLE word_schedule (user_id INTEGER, pack_id INTEGER, seed INTEGER, position INTEGER, "
+                "used BLOB, checksum TEXT, PRIMARY KEY (user_id, pack_id), FOREIGN KEY (user_id) REFERENCES user(id) "
+                "ON DELETE CASCADE ON UPDATE NO ACTION)",
+                "INSERT INTO word_schedule (user_id, pack_id, seed, position, used, checksum) "
+                "SELECT user_id, 1, seed, position, used, checksum FROM word_schedule_old",
+                "DROP TABLE word_schedule_old",
+            ),
+            (
+                # games of server sessions evicted from memory, they are not save slots of profiles,
+                # so uniqueness of (user, pack) is only for rows without session.
+                # servers of different packs number their sessions independently
+                "ALTER TABLE game_state ADD COLUMN session_id INTEGER",
+                "DROP INDEX IF EXISTS game_state_user_id_pack_id",
+                "CREATE UNIQUE INDEX IF NOT EXISTS game_state_user_id_pack_id ON game_state (user_id, pack_id) "
+                "WHERE session_id IS NULL",
+                "CREATE UNIQUE INDEX IF NOT EXISTS game_state_pack_id_session_id ON game_state (pack_id, session_id) "
+                "WHERE session_id IS NOT NULL",
+            ),
+            (
+                # hard mode option, single row like autosave: every guess must use all revealed hints
+                "CREATE TABLE IF NOT EXISTS hard_mode (activated INTEGER)",
+                "INSERT INTO hard_mode (activated) VALUES (0)",
+            ),
+            (
+                # the biggest session id given out by server of each pack, so ids of games which were finished
+                # in memory aren't given again after restart. It starts after already spilled sessions
+                "CREATE TABLE IF NOT EXISTS server_sessions (pack_id INTEGER PRIMARY KEY, last_id INTEGER NOT NULL)",
+                "INSERT INTO server_sessions (pack_id, last_id) SELECT pack_id, MAX(session_id) FROM game_state "
+                "WHERE session_id IS NOT NULL GROUP BY pack_id",
+            ),
+            (
+                # time of the last spill of server session, sessions abandoned by players are deleted by it.
+                # already spilled ones are counted from now
+                "ALTER TABLE game_state ADD COLUMN spilled_at REAL",
+                "UPDATE game_state SET spilled_at = CAST(strftime('%s', 'now') AS REAL) WHERE session_id IS NOT NULL",
+            ),
+        ]
+        self.__upgrade_db()
+
+        # almost every query is about current user, so its id is kept here
+        # and changed only by set_current_user, unset_current_user and delete_user
+        self.__current_id: Optional[int] = None
+        self.__load_current_id()
+
+        if write_behind:
+            # queued mutations must not be lost if app is closed without close()
+            atexit.register(self.close)
+
+        # creates a list of statements to change certain value
         # in distribution table
         # d is dict for interpreting numbers to column names
         self.__d: dict = {
             1: 'first', 2: 'second', 3: 'third',
             4: 'fourth', 5: 'fifth', 6: 'sixth',
         }
-        self.__func_arr: list = [
-            lambda i=i: self.__cur.execute(
-                f"UPDATE distribution SET {self.__d[i]}_try = {self.__d[i]}_try + 1 "
-                f"WHERE user_id = (SELECT id FROM user WHERE is_current = 1)"
-            ) for i in range(1, 7)
+        self.__func_arr: list[str] = [
+            f"UPDATE distribution SET {self.__d[i]}_try = {self.__d[i]}_try + 1 "
+            f"WHERE user_id = ?" for i in range(1, 7)
         ]
 
+    def __read(self, sql: str, params: tuple = ()) -> list[tuple]:
+        """Execute query and fetch all rows, queued mutations are committed first"""
+        with self.__lock:
+            self.flush()
+            self.__cur.execute(sql, params)
+            return self.__cur.fetchall()
+
+    def __write(self, *statements: tuple[str, tuple]):
+        """Execute mutations (sql, params) in one transaction, or queue them in write-behind mode"""
+        with self.__lock:
+            if not self.__write_behind:
+                for sql, params in statements:
+                    self.__cur.execute(sql, params)
+                self.__conn.commit()
+                return
+
+            self.__pending.extend(statements)
+            if self.__timer is None:
+                self.__timer = Timer(self.__flush_interval, self.__background_flush)
+                self.__timer.daemon = True
+                self.__timer.start()
+
+    def flush(self):
+        """Commit all queued mutations in one transaction
+
+        if any of them fails, none is committed. Mutations are queued again if db was locked or busy
+        (sqlite3.OperationalError), otherwise they are dropped, since they would fail again.
+
+        raises:
+            sqlite3.Error - mutations failed, now or in background flush made by timer"""
+        with self.__lock:
+            if self.__timer is not None:
+                self.__timer.cancel()
+                self.__timer = None
+
+            error, self.__flush_error = self.__flush_error, None
+            if self.__pending and not self.__closed:
+                pending, self.__pending = self.__pending, []
+                try:
+                    for sql, params in pending:
+                        self.__cur.execute(sql, params)
+                    self.__conn.commit()
+                except sqlite3.Error as e:
+                    # executed part of the group must not be committed by the next flush
+                    self.__conn.rollback()
+                    if isinstance(e, sqlite3.OperationalError):
+                        self.__pending[:0] = pending
+                    raise
+
+            if error is not None:
+                raise error
+
+    def __background_flush(self):
+        with self.__lock:
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                self.__flush_error = e
+
     # asd
     def __check_db_init(self) -> bool:
         """Checks if db is initialized"""
-        self.__cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='user'")
-        arr = self.__cur.fetchall()
+        arr = self.__read("SELECT name FROM sqlite_master WHERE type='table' AND name='user'")
 
         return True if arr else False
 
     def __setup_empty_db(self):
         """Setups empty tables in db (except table with words)"""
-        self.__cur.execute(
-            "CREATE TABLE IF NOT EXISTS user (id INTEGER, nick_name TEXT NOT NULL, "
-            "is_current INTEGER, PRIMARY KEY (id))"
-        )
-        self.__cur.execute(
-            "CREATE TABLE IF NOT EXISTS stats (user_id INTEGER, played INTEGER, games_won INTEGER,"
-            "games_lost INTEGER, current_streak INTEGER, max_streak INTEGER, FOREIGN KEY (user_id) "
-            "REFERENCES user(id) ON DELETE CASCADE ON UPDATE NO ACTION)"
-        )
-        self.__cur.execute(
-            "CREATE TABLE IF NOT EXISTS distribution (user_id INTEGER, first_try INTEGER, second_try INTEGER,"
-            "third_try INTEGER, fourth_try INTEGER, fifth_try INTEGER, sixth_try INTEGER, FOREIGN KEY (user_id) "
-            "REFERENCES user(id) ON DELETE CASCADE ON UPDATE NO ACTION)"
-        )
-        self.__cur.execute(
-            "CREATE TABLE IF NOT EXISTS game_state (user_id INTEGER,k_state_string TEXT, "
-            "l_state_string TEXT, word TEXT, FOREIGN KEY (user_id) REFERENCES user(id) "
-            "ON DELETE CASCADE ON UPDATE NO ACTION)"
-        )
-
-        self.__cur.execute("CREATE TABLE IF NOT EXISTS autosave (activated INTEGER)")
-        self.__cur.execute("INSERT INTO autosave (activated) VALUES (0)")
-        self.__cur.execute(
-            "CREATE VIEW get_user AS SELECT u.nick_name, u.is_current, s.played, s.games_won, s.games_lost, "
-            "s.current_streak, s.max_streak,d.first_try, d.second_try, d.third_try, d.fourth_try, d.fifth_try, "
-            "d.sixth_try FROM user u LEFT JOIN stats s on u.id = s.user_id LEFT JOIN distribution d on u.id = d.user_id"
+        self.__write(
+            ("CREATE TABLE IF NOT EXISTS user (id INTEGER, nick_name TEXT NOT NULL, "
+             "is_current INTEGER, PRIMARY KEY (id))", ()),
+            ("CREATE TABLE IF NOT EXISTS stats (user_id INTEGER, played INTEGER, games_won INTEGER,"
+             "games_lost INTEGER, current_streak INTEGER, max_streak INTEGER, FOREIGN KEY (user_id) "
+             "REFERENCES user(id) ON DELETE CASCADE ON UPDATE NO ACTION)", ()),
+            ("CREATE TABLE IF NOT EXISTS distribution (user_id INTEGER, first_try INTEGER, second_try INTEGER,"
+             "third_try INTEGER, fourth_try INTEGER, fifth_try INTEGER, sixth_try INTEGER, FOREIGN KEY (user_id) "
+             "REFERENCES user(id) ON DELETE CASCADE ON UPDATE NO ACTION)", ()),
+            ("CREATE TABLE IF NOT EXISTS game_state (user_id INTEGER,k_state_string TEXT, "
+             "l_state_string TEXT, word TEXT, FOREIGN KEY (user_id) REFERENCES user(id) "
+             "ON DELETE CASCADE ON UPDATE NO ACTION)", ()),
+            ("CREATE TABLE IF NOT EXISTS autosave (activated INTEGER)", ()),
+            ("INSERT INTO autosave (activated) VALUES (0)", ()),
+            ("CREATE VIEW get_user AS SELECT u.nick_name, u.is_current, s.played, s.games_won, s.games_lost, "
+             "s.current_streak, s.max_streak,d.first_try, d.second_try, d.third_try, d.fourth_try, d.fifth_try, "
+             "d.sixth_try FROM user u LEFT JOIN stats s on u.id = s.user_id LEFT JOIN distribution d on "
+             "u.id = d.user_id", ()),
         )
-        self.__conn.commit()
-
-    def __on_connect(self):
-        """Toggle on foreign keys in db"""
+        self.flush()
+
+    def __upgrade_db(self):
+        """Apply migrations which were not applied to db yet"""
+        version = self.__read("PRAGMA user_version")[0][0]
+        for i in range(version, len(self.__migrations)):
+            self.__write(*[(sql, ()) for sql in self.__migrations[i]], (f"PRAGMA user_version = {i + 1}", ()))
+        self.flush()
+
+    def __load_current_id(self):
+        arr = self.__read("SELECT id FROM user WHERE is_current = 1")
+        self.__current_id = arr[0][0] if arr else None
+
+    @property
+    def current_id(self) -> Optional[int]:
+        """Id of current user, None if there is no current user"""
+        return self.__current_id
+
+    def __on_connect(self, synchronous: Optional[str]):
+        """Toggle on foreign keys in db, set journal mode and synchronous"""
         self.__cur.execute("PRAGMA foreign_keys = ON")
+        if self.__write_behind:
+            # readers don't block writer and commit doesn't rewrite db file
+            self.__cur.execute("PRAGMA journal_mode = WAL")
+
+        if synchronous is not None:
+            if synchronous.upper() not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+                raise ValueError(f"Wrong synchronous value: {synchronous}")
+            self.__cur.execute(f"PRAGMA synchronous = {synchronous.upper()}")
         self.__conn.commit()
 
     def unset_current_user(self, nick_name):
         """Unset current user in db"""
-        self.__cur.execute("UPDATE user set is_current = 0 WHERE nick_name =?", (nick_name,))
-        self.__conn.commit()
+        self.__write(("UPDATE user set is_current = 0 WHERE nick_name =?", (nick_name,)))
+        self.__current_id = None
 
     def get_current_user_nick(self) -> str:
         """Get current user nick"""
-        self.__cur.execute("SELECT nick_name FROM user WHERE is_current = 1")
-        tarr = self.__cur.fetchall()
+        tarr = self.__read("SELECT nick_name FROM user WHERE id = ?", (self.__current_id,))
         if tarr:
             return tarr[0][0]
         else:
@@ -101,28 +539,69 @@ class DBHandler:
 
     def get_current_user(self) -> tuple:
         """Get all stuff for statistics window"""
-        self.__cur.execute("SELECT * FROM get_user WHERE is_current = 1")
-        tarr = self.__cur.fetchall()
+        # same columns as get_user view, but looked up by primary key
+        tarr = self.__read(
+            "SELECT u.nick_name, u.is_current, s.played, s.games_won, s.games_lost, s.current_streak, "
+            "s.max_streak, d.first_try, d.second_try, d.third_try, d.fourth_try, d.fifth_try, d.sixth_try "
+            "FROM user u LEFT JOIN stats s on u.id = s.user_id LEFT JOIN distribution d on u.id = d.user_id "
+            "WHERE u.id = ?", (self.__current_id,)
+        )
         if tarr:
             return tarr[0]
         else:
             return ()
 
+    def get_comparison(self) -> tuple:
+        """Compare current user with all users
+
+        only aggregate tables are read, so it takes the same time for any amount of users
+
+        return:
+            tuple with 5 elements, empty if there is no current user:
+                1 - amount of users who played and have lower win rate
+
+                2 - amount of users who played (current one included)
+
+                3 - place by max streak, 1 + amount of users with bigger max streak
+
+                4 - amount of users
+
+                5 - tuple with global distribution, same order as in distribution table"""
+        tarr = self.__read(
+            "SELECT (SELECT COALESCE(SUM(users), 0) FROM win_rate_hist WHERE bucket >= 0 AND bucket < s.rate), "
+            "(SELECT COALESCE(SUM(users), 0) FROM win_rate_hist WHERE bucket >= 0), "
+            "(SELECT COALESCE(SUM(users), 0) FROM max_streak_hist WHERE streak > s.max_streak) + 1, "
+            "(SELECT COALESCE(SUM(users), 0) FROM max_streak_hist) "
+            "FROM (SELECT CASE WHEN played = 0 THEN -1 ELSE games_won * 100 / played END AS rate, max_streak "
+            "FROM stats WHERE user_id = ?) s", (self.__current_id,)
+        )
+        if not tarr:
+            return ()
+
+        distribution = self.__read("SELECT * FROM global_distribution")
+        return *tarr[0], distribution[0]
+
     def set_current_user(self, username: str):
         """Set user with provided username to be current in db"""
-        self.__cur.execute("UPDATE user SET is_current = 1 WHERE nick_name = ?", (username,))
-        self.__conn.commit()
+        self.__write(("UPDATE user SET is_current = 1 WHERE nick_name = ?", (username,)))
+        # by unique index on nick_name instead of scanning users for is_current
+        self.__current_id = self.get_user_id(username)
 
     def user_exists(self, username: str) -> bool:
         """Check if user with provided username exists in db"""
-        self.__cur.execute("SELECT nick_name FROM user WHERE nick_name = ?", (username,))
-        arr = self.__cur.fetchall()
+        arr = self.__read("SELECT nick_name FROM user WHERE nick_name = ?", (username,))
         return True if arr else False
 
+    def get_user_id(self, username: str) -> Optional[int]:
+        """Get id of user with provided username, None if there is no such user"""
+        arr = self.__read("SELECT id FROM user WHERE nick_name = ?", (username,))
+        return arr[0][0] if arr else None
+
     def delete_user(self, username):
         """Delete user with provided username from db"""
-        self.__cur.execute("DELETE FROM user WHERE nick_name = ?", (username,))
-        self.__conn.commit()
+        if self.__current_id is not None and self.get_user_id(username) == self.__current_id:
+            self.__current_id = None
+        self.__write(("DELETE FROM user WHERE nick_name = ?", (username,)))
 
     def add_user(self, username) -> bool:
         """Add user with provided username to db
@@ -133,20 +612,15 @@ class DBHandler:
         if self.user_exists(username):
             return False
 
-        self.__cur.execute("INSERT INTO user (nick_name, is_current) VALUES (?, 0)", (username,))
-        self.__cur.execute(
-            "INSERT INTO stats(user_id, played, games_won, games_lost, current_streak, max_streak)"
-            "VALUES (last_insert_rowid(), 0, 0, 0, 0, 0)"
-        )
-        self.__cur.execute(
-            "INSERT INTO distribution(user_id, first_try, second_try, third_try, fourth_try, fifth_try, sixth_try)"
-            "VALUES (last_insert_rowid(), 0, 0, 0, 0, 0, 0)"
-        )
-        self.__cur.execute(
-            'INSERT INTO game_state (user_id, k_state_string, l_state_string, word) '
-            'VALUES (last_insert_rowid(), "", "", "")'
+        self.__write(
+            ("INSERT INTO user (nick_name, is_current) VALUES (?, 0)", (username,)),
+            ("INSERT INTO stats(user_id, played, games_won, games_lost, current_streak, max_streak)"
+             "VALUES (last_insert_rowid(), 0, 0, 0, 0, 0)", ()),
+            ("INSERT INTO distribution(user_id, first_try, second_try, third_try, fourth_try, fifth_try, sixth_try)"
+             "VALUES (last_insert_rowid(), 0, 0, 0, 0, 0, 0)", ()),
+            ('INSERT INTO game_state (user_id, k_state_string, l_state_string, word) '
+             'VALUES (last_insert_rowid(), "", "", "")', ()),
         )
-        self.__conn.commit()
         return True
 
     def get_users(self) -> list[tuple]:
@@ -154,119 +628,1735 @@ class DBHandler:
 
         return:
             list with tuples, each represents distinct user"""
-        self.__cur.execute("SELECT * FROM user")
-
-        arr = self.__cur.fetchall()
+        arr = self.__read("SELECT * FROM user")
         return arr
 
-    def get_words(self) -> list[str]:
-        """Get all words from db
+    @staticmethod
+    def __prefix_range(prefix: str) -> tuple[str, tuple]:
+        """Get condition and params selecting nick names which start with prefix
+
+        range on nick_name instead of LIKE, so the unique index on it is used"""
+        if not prefix:
+            return "1", ()
+
+        # first string which is greater than every string starting with prefix
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        return "nick_name >= ? AND nick_name < ?", (prefix, upper)
+
+    def count_users(self, prefix: str = '') -> int:
+        """Get amount of users whose nick names start with prefix"""
+        cond, params = self.__prefix_range(prefix)
+        arr = self.__read(f"SELECT COUNT(*) FROM user WHERE {cond}", params)
+        return arr[0][0]
+
+    def get_users_page(self, prefix: str = '', after: Optional[str] = None, before: Optional[str] = None,
+                       offset: int = 0, limit: int = 50) -> list[str]:
+        """Get page of nick names in alphabetical order
+
+        params:
+            prefix - only nick names starting with it
+
+            after - page starts right after this nick name (keyset pagination)
+
+            before - page ends right before this nick name
+
+            offset - amount of nick names to skip, used only to jump to page
+                when neither of its neighbours is known
+
+            limit - page size
+
+        return:
+            list with nick names"""
+        cond, params = self.__prefix_range(prefix)
+        if after is not None:
+            cond, params = f"{cond} AND nick_name > ?", params + (after,)
+            offset = 0
+        elif before is not None:
+            # walking index backwards and reversing the page
+            arr = self.__read(
+                f"SELECT nick_name FROM user WHERE {cond} AND nick_name < ? ORDER BY nick_name DESC LIMIT ?",
+                params + (before, limit)
+            )
+            return [item[0] for item in reversed(arr)]
+
+        arr = self.__read(
+            f"SELECT nick_name FROM user WHERE {cond} ORDER BY nick_name LIMIT ? OFFSET ?", params + (limit, offset)
+        )
+        return [item[0] for item in arr]
+
+    def get_words(self, pack_id: int = 1) -> list[str]:
+        """Get all words of word pack from db
 
         return:
             list with words"""
-        self.__cur.execute("SELECT * FROM words")
+        arr = [item[0] for item in self.__read("SELECT word FROM pack_words WHERE pack_id = ?", (pack_id,))]
+        return arr
+
+    def get_words_meta(self, pack_id: int = 1) -> tuple[int, Optional[str]]:
+        """Get version of word pack and checksum of word list compiled from it
+
+        return:
+            tuple with 2 elements:
+                1 - version, changes with any change of words
+
+                2 - checksum, None if word list wasn't compiled for this version"""
+        arr = self.__read("SELECT version, checksum FROM packs WHERE id = ?", (pack_id,))
+        return arr[0]
 
-        arr = [item[0] for item in self.__cur.fetchall()]
+    def set_words_checksum(self, version: int, checksum: str, pack_id: int = 1):
+        """Save checksum of word list compiled from provided version of word pack
+
+        nothing is saved if words were changed since that version"""
+        self.__write(("UPDATE packs SET checksum = ? WHERE id = ? AND version = ?", (checksum, pack_id, version)))
+
+    def get_packs(self) -> list[tuple]:
+        """Get all word packs from db
+
+        return:
+            list with tuples (id, name, alphabet, length, attempts, layout)"""
+        arr = self.__read("SELECT id, name, alphabet, length, attempts, layout FROM packs ORDER BY id")
         return arr
 
+    def get_pack(self, pack_id: int) -> tuple:
+        """Get word pack with provided id
+
+        return:
+            tuple (id, name, alphabet, length, attempts, layout), empty if there is no such pack"""
+        arr = self.__read("SELECT id, name, alphabet, length, attempts, layout FROM packs WHERE id = ?", (pack_id,))
+        return arr[0] if arr else ()
+
+    def add_pack(self, name: str, alphabet: str, length: int, attempts: int, layout: str,
+                 words: list[str]) -> Optional[int]:
+        """Add word pack to db
+
+        params:
+            name - name shown in settings
+
+            alphabet - all letters of pack in alphabetical order
+
+            length - letters in word, words of other length are skipped
+
+            attempts - amount of attempts, from 1 to 6 (distribution table has 6 columns)
+
+            layout - keyboard rows separated by |, each letter of alphabet exactly once. Rows are typed
+                with keys at the same positions of english keyboard, so there are no more and no longer rows
+                than it has
+
+            words - words of pack
+
+        return:
+            id of added pack, None if pack with such name already exists"""
+        if not 1 <= attempts <= 6:
+            raise ValueError(f"Wrong amount of attempts: {attempts}")
+
+        # every letter must have its button and nothing else
+        if sorted(layout.replace('|', '')) != sorted(alphabet):
+            raise ValueError("Layout doesn't match alphabet")
+
+        # letters out of english keyboard couldn't be typed
+        rows = layout.split('|')
+        if len(rows) > len(_Wordle.ENG_KEYBOARD) or any(
+                len(row) > len(eng_row) for row, eng_row in zip(rows, _Wordle.ENG_KEYBOARD)):
+            raise ValueError("Layout doesn't fit english keyboard")
+
+        words = [word.lower() for word in words if len(word) == length]
+        if not words:
+            raise ValueError(f"No words of length {length}")
+
+        if self.__read("SELECT id FROM packs WHERE name = ?", (name,)):
+            return None
+
+        pack_id = self.__read("SELECT COALESCE(MAX(id), 0) + 1 FROM packs")[0][0]
+        self.__write(
+            ("INSERT INTO packs (id, name, alphabet, length, attempts, layout) VALUES (?, ?, ?, ?, ?, ?)",
+             (pack_id, name, alphabet, length, attempts, layout)),
+            *[("INSERT INTO pack_words (pack_id, word) VALUES (?, ?)", (pack_id, word)) for word in words],
+        )
+        return pack_id
+
+    def get_current_pack(self) -> int:
+        """Get id of selected word pack"""
+        arr = self.__read("SELECT pack_id FROM current_pack")
+        return arr[0][0]
+
+    def set_current_pack(self, pack_id: int):
+        """Select word pack"""
+        self.__write(("UPDATE current_pack SET pack_id = ?", (pack_id,)))
+
     def get_autosave_opt(self) -> int:
         """Get autosave option from db
 
         returns:
             1 = on, 0 = off"""
-        self.__cur.execute("SELECT * FROM autosave")
-        arr = self.__cur.fetchall()
+        arr = self.__read("SELECT * FROM autosave")
+
+        return arr[0][0]
+
+    def switch_autosave(self):
+        """Switch autosave option in db"""
+        self.__write(("UPDATE autosave SET activated = not activated", ()))
+
+    def get_hard_mode_opt(self) -> int:
+        """Get hard mode option from db
+
+        returns:
+            1 = on, 0 = off"""
+        arr = self.__read("SELECT activated FROM hard_mode")
+
+        return arr[0][0]
+
+    def switch_hard_mode(self):
+        """Switch hard mode option in db"""
+        self.__write(("UPDATE hard_mode SET activated = not activated", ()))
+
+    def add_loss(self, word: str = '', attempts: int = 6, user_id: Optional[int] = None):
+        """Add loss to current user in db
+
+        params:
+            word - word which was guessed, saved to games history
+
+            attempts - amount of tries made
+
+            user_id - user to add loss to instead of current one"""
+        user_id = self.__current_id if user_id is None else user_id
+        # games without profile are not counted anywhere
+        if user_id is None:
+            return
+
+        self.__write(
+            ("UPDATE stats SET played = played + 1, games_lost = games_lost + 1, current_streak = 0 "
+             "WHERE user_id = ?", (user_id,)),
+            ("INSERT INTO games (user_id, word, attempts, won, played_at) VALUES (?, ?, ?, 0, ?)",
+             (user_id, word, attempts, time())),
+        )
+
+    def add_win(self, cur_row: int, word: str = '', user_id: Optional[int] = None):
+        """Add win to current user in db
+
+        params:
+            cur_row - current row when game was finished
+
+            word - word which was guessed, saved to games history
+
+            user_id - user to add win to instead of current one"""
+        user_id = self.__current_id if user_id is None else user_id
+        # games without profile are not counted anywhere
+        if user_id is None:
+            return
+
+        self.__write(
+            ("UPDATE stats SET played = played + 1, games_won = games_won + 1, current_streak = current_streak + 1, "
+             "max_streak = MAX(current_streak + 1, max_streak) WHERE user_id = ?", (user_id,)),
+            (self.__func_arr[cur_row - 1], (user_id,)),
+            ("INSERT INTO games (user_id, word, attempts, won, played_at) VALUES (?, ?, ?, 1, ?)",
+             (user_id, word, cur_row, time())),
+        )
+
+    def get_games(self, start: float = 0, end: float = float('inf')) -> list[tuple]:
+        """Get finished games of current user played in time range, oldest first
+
+        params:
+            start, end - unix time, range includes start and excludes end
+
+        return:
+            list with tuples (word, attempts, won, played_at)"""
+        arr = self.__read(
+            "SELECT word, attempts, won, played_at FROM games WHERE user_id = ? AND played_at >= ? AND played_at < ? "
+            "ORDER BY played_at, id", (self.__current_id, start, end)
+        )
+        return arr
+
+    def rebuild_stats(self, chunk: int = 10_000) -> int:
+        """Recompute stats and distribution of users from games history
+
+        only users which have games in history are rebuilt, stats of the others are kept as they are.
+        games are streamed in (user, time) order by chunks, so memory doesn't depend on amount of games,
+        everything is replaced in one transaction. Wins and losses from before games history existed are lost
+
+        params:
+            chunk - amount of games fetched and written at once
+
+        return:
+            amount of processed games"""
+        stats_sql = ("UPDATE stats SET played = ?, games_won = ?, games_lost = ?, current_streak = ?, max_streak = ? "
+                     "WHERE user_id = ?")
+        distribution_sql = ("UPDATE distribution SET first_try = ?, second_try = ?, third_try = ?, fourth_try = ?, "
+                            "fifth_try = ?, sixth_try = ? WHERE user_id = ?")
+
+        with self.__lock:
+            self.flush()
+            try:
+                # separate cursor, since the main one writes while games are read
+                reader = self.__conn.cursor()
+                reader.execute(
+                    "SELECT user_id, attempts, won FROM games WHERE user_id IS NOT NULL ORDER BY user_id, played_at, id"
+                )
+
+                total = 0
+                user, s, d = None, [], []  # s - played, won, lost, current and max streak, d - distribution
+                stats, distribution = [], []
+                while rows := reader.fetchmany(chunk):
+                    for user_id, attempts, won in rows:
+                        if user_id != user:
+                            if user is not None:
+                                stats.append((*s, user))
+                                distribution.append((*d, user))
+                            user, s, d = user_id, [0, 0, 0, 0, 0], [0] * 6
+
+                        s[0] += 1
+                        if won:
+                            s[1] += 1
+                            s[3] += 1
+                            s[4] = max(s[3], s[4])
+                            d[attempts - 1] += 1
+                        else:
+                            s[2] += 1
+                            s[3] = 0
+
+                    total += len(rows)
+                    self.__cur.executemany(stats_sql, stats)
+                    self.__cur.executemany(distribution_sql, distribution)
+                    stats.clear()
+                    distribution.clear()
+
+                if user is not None:
+                    self.__cur.execute(stats_sql, (*s, user))
+                    self.__cur.execute(distribution_sql, (*d, user))
+                self.__conn.commit()
+            except BaseException:
+                # partly rebuilt stats must not be committed by the next write
+                self.__conn.rollback()
+                raise
+
+        return total
+
+    def save_state(self, state: bytes):
+        """Save binary snapshot of current game of selected pack to db (see GameEngine.snapshot)
+
+        guess journal is compacted into this snapshot, so it's cleared"""
+        if self.__current_id is None:
+            return
+
+        self.__write(
+            ("INSERT INTO game_state (user_id, k_state_string, l_state_string, word, state, pack_id) "
+             "VALUES (?, '', '', '', ?, (SELECT pack_id FROM current_pack)) "
+             "ON CONFLICT (user_id, pack_id) WHERE session_id IS NULL DO UPDATE SET state = excluded.state, "
+             "k_state_string = '', "
+             "l_state_string = '', word = ''", (self.__current_id, state)),
+            ("DELETE FROM guess_journal WHERE user_id = ? AND pack_id = (SELECT pack_id FROM current_pack)",
+             (self.__current_id,)),
+        )
+
+    def clear_state(self):
+        """Delete saved game of current user in selected pack, both snapshot and guess journal"""
+        self.__write(
+            ("UPDATE game_state SET state = NULL, k_state_string = '', l_state_string = '', word = '' "
+             "WHERE user_id = ? AND pack_id = (SELECT pack_id FROM current_pack) AND session_id IS NULL",
+             (self.__current_id,)),
+            ("DELETE FROM guess_journal WHERE user_id = ? AND pack_id = (SELECT pack_id FROM current_pack)",
+             (self.__current_id,)),
+        )
+
+    def spill_sessions(self, pack_id: int, sessions: list[tuple[int, Optional[int], bytes]]):
+        """Save games of server sessions to game_state, they are taken back by take_session
+
+        params:
+            pack_id - word pack of games
+
+            sessions - list with tuples (session id, user id or None, snapshot)"""
+        now = time()
+        self.__write(*[
+            ("INSERT INTO game_state (user_id, k_state_string, l_state_string, word, state, pack_id, session_id, "
+             "spilled_at) VALUES (?, '', '', '', ?, ?, ?, ?) ON CONFLICT (pack_id, session_id) "
+             "WHERE session_id IS NOT NULL DO UPDATE SET state = excluded.state, spilled_at = excluded.spilled_at",
+             (user_id, state, pack_id, session_id, now))
+            for session_id, user_id, state in sessions
+        ])
+
+    def expire_sessions(self, pack_id: int, before: float):
+        """Delete spilled games of server sessions which weren't requested since provided time
+
+        params:
+            pack_id - word pack of server
+
+            before - unix time, sessions spilled earlier are deleted"""
+        self.__write(
+            ("DELETE FROM game_state WHERE pack_id = ? AND session_id IS NOT NULL AND spilled_at < ?",
+             (pack_id, before))
+        )
+
+    def take_session(self, pack_id: int, session_id: int) -> tuple:
+        """Get game of server session and delete it from db
+
+        params:
+            pack_id - word pack of server, games of other packs can't be restored with its alphabet
+
+            session_id - id of session
+
+        return:
+            tuple (user id or None, snapshot), empty if there is no such session in pack"""
+        arr = self.__read(
+            "SELECT user_id, state FROM game_state WHERE pack_id = ? AND session_id = ?", (pack_id, session_id)
+        )
+        if not arr:
+            return ()
+
+        self.__write(("DELETE FROM game_state WHERE pack_id = ? AND session_id = ?", (pack_id, session_id)))
+        return arr[0]
+
+    def reserve_session_ids(self, pack_id: int, amount: int) -> int:
+        """Reserve next ids of server sessions of word pack, reserved ids are never given again
+
+        params:
+            pack_id - word pack of server
+
+            amount - amount of ids
+
+        return:
+            the last reserved id, reserved ones are (last id - amount, last id]"""
+        with self.__lock:
+            self.__write(
+                ("INSERT INTO server_sessions (pack_id, last_id) VALUES (?, ?) "
+                 "ON CONFLICT (pack_id) DO UPDATE SET last_id = last_id + excluded.last_id", (pack_id, amount))
+            )
+            return self.__read("SELECT last_id FROM server_sessions WHERE pack_id = ?", (pack_id,))[0][0]
+
+    def get_schedule(self) -> tuple:
+        """Get word scheduler state of current user
+
+        return:
+            tuple (seed, position, used, checksum), empty if there is no state yet"""
+        arr = self.__read(
+            "SELECT seed, position, used, checksum FROM word_schedule "
+            "WHERE user_id = ? AND pack_id = (SELECT pack_id FROM current_pack)", (self.__current_id,)
+        )
+        return arr[0] if arr else ()
+
+    def save_schedule(self, seed: int, position: int, used: bytes, checksum: str):
+        """Save word scheduler state of current user for selected pack"""
+        if self.__current_id is None:
+            return
+
+        self.__write((
+            "INSERT INTO word_schedule (user_id, pack_id, seed, position, used, checksum) "
+            "VALUES (?, (SELECT pack_id FROM current_pack), ?, ?, ?, ?) "
+            "ON CONFLICT (user_id, pack_id) DO UPDATE SET seed = excluded.seed, position = excluded.position, "
+            "used = excluded.used, checksum = excluded.checksum", (self.__current_id, seed, position, used, checksum)
+        ))
+
+    def append_journal(self, record: bytes):
+        """Append record to guess journal of current user"""
+        self.__write((
+            "INSERT INTO guess_journal (user_id, record, pack_id) VALUES (?, ?, (SELECT pack_id FROM current_pack))",
+            (self.__current_id, record)
+        ))
+
+    def get_journal(self) -> list[bytes]:
+        """Get guess journal of current user in selected pack in order of appending"""
+        arr = self.__read(
+            "SELECT record FROM guess_journal WHERE user_id = ? AND pack_id = (SELECT pack_id FROM current_pack) "
+            "ORDER BY id", (self.__current_id,)
+        )
+        return [item[0] for item in arr]
+
+    def get_state(self) -> bytes:
+        """Get binary snapshot of saved game from db
+
+        return:
+            snapshot of game in selected pack, empty if there is no game or it was saved by older version"""
+        arr = self.__read(
+            "SELECT state FROM game_state WHERE user_id = ? AND pack_id = (SELECT pack_id FROM current_pack) "
+            "AND session_id IS NULL", (self.__current_id,)
+        )
+        return (arr[0][0] or b'') if arr else b''
+
+    def get_legacy_state(self) -> tuple[str]:
+        """Get str representations of keyboard, labels and chosen word, saved by older version
+
+        return:
+            tuple with 3 elements:
+                1 - str representations of keyboard state
+
+                2 - str representations of labels states
+
+                3 - chosen word"""
+        arr = self.__read(
+            "SELECT k_state_string, l_state_string, word FROM game_state "
+            "WHERE user_id = ? AND pack_id = (SELECT pack_id FROM current_pack) AND session_id IS NULL",
+            (self.__current_id,)
+        )
+        return arr[0]
+
+    def check_state(self) -> bool:
+        """Check if there is a saved game in db
+
+        returns:
+            True - yes
+
+            False - no"""
+        arr = self.__read(
+            "SELECT state, word FROM game_state WHERE user_id = ? AND pack_id = (SELECT pack_id FROM current_pack) "
+            "AND session_id IS NULL", (self.__current_id,)
+        )
+
+        if arr and (arr[0][0] or arr[0][1]):
+            return True
+
+        arr = self.__read(
+            "SELECT 1 FROM guess_journal WHERE user_id = ? AND pack_id = (SELECT pack_id FROM current_pack) LIMIT 1",
+            (self.__current_id,)
+        )
+        return True if arr else False
+
+    def close(self):
+        """Commit queued mutations and close connection to db"""
+        with self.__lock:
+            if self.__closed:
+                return
+
+            self.flush()
+            self.__closed = True
+            self.__conn.close()
+
+        if self.__write_behind:
+            atexit.unregister(self.close)
+
+
+class WordList:
+    """Dictionary compiled into packed fixed-width file and memory-mapped
+
+    file has its own alphabet in header, each word is a row of letter codes (1-based alphabet position,
+    0 pads shorter words), rows are sorted, so lookups are binary searches over the file. Words are decoded
+    only when accessed. File is named by dictionary checksum and rebuilt only when words table changes"""
+
+    FILE_PREFIX: str = 'words_'
+    MAGIC: bytes = b'WRDL'
+    VERSION: int = 1
+
+    # magic, format version, word width, amount of words, alphabet size in bytes, checksum
+    HEADER: Struct = Struct('<4sHHIH40s')
+
+    def __init__(self, db_handler: DBHandler, cache_dir: str, pack_id: int = 1):
+        """params:
+            db_handler - db with word packs
+
+            cache_dir - directory to keep .bin file in
+
+            pack_id - word pack to compile"""
+        self.__checksum: str = ''
+        self.__alphabet: str = ''
+        self.__width: int = 0
+        self.__codes: np.ndarray = self.__load_or_build(db_handler, cache_dir, pack_id)
+
+        # same rows viewed as fixed-width byte strings, so binary search is done by numpy
+        self.__keys: np.ndarray = (
+            self.__codes.view(f'S{self.__width}').reshape(-1) if self.__width else np.empty(0, 'S1')
+        )
+
+        # letter <-> code translation tables, padding turns into \0 and stripped after decoding
+        self.__encode_table: dict[int, int] = {ord(ltr): i + 1 for i, ltr in enumerate(self.__alphabet)}
+        self.__decode_table: dict[int, str] = {i + 1: ltr for i, ltr in enumerate(self.__alphabet)}
+
+    @property
+    def checksum(self) -> str:
+        """Checksum of words in this order, same as PatternMatrix.checksum(list(word_list))"""
+        return self.__checksum
+
+    @property
+    def alphabet(self) -> str:
+        return self.__alphabet
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Read-only (memory-mapped) words x width matrix of letter codes"""
+        return self.__codes
+
+    def __len__(self) -> int:
+        return len(self.__codes)
+
+    def __getitem__(self, i: int) -> str:
+        return self.__decode(self.__codes[i].tobytes()).rstrip('\0')
+
+    def __iter__(self):
+        w = self.__width
+        if not w:
+            return
+
+        data = self.__decode(self.__codes.tobytes())
+        for i in range(0, len(data), w):
+            yield data[i:i + w].rstrip('\0')
+
+    def __contains__(self, word: str) -> bool:
+        return self.index(word) >= 0
+
+    def __decode(self, raw: bytes) -> str:
+        return raw.decode('latin-1').translate(self.__decode_table)
+
+    def index(self, word: str) -> int:
+        """Get position of word, binary search over file
+
+        return:
+            position or -1 if there is no such word"""
+        if len(word) > self.__width or not all(ord(ltr) in self.__encode_table for ltr in word):
+            return -1
+
+        # numpy drops trailing \0 of byte strings, so key is not padded
+        key = word.translate(self.__encode_table).encode('latin-1')
+        i = int(np.searchsorted(self.__keys, key))
+        return i if i < len(self.__keys) and self.__keys[i] == key else -1
+
+    def random(self) -> str:
+        """Get random word"""
+        return self[randrange(len(self))]
+
+    def select(self, length: int, alphabet: str) -> 'WordSelection':
+        """Get words of exactly provided length made only of provided letters
+
+        checked over codes of all rows at once, so nothing is decoded"""
+        if length > self.__width or not len(self):
+            return WordSelection(self, np.empty(0, np.int64))
+
+        allowed = np.zeros(256, dtype=bool)
+        allowed[[i + 1 for i, ltr in enumerate(self.__alphabet) if ltr in alphabet]] = True
+        mask = allowed[self.__codes[:, :length]].all(axis=1)
+        if length < self.__width:
+            # the rest of row must be padding
+            mask &= self.__codes[:, length] == 0
+
+        return WordSelection(self, np.flatnonzero(mask))
+
+    def __load_or_build(self, db_handler: DBHandler, cache_dir: str, pack_id: int) -> np.ndarray:
+        version, checksum = db_handler.get_words_meta(pack_id)
+        if checksum is not None:
+            path = join(cache_dir, f'{self.FILE_PREFIX}{checksum}.bin')
+            if exists(path):
+                codes = self.__load(path)
+                if self.__checksum == checksum:
+                    return codes
+
+        # words were changed or file was deleted
+        words = sorted(db_handler.get_words(pack_id))
+        self.__checksum = PatternMatrix.checksum(words)
+        path = join(cache_dir, f'{self.FILE_PREFIX}{self.__checksum}.bin')
+        makedirs(cache_dir, exist_ok=True)
+
+        # lists built for other dictionaries are useless now
+        for item in listdir(cache_dir):
+            if item.startswith(self.FILE_PREFIX) and item != basename(path):
+                remove(join(cache_dir, item))
+
+        # writing to temp file first, so killed build won't leave broken cache
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(self.build(words))
+        replace(tmp_path, path)
+
+        db_handler.set_words_checksum(version, self.__checksum, pack_id)
+        return self.__load(path)
+
+    def __load(self, path: str) -> np.ndarray:
+        """Read header of file, set alphabet, width and checksum and mmap words"""
+        with open(path, 'rb') as f:
+            magic, version, width, count, alphabet_size, checksum = self.HEADER.unpack(f.read(self.HEADER.size))
+            alphabet = f.read(alphabet_size).decode('utf-8')
+
+        if magic != self.MAGIC or version != self.VERSION:
+            # checksum stays empty, so file is rebuilt
+            return np.empty((0, 0), np.uint8)
+
+        self.__alphabet, self.__width, self.__checksum = alphabet, width, checksum.decode('ascii')
+        if not count:
+            return np.empty((0, width), np.uint8)
+
+        offset = self.HEADER.size + alphabet_size
+        return np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(count, width))
+
+    @classmethod
+    def build(cls, words: list[str]) -> bytes:
+        """Compile sorted words into file contents"""
+        alphabet = ''.join(sorted(set(''.join(words))))
+        if len(alphabet) > 255:
+            raise ValueError("Too many letters to fit codes in one byte")
+
+        width = max(map(len, words), default=0)
+        table = {ord(ltr): i + 1 for i, ltr in enumerate(alphabet)}
+        raw_alphabet = alphabet.encode('utf-8')
+        header = cls.HEADER.pack(
+            cls.MAGIC, cls.VERSION, width, len(words), len(raw_alphabet),
+            PatternMatrix.checksum(words).encode('ascii')
+        )
+        body = b''.join(word.translate(table).encode('latin-1').ljust(width, b'\0') for word in words)
+        return header + raw_alphabet + body
+
+
+class WordSelection(Sequence):
+    """Some rows of WordList, words are decoded only when accessed"""
+
+    def __init__(self, word_list: WordList, indexes: np.ndarray):
+        """params:
+            word_list - compiled dictionary
+
+            indexes - sorted positions of selected words in word_list"""
+        self.__word_list: WordList = word_list
+        self.__indexes: np.ndarray = indexes
+
+    @property
+    def indexes(self) -> np.ndarray:
+        """Positions of words in word list"""
+        return self.__indexes
+
+    def __len__(self) -> int:
+        return len(self.__indexes)
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, list[str]]:
+        if isinstance(i, slice):
+            return [self.__word_list[int(j)] for j in self.__indexes[i]]
+        return self.__word_list[int(self.__indexes[i])]
+
+    def __contains__(self, word: object) -> bool:
+        i = self.__word_list.index(word) if isinstance(word, str) else -1
+        if i < 0:
+            return False
+        j = int(np.searchsorted(self.__indexes, i))
+        return j < len(self.__indexes) and self.__indexes[j] == i
+
+
+class PatternMatrix:
+    """Precomputed guess x answer feedback patterns for whole dictionary
+
+    each cell is base-3 encoded list of states (state - 1 per letter, first letter is the most significant digit),
+    so 5-letter pattern fits in uint8. Matrix is saved as .npy file and memory-mapped on next starts,
+    file is rebuilt when dictionary checksum changes"""
+
+    FILE_PREFIX: str = 'patterns_'
+
+    def __init__(self, words: list[str], cache_dir: str, checksum: Optional[str] = None):
+        """params:
+            words - all words from db, row and column order in matrix is the same
+
+            cache_dir - directory to keep .npy file in
+
+            checksum - checksum of words if it's already known (see WordList), computed if not provided"""
+        self.__words: list[str] = words
+        self.__index: dict[str, int] = {word: i for i, word in enumerate(words)}
+        self.__length: int = len(words[0]) if words else 0
+        self.__checksum: str = checksum if checksum is not None else self.checksum(words)
+        self.__path: str = join(cache_dir, f'{self.FILE_PREFIX}{self.__checksum}.npy')
+        self.__matrix: np.ndarray = self.__load_or_build(cache_dir)
+
+    @staticmethod
+    def checksum(words: list[str]) -> str:
+        """Get checksum of words list (order matters since it defines matrix indexes)"""
+        return sha1('\n'.join(words).encode('utf-8')).hexdigest()
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Read-only (memory-mapped) guess x answer matrix"""
+        return self.__matrix
+
+    @property
+    def words(self) -> list[str]:
+        return self.__words
+
+    @property
+    def path(self) -> str:
+        """Path to .npy file, so other processes can mmap the same matrix"""
+        return self.__path
+
+    @property
+    def dict_checksum(self) -> str:
+        return self.__checksum
+
+    def index(self, word: str) -> int:
+        """Get row/column of word in matrix, -1 if there is no such word"""
+        return self.__index.get(word, -1)
+
+    def pattern(self, guess: str, answer: str) -> int:
+        """Get encoded pattern of guess against answer (both must be in dictionary)"""
+        return int(self.__matrix[self.__index[guess], self.__index[answer]])
+
+    def states(self, guess: str, answer: str) -> list[int]:
+        """Get states of guess letters against answer
+
+        return:
+            list of states: 1 - grey, 2 - yellow, 3 - green"""
+        g, a = self.__index.get(guess, -1), self.__index.get(answer, -1)
+        if g < 0 or a < 0:
+            # word is not in dictionary, so there is nothing precomputed for it
+            return self.compare(answer, guess)
+
+        return self.decode(int(self.__matrix[g, a]), self.__length)
+
+    @staticmethod
+    def encode(states: list[int]) -> int:
+        """Encode list of states into single base-3 number"""
+        code = 0
+        for state in states:
+            code = code * 3 + state - 1
+        return code
+
+    @staticmethod
+    def decode(code: int, length: int) -> list[int]:
+        """Decode base-3 number into list of states of provided length"""
+        states = [1] * length
+        for i in range(length - 1, -1, -1):
+            code, states[i] = divmod(code, 3)
+            states[i] += 1
+        return states
+
+    @staticmethod
+    def __to_dict(word: Union[list, str]) -> dict:
+        s = {}
+        for i, item in enumerate(word):
+            if item not in s.keys():
+                s[item] = []
+                s[item].append(i)
+            else:
+                s[item].append(i)
+
+        return s
+
+    @staticmethod
+    def compare(a: Union[list, str], b: Union[list, str]) -> list[int]:
+        """Pure python comparison, used for words which are not in matrix
+
+        :param a: hidden word
+        :param b: input word
+        :return: state
+        """
+        s = [1 for _ in range(len(a))]
+        a_dict = PatternMatrix.__to_dict(a)
+        b_dict = PatternMatrix.__to_dict(b)
+        d = []
+        for key, value in b_dict.items():
+            # looking for all 3s:
+            if key in a_dict.keys():
+                for b_item in value:
+                    if b_item in a_dict[key]:
+                        s[b_item] = 3
+                        d.append(b_item)
+
+                for item in d:
+                    a_dict[key].remove(item)
+                    b_dict[key].remove(item)
+
+                d = []
+
+                # looking for all 2s:
+                if not b_dict[key]:
+                    continue
+                else:
+                    a_i = len(a_dict[key])
+                    b_i = len(b_dict[key])
+                    i = 0
+                    while min(a_i, b_i) > 0:
+                        s[b_dict[key][i]] = 2
+                        i += 1
+                        b_i -= 1
+                        a_i -= 1
+
+        return s
+
+    def __load_or_build(self, cache_dir: str) -> np.ndarray:
+        path = self.__path
+        file_name = basename(path)
+        if not exists(path):
+            makedirs(cache_dir, exist_ok=True)
+
+            # matrices built for other dictionaries are useless now
+            for item in listdir(cache_dir):
+                if item.startswith(self.FILE_PREFIX) and item != file_name:
+                    remove(join(cache_dir, item))
+
+            # writing to temp file first, so killed build won't leave broken cache
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                np.save(f, self.build(self.__words))
+            replace(tmp_path, path)
+
+        return np.load(path, mmap_mode='r')
+
+    @staticmethod
+    def build(words: list[str]) -> np.ndarray:
+        """Compute guess x answer patterns matrix for provided words (same rules as compare)"""
+        n = len(words)
+        length = len(words[0]) if words else 0
+        if length > 5:
+            # 3 ** 6 doesn't fit in uint8 anymore
+            dtype = np.uint16 if length <= 10 else np.uint32
+        else:
+            dtype = np.uint8
+
+        # letters to numbers, each row is a word
+        letters = {ltr: i for i, ltr in enumerate(sorted(set(''.join(words))))}
+        codes = np.array([[letters[ltr] for ltr in word] for word in words], dtype=np.uint8).reshape(n, length)
+        # how many times each letter is presented in each word
+        counts = np.zeros((n, len(letters)), dtype=np.uint8)
+        for j in range(length):
+            np.add.at(counts, (np.arange(n), codes[:, j]), 1)
+
+        weights = [3 ** (length - 1 - j) for j in range(length)]
+        matrix = np.empty((n, n), dtype=dtype)
+        for g in range(n):
+            guess = codes[g]
+            green = codes == guess  # answer x position
+            code = np.zeros(n, dtype=dtype)
+
+            # letters of the answer which are not matched by greens yet
+            left = {}
+            for ltr in set(guess.tolist()):
+                matched = green[:, guess == ltr].sum(axis=1)
+                left[ltr] = counts[:, ltr].astype(np.int8) - matched
+
+            # yellows are given from left to right while unmatched letters remain
+            for j in range(length):
+                ltr = int(guess[j])
+                yellow = ~green[:, j] & (left[ltr] > 0)
+                left[ltr] = left[ltr] - yellow
+                code += (green[:, j] * 2 + yellow).astype(dtype) * weights[j]
+
+            matrix[g] = code
+
+        return matrix
+
+
+class WordIndex:
+    """Index over dictionary words, built once
+
+    gives O(1) membership test and bitsets of words (python ints, bit i = i-th word)
+    by letter at position, by letter anywhere and by amount of the same letter,
+    so queries and guess feedback are answered by ANDing bitsets"""
+
+    def __init__(self, words: Union[list[str], WordList]):
+        """:param words: all words from db, bit order is the same as in list"""
+        self.__words: Union[list[str], WordList] = words
+        self.__all: int = (1 << len(words)) - 1
+        self.__feedback: dict[tuple[int, str, int], int] = {}  # (position, letter, state): bitset, filled on demand
+
+        # compiled list is searched by itself
+        self.__index: dict[str, int] = {} if isinstance(words, WordList) else {word: i for i, word in enumerate(words)}
+        if isinstance(words, WordList):
+            # words are already encoded, so bitsets are made from columns of codes without decoding them
+            self.__build_from_codes(words)
+            return
+
+        # collecting bytes first, since building big ints with |= for every word is quadratic
+        size = (len(words) + 7) // 8
+        positional: dict[tuple[int, str], bytearray] = {}
+        anywhere: dict[str, bytearray] = {}
+        repeated: dict[tuple[str, int], bytearray] = {}
+        for i, word in enumerate(words):
+            byte, bit = i >> 3, 1 << (i & 7)
+            seen: dict[str, int] = {}
+            for j, ltr in enumerate(word):
+                if (j, ltr) not in positional:
+                    positional[(j, ltr)] = bytearray(size)
+                positional[(j, ltr)][byte] |= bit
+
+                seen[ltr] = seen.get(ltr, 0) + 1
+                key = (ltr, seen[ltr])
+                if seen[ltr] == 1:
+                    if ltr not in anywhere:
+                        anywhere[ltr] = bytearray(size)
+                    anywhere[ltr][byte] |= bit
+                else:
+                    if key not in repeated:
+                        repeated[key] = bytearray(size)
+                    repeated[key][byte] |= bit
+
+        self.__positional: dict[tuple[int, str], int] = {
+            key: int.from_bytes(value, 'little') for key, value in positional.items()
+        }  # (position, letter): bitset
+        self.__anywhere: dict[str, int] = {
+            key: int.from_bytes(value, 'little') for key, value in anywhere.items()
+        }  # letter: bitset
+        self.__repeated: dict[tuple[str, int], int] = {
+            key: int.from_bytes(value, 'little') for key, value in repeated.items()
+        }  # (letter, amount >= 2): bitset of words with at least that amount of letter
+
+    def __build_from_codes(self, word_list: WordList):
+        codes = word_list.codes
+        self.__positional = {}
+        for j in range(codes.shape[1]):
+            column = codes[:, j]
+            for code in np.unique(column):
+                if code:
+                    self.__positional[(j, word_list.alphabet[code - 1])] = self.__pack(column == code)
+
+        self.__anywhere = {}
+        self.__repeated = {}
+        for code, ltr in enumerate(word_list.alphabet, 1):
+            amount = (codes == code).sum(axis=1)
+            self.__anywhere[ltr] = self.__pack(amount >= 1)
+            for n in range(2, int(amount.max()) + 1):
+                self.__repeated[(ltr, n)] = self.__pack(amount >= n)
+
+    @staticmethod
+    def __pack(bits: np.ndarray) -> int:
+        return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
+
+    def __contains__(self, word: str) -> bool:
+        return self.index(word) >= 0
+
+    def __len__(self) -> int:
+        return len(self.__words)
+
+    @property
+    def all(self) -> int:
+        """Bitset with all words"""
+        return self.__all
+
+    def index(self, word: str) -> int:
+        """Get position of word in dictionary, -1 if there is no such word"""
+        if isinstance(self.__words, WordList):
+            return self.__words.index(word)
+        return self.__index.get(word, -1)
+
+    def at(self, position: int, letter: str) -> int:
+        """Get bitset of words with letter at position (0 based)"""
+        return self.__positional.get((position, letter), 0)
+
+    def having(self, letter: str) -> int:
+        """Get bitset of words which contain letter at any position"""
+        return self.__anywhere.get(letter, 0)
+
+    def at_least(self, letter: str, amount: int) -> int:
+        """Get bitset of words which contain letter at least amount times"""
+        if amount <= 0:
+            return self.__all
+        if amount == 1:
+            return self.having(letter)
+        return self.__repeated.get((letter, amount), 0)
+
+    def feedback(self, position: int, letter: str, state: int) -> int:
+        """Get bitset of words which agree with one painted tile, amount of letter is not checked here
+
+        params:
+            position - position of tile (0 based)
+
+            letter - letter in tile
+
+            state - 1 - grey, 2 - yellow, 3 - green"""
+        key = (position, letter, state)
+        mask = self.__feedback.get(key)
+        if mask is None:
+            at = self.at(position, letter)
+            if state == 3:
+                mask = at
+            elif state == 2:
+                mask = self.having(letter) & ~at
+            else:
+                mask = self.__all ^ at
+            self.__feedback[key] = mask
+
+        return mask
+
+    def consistent(self, guess: str, states: list[int]) -> int:
+        """Get bitset of words which would give the same states for guess
+
+        params:
+            guess - accepted word
+
+            states - its states (1 - 3)"""
+        mask = self.__all
+        painted: dict[str, int] = {}  # letter: amount of yellow and green tiles
+        greyed: set[str] = set()
+        for position, (letter, state) in enumerate(zip(guess, states)):
+            mask &= self.feedback(position, letter, state)
+            if state == 1:
+                greyed.add(letter)
+            else:
+                painted[letter] = painted.get(letter, 0) + 1
+
+        # yellow and green tiles give lower bound of letter amount, grey tile of the same letter makes it exact
+        for letter, amount in painted.items():
+            if amount > 1:
+                mask &= self.at_least(letter, amount)
+        for letter in greyed:
+            mask &= ~self.at_least(letter, painted.get(letter, 0) + 1)
+
+        return mask
+
+    def bitset(self, words: list[str]) -> int:
+        """Get bitset of provided words, words which are not in dictionary are skipped"""
+        if isinstance(words, WordSelection) and words.indexes.size:
+            bits = np.zeros(len(self.__words), dtype=bool)
+            bits[words.indexes] = True
+            return self.__pack(bits)
+
+        data = bytearray((len(self.__words) + 7) // 8)
+        for word in words:
+            i = self.index(word)
+            if i >= 0:
+                data[i >> 3] |= 1 << (i & 7)
+
+        return int.from_bytes(data, 'little')
+
+    def query(self, include: Optional[dict[int, str]] = None, exclude: str = '', contains: str = '') -> int:
+        """Get bitset of words matching all conditions
+
+        params:
+            include - position: letter, letters which must be at exact positions
+
+            exclude - letters which must not be in word
+
+            contains - letters which must be in word at any position"""
+        mask = self.__all
+        if include:
+            for position, letter in include.items():
+                mask &= self.at(position, letter)
+
+        for letter in contains:
+            mask &= self.having(letter)
+
+        for letter in exclude:
+            mask &= ~self.having(letter)
+
+        return mask
+
+    @staticmethod
+    def count(mask: int) -> int:
+        """Get amount of words in bitset"""
+        return bin(mask).count('1')
+
+    def words(self, mask: int) -> list[str]:
+        """Get words from bitset"""
+        arr = []
+        while mask:
+            low = mask & -mask
+            arr.append(self.__words[low.bit_length() - 1])
+            mask ^= low
+
+        return arr
+
+
+def _entropy_chunk(path: str, start: int, stop: int, candidates: np.ndarray) -> np.ndarray:
+    """Entropies of guesses from start to stop rows, runs in worker process"""
+    return Solver.entropies(np.load(path, mmap_mode='r')[start:stop], candidates)
+
+
+class Solver:
+    """Suggests guess with the highest expected information
+
+    expected information of guess is entropy of patterns it gives over remaining candidates.
+    Best opening move is the same for the whole dictionary, so it's computed once (in process pool)
+    and cached on disk by dictionary checksum"""
+
+    FILE_PREFIX: str = 'opener_'
+    BLOCK: int = 256  # rows of matrix processed at once, keeps memory usage low
+
+    def __init__(self, patterns: PatternMatrix, cache_dir: str, workers: Optional[int] = None,
+                 alphabet: Optional[str] = None):
+        """params:
+            patterns - precomputed patterns
+
+            cache_dir - directory to keep opening move in
+
+            workers - amount of processes for opening move, all cores are used if not provided
+
+            alphabet - letters which can be typed, GameEngine.ALPHABET if not provided"""
+        alphabet = alphabet or GameEngine.ALPHABET
+        self.__patterns: PatternMatrix = patterns
+        self.__cache_dir: str = cache_dir
+        self.__workers: int = workers or cpu_count()
+        # words with letters which can't be typed are neither suggested nor chosen to guess
+        self.__allowed: np.ndarray = np.array(
+            [all(ltr in alphabet for ltr in word) for word in patterns.words], dtype=bool
+        )
+        self.__opener: str = ''
+
+    def candidates(self, engine: 'GameEngine') -> np.ndarray:
+        """Get indexes of words which are consistent with all painted rows of game"""
+        matrix = self.__patterns.matrix
+        candidates = np.flatnonzero(self.__allowed)
+        for guess, row in zip(engine.guesses, engine.rows):
+            g = self.__patterns.index(guess)
+            code = PatternMatrix.encode(row.states)
+            candidates = candidates[matrix[g, candidates] == code]
+
+        return candidates
+
+    def suggest(self, engine: 'GameEngine') -> str:
+        """Get guess with the highest expected information for current game"""
+        if not engine.guesses:
+            return self.opener()
+
+        return self.best(self.candidates(engine))
+
+    def best(self, candidates: np.ndarray) -> str:
+        """Get guess with the highest expected information over provided candidates"""
+        words = self.__patterns.words
+        if len(candidates) <= 2:
+            # no guess can do better than trying one of them
+            return words[candidates[0]] if len(candidates) else ''
+
+        matrix = self.__patterns.matrix
+        scores = np.concatenate([
+            self.entropies(matrix[i:i + self.BLOCK], candidates) for i in range(0, len(words), self.BLOCK)
+        ])
+        return words[self.__pick(scores, candidates)]
+
+    def opener(self) -> str:
+        """Get best first guess for the whole dictionary, computed once and cached on disk"""
+        if self.__opener:
+            return self.__opener
+
+        path = join(self.__cache_dir, f'{self.FILE_PREFIX}{self.__patterns.dict_checksum}.txt')
+        if exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.__opener = f.read().strip()
+            return self.__opener
+
+        candidates = np.flatnonzero(self.__allowed)
+        n = len(self.__patterns.words)
+        chunks = [(self.__patterns.path, i, min(i + self.BLOCK, n), candidates) for i in range(0, n, self.BLOCK)]
+        if self.__workers > 1:
+            with ProcessPoolExecutor(self.__workers) as executor:
+                parts = list(executor.map(_entropy_chunk, *zip(*chunks)))
+        else:
+            parts = [_entropy_chunk(*chunk) for chunk in chunks]
+
+        self.__opener = self.__patterns.words[self.__pick(np.concatenate(parts), candidates)]
+
+        makedirs(self.__cache_dir, exist_ok=True)
+        for item in listdir(self.__cache_dir):
+            if item.startswith(self.FILE_PREFIX):
+                remove(join(self.__cache_dir, item))
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.__opener)
+
+        return self.__opener
+
+    def __pick(self, scores: np.ndarray, candidates: np.ndarray) -> int:
+        # among equal guesses the one which may be the answer is better
+        scores = scores.copy()
+        scores[candidates] += 1e-6
+        scores[~self.__allowed] = -1
+        return int(np.argmax(scores))
+
+    @staticmethod
+    def entropies(rows: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Get entropy of patterns over candidates for each row (guess) of matrix"""
+        sub = np.asarray(rows[:, candidates], dtype=np.int64)
+        n = sub.shape[0]
+        amount = int(sub.max()) + 1
+
+        # counting patterns of all rows at once by giving each row its own range of values
+        sub += (np.arange(n) * amount)[:, None]
+        counts = np.bincount(sub.ravel(), minlength=n * amount).reshape(n, amount)
+
+        p = counts / len(candidates)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return -np.where(counts > 0, p * np.log2(p), 0).sum(axis=1)
+
+
+class _Row:
+    """Single row of game field"""
+    __slots__ = ('letters', 'states')
+
+    def __init__(self, length: int):
+        self.letters: list[str] = [''] * length  # lowercase letters, '' - empty label
+        self.states: list[int] = [0] * length  # 0 - not painted yet, 1 - 3 same as in keyboard
+
+
+class GameEngine:
+    """Headless wordle game. Contains game field, keyboard states and rules, doesn't need tk at all"""
+    __slots__ = (
+        '__words', '__answers', '__index', '__patterns', '__length', '__amount', '__alphabet', '__codes',
+        '__rows', '__pointer', '__cur_row', '__keyboard', '__word', '__finished', '__won', '__last_states',
+    )
+
+    # all russian letters in alphabetical order (ё after е), default alphabet
+    ALPHABET: str = 'абвгдеёжзийклмнопрстуфхцчшщъыьэюя'
+
+    # letter: code of default alphabet, used in snapshots
+    CODES: dict[str, int] = {ltr: i for i, ltr in enumerate(ALPHABET)}
+
+    SNAPSHOT_VERSION: int = 1
+
+    # guess journal record types, first byte of record
+    JOURNAL_BASE: int = 0  # followed by snapshot of game
+    JOURNAL_GUESS: int = 1  # followed by letter codes of accepted word
+
+    # submit() results
+    INACTIVE: int = 0  # game is finished, nothing happened
+    NOT_FULL: int = 1  # current row is not full
+    NOT_IN_DICT: int = 2  # no such word in dictionary
+    ACCEPTED: int = 3  # row is painted, game may be finished after it
+
+    def __init__(self, words: Union[list[str], WordList], index: Optional[WordIndex] = None,
+                 patterns: Optional[PatternMatrix] = None, row_length: int = 5, row_amount: int = 6,
+                 alphabet: Optional[str] = None):
+        """params:
+            words - all words from db
+
+            index - index over the same words, built if not provided and words are not WordList
+            (it's searched directly then)
+
+            patterns - precomputed patterns for the same words, pure python comparison is used if not provided
+
+            row_length - letters in word
+
+            row_amount - amount of attempts
+
+            alphabet - letters which can be typed, ALPHABET if not provided"""
+        self.__words: Union[list[str], WordList] = words
+        self.__index: Union[WordIndex, WordList] = (
+            index if index is not None else words if isinstance(words, WordList) else WordIndex(words)
+        )
+        self.__patterns: Optional[PatternMatrix] = patterns
+        self.__length: int = row_length
+        self.__amount: int = row_amount
+        self.__alphabet: str = alphabet or self.ALPHABET
+        self.__codes: dict[str, int] = (
+            self.CODES if self.__alphabet == self.ALPHABET else {ltr: i for i, ltr in enumerate(self.__alphabet)}
+        )
+
+        # words with letters which can't be typed (like 'хи-хи') can't be guessed, so they are never chosen
+        self.__answers: Sequence[str] = words.select(row_length, self.__alphabet) if isinstance(words, WordList) \
+            else [word for word in words if len(word) == row_length and all(ltr in self.__alphabet for ltr in word)]
+
+        self.__rows: list[_Row] = []
+        self.__pointer: int = 0
+        self.__cur_row: int = 1
+        self.__keyboard: np.ndarray = np.zeros(0, dtype=np.uint8)
+        self.__word: str = ''
+        self.__finished: bool = False
+        self.__won: bool = False
+        self.__last_states: list[int] = []
+        self.new_game()
+
+    @property
+    def row_length(self) -> int:
+        return self.__length
+
+    @property
+    def row_amount(self) -> int:
+        return self.__amount
+
+    @property
+    def alphabet(self) -> str:
+        return self.__alphabet
+
+    @property
+    def word(self) -> str:
+        """Word to guess (lowercase)"""
+        return self.__word
+
+    @property
+    def answers(self) -> Sequence[str]:
+        """Words which may be chosen to guess"""
+        return self.__answers
+
+    @property
+    def pointer(self) -> int:
+        """Amount of filled labels, next letter goes to label with this number"""
+        return self.__pointer
+
+    @property
+    def cur_row(self) -> int:
+        """Current row, starting from 1"""
+        return self.__cur_row
+
+    @property
+    def finished(self) -> bool:
+        return self.__finished
+
+    @property
+    def won(self) -> bool:
+        return self.__won
+
+    @property
+    def lost(self) -> bool:
+        return self.__finished and not self.__won
+
+    @property
+    def rows(self) -> list[_Row]:
+        return self.__rows
+
+    @property
+    def keyboard(self) -> np.ndarray:
+        """States of letters, indexed by letter code (see codes)
+
+        0 - not pressed, 1 - grey, 2 - yellow, 3 - green"""
+        return self.__keyboard
+
+    @property
+    def codes(self) -> dict[str, int]:
+        """letter (not capital): code, position in alphabet"""
+        return self.__codes
+
+    @property
+    def last_states(self) -> list[int]:
+        """States of last accepted row"""
+        return self.__last_states
+
+    @property
+    def input_word(self) -> str:
+        """Letters of current row"""
+        return ''.join(self.__rows[self.__cur_row - 1].letters)
+
+    @property
+    def guesses(self) -> list[str]:
+        """All accepted words"""
+        return [''.join(row.letters) for row in self.__rows if row.states[0]]
+
+    def letter(self, label: int) -> str:
+        """Get letter in label with provided number (row * row_length + column)"""
+        return self.__rows[label // self.__length].letters[label % self.__length]
+
+    def new_game(self, word: Optional[str] = None):
+        """Reset everything and choose word to guess
+
+        :param word: word to guess, random one if not provided"""
+        self.__word = word.lower() if word else sample(self.__answers, 1)[0]
+        self.__rows = [_Row(self.__length) for _ in range(self.__amount)]
+        self.__pointer = 0
+        self.__cur_row = 1
+        self.__keyboard = np.zeros(len(self.__alphabet), dtype=np.uint8)
+        self.__finished = False
+        self.__won = False
+        self.__last_states = []
+
+    def replay(self, word: str, guesses: list[str]):
+        """Start new game with provided word and submit guesses one by one"""
+        self.new_game(word)
+        for guess in guesses:
+            self.play(guess)
+
+    def snapshot(self) -> bytes:
+        """Get compact binary representation of game
+
+        version 1 layout (all numbers are single bytes):
+            version, row_length, row_amount, amount of accepted rows (n),
+            letter codes of word to guess (row_length bytes),
+            letter codes of accepted rows (n * row_length bytes),
+            tile states, 2 bits each, first tile in the highest bits (n * row_length / 4 bytes, rounded up)
+        letters of not accepted row are not saved"""
+        accepted = self.__cur_row if self.__finished else self.__cur_row - 1
+        data = bytearray((self.SNAPSHOT_VERSION, self.__length, self.__amount, accepted))
+        data += bytes(self.__codes[ltr] for ltr in self.__word)
+
+        packed = 0
+        for row in self.__rows[:accepted]:
+            data += bytes(self.__codes[ltr] for ltr in row.letters)
+            for state in row.states:
+                packed = packed << 2 | state
+
+        data += packed.to_bytes((accepted * self.__length * 2 + 7) // 8, 'big')
+        return bytes(data)
+
+    def restore(self, data: bytes):
+        """Restore game from snapshot (see snapshot)"""
+        version, length, amount, accepted = data[:4]
+        if version != self.SNAPSHOT_VERSION:
+            raise ValueError(f"Unknown snapshot version: {version}")
+        if length != self.__length or amount != self.__amount:
+            raise ValueError(f"Snapshot is for {length}x{amount} field, not {self.__length}x{self.__amount}")
+
+        self.new_game(''.join(self.__alphabet[code] for code in data[4:4 + length]))
+
+        offset = 4 + length
+        cells = accepted * length
+        packed = int.from_bytes(data[offset + cells:], 'big')
+        for i in range(accepted):
+            row = self.__rows[i]
+            row.letters = [self.__alphabet[code] for code in data[offset + i * length:offset + (i + 1) * length]]
+            row.states = [packed >> (2 * (cells - 1 - i * length - j)) & 3 for j in range(length)]
+            self.__merge_keyboard(row.letters, row.states)
+
+        self.__pointer = cells
+        if accepted:
+            self.__last_states = self.__rows[accepted - 1].states
+            if all(state == 3 for state in self.__last_states):
+                self.__won = True
+                self.__finished = True
+            elif accepted == amount:
+                self.__finished = True
+
+        self.__cur_row = accepted if self.__finished else accepted + 1
+
+    def journal_base(self) -> bytes:
+        """Get journal record which starts journal of current game"""
+        return bytes((self.JOURNAL_BASE,)) + self.snapshot()
+
+    def journal_guess(self, word: str) -> bytes:
+        """Get journal record for accepted word"""
+        return bytes((self.JOURNAL_GUESS,)) + bytes(self.__codes[ltr] for ltr in word)
+
+    def replay_journal(self, records: list[bytes]):
+        """Restore game from base record and submit words from guess records after it"""
+        for record in records:
+            if record[0] == self.JOURNAL_BASE:
+                self.restore(record[1:])
+            else:
+                self.play(''.join(self.__alphabet[code] for code in record[1:]))
+
+    def play(self, word: str) -> int:
+        """Type word in current row and submit it
+
+        return:
+            same as submit()"""
+        for ltr in word:
+            self.type_letter(ltr)
+        return self.submit()
+
+    def type_letter(self, letter: str) -> int:
+        """Put letter in the next label of current row
+
+        return:
+            number of filled label, -1 if it is not allowed to type"""
+        # checking whether its allowed to type in the next row
+        if self.__finished or self.__pointer >= self.__cur_row * self.__length:
+            return -1
+
+        label = self.__pointer
+        self.__rows[label // self.__length].letters[label % self.__length] = letter.lower()
+        self.__pointer += 1
+        return label
+
+    def erase(self) -> int:
+        """Erase last letter of current row
+
+        return:
+            number of cleared label, -1 if it is not allowed to erase"""
+        # label pointer must point at label within range + 1 of current row
+        if self.__finished or \
+                not (self.__cur_row - 1) * self.__length < self.__pointer <= self.__cur_row * self.__length:
+            return -1
+
+        self.__pointer -= 1
+        self.__rows[self.__pointer // self.__length].letters[self.__pointer % self.__length] = ''
+        return self.__pointer
+
+    def row_full(self) -> bool:
+        if self.__pointer == 0:
+            return False
+
+        return self.__pointer % self.__length == 0 and self.__cur_row == self.__pointer // self.__length
 
-        return arr[0][0]
+    @timed
+    def score(self, guess: str, answer: str) -> list[int]:
+        """Get states of guess letters against answer"""
+        if self.__patterns is not None:
+            return self.__patterns.states(guess, answer)
+        return PatternMatrix.compare(answer, guess)
 
-    def switch_autosave(self):
-        """Switch autosave option in db"""
-        self.__cur.execute("UPDATE autosave SET activated = not activated")
-        self.__conn.commit()
+    def submit(self) -> int:
+        """Check current row, paint it and move to the next one
 
-    def add_loss(self):
-        """Add loss to current user in db"""
-        self.__cur.execute(
-            "UPDATE stats SET played = played + 1, games_lost = games_lost + 1, current_streak = 0 "
-            "WHERE user_id = (SELECT id FROM user WHERE is_current = 1)"
-        )
-        self.__conn.commit()
+        return:
+            one of INACTIVE, NOT_FULL, NOT_IN_DICT, ACCEPTED"""
+        if self.__finished:
+            return self.INACTIVE
 
-    def add_win(self, cur_row: int):
-        """Add win to current user in db
+        if not self.row_full():
+            return self.NOT_FULL
 
-        param:
-            cur_row - current row when game was finished"""
-        self.__cur.execute(
-            "UPDATE stats SET played = played + 1, games_won = games_won + 1, current_streak = current_streak + 1, "
-            "max_streak = MAX(current_streak + 1, max_streak) WHERE user_id = "
-            "(SELECT id FROM user WHERE is_current = 1) "
-        )
+        row = self.__rows[self.__cur_row - 1]
+        guess = ''.join(row.letters)
+        if guess not in self.__index:
+            return self.NOT_IN_DICT
 
-        self.__func_arr[cur_row - 1]()
-        self.__conn.commit()
+        states = self.score(guess, self.__word)
+        row.states = states
+        self.__last_states = states
+        self.__merge_keyboard(row.letters, states)
 
-    def save_state(self, btn: str, lbl: str, word: str):
-        """Save str representations of keyboard, labels and chosen word to db
+        # checking whether its a win, a loss, or to proceed to the next row
+        if all(state == 3 for state in states):
+            self.__finished = True
+            self.__won = True
+        elif self.__cur_row == self.__amount:
+            self.__finished = True
+        else:
+            self.__cur_row += 1
 
-        params
-            btn - str representations of keyboard state
+        return self.ACCEPTED
 
-            lbl - str representations of labels state
-            word - chosen word"""
-        self.__cur.execute(
-            "UPDATE game_state SET k_state_string = ?, l_state_string = ?, word = ? " 
-            "WHERE user_id = (SELECT id FROM user WHERE is_current = 1)", (btn, lbl, word)
-        )
-        self.__conn.commit()
+    def __merge_keyboard(self, letters: list[str], states: list[int]):
+        # there is no key for some symbols (like '-')
+        if all(ltr in self.__codes for ltr in letters):
+            codes = np.frombuffer(bytes(self.__codes[ltr] for ltr in letters), dtype=np.uint8)
+        else:
+            known = [i for i, ltr in enumerate(letters) if ltr in self.__codes]
+            codes = np.frombuffer(bytes(self.__codes[letters[i]] for i in known), dtype=np.uint8)
+            states = [states[i] for i in known]
 
-    def get_state(self) -> tuple[str]:
-        """Get saved str representations of keyboard, labels and chosen word from db
+        self.merge_keyboard(self.__keyboard, codes, np.array(states, dtype=np.uint8))
 
-        return:
-            tuple with 3 elements:
-                1 - str representations of keyboard state
+    @staticmethod
+    def merge_keyboard(keyboard: np.ndarray, codes: np.ndarray, states: np.ndarray):
+        """Merge feedback of guesses into keyboard states in place
 
-                2 - str representations of labels states
+        every letter keeps the highest state it has got:
+            0 - not pressed, always to be overridden
+            1 - grey letter, not presented in the word, so it never gets higher state
+            2 - yellow letter, presented, but in the wrong place, may be overridden only by green state (3)
+            3 - green letter, presented in the word, in the exact place, never to be overridden
+        and the same letter in one guess gets the highest of its states
 
-                3 - chosen word"""
-        self.__cur.execute(
-            "SELECT k_state_string, l_state_string, word FROM game_state "
-            "WHERE user_id = (SELECT id FROM user WHERE is_current = 1)"
-        )
-        arr = self.__cur.fetchall()
-        return arr[0]
+        params:
+            keyboard - states indexed by letter code, or games x letters for batch of games
 
-    def check_state(self) -> bool:
-        """Check if there is a saved game in db
+            codes - letter codes of guess, or games x row_length for batch
 
-        returns:
-            True - yes
+            states - states of guess letters, same shape as codes"""
+        if keyboard.ndim == 1:
+            # letters may repeat, so unbuffered max is needed
+            np.maximum.at(keyboard, codes, states)
+            return
 
-            False - no"""
-        self.__cur.execute(
-            "SELECT word FROM game_state "
-            "WHERE user_id = (SELECT id FROM user WHERE is_current = 1)"
-        )
+        # within one column each game has one letter, so plain fancy indexing is enough
+        games = np.arange(len(keyboard))
+        for j in range(codes.shape[1]):
+            column = codes[:, j]
+            keyboard[games, column] = np.maximum(keyboard[games, column], states[:, j])
+
+
+class WordScheduler:
+    """Chooses words to guess without repeats
+
+    walks seeded pseudo-random permutation of answers, so the whole state is (seed, position)
+    and bitset of used answers, 1 bit per answer. Permutation is a Feistel network over the smallest
+    even power of two which fits all answers, values out of range are permuted again (cycle walking).
+    When every answer is used, new cycle starts with new seed"""
+
+    ROUNDS: int = 4
+    MASK64: int = (1 << 64) - 1
+
+    def __init__(self, size: int, seed: Optional[int] = None, position: int = 0, used: bytes = b''):
+        """params:
+            size - amount of answers
+
+            seed - seed of permutation, random one if not provided
+
+            position - amount of steps already made in permutation
+
+            used - bitset of used answers, bit i of byte i // 8 is answer i"""
+        self.__size: int = size
+        bits = max(2, (size - 1).bit_length())
+        self.__half: int = (bits + 1) // 2
+        self.__mask: int = (1 << self.__half) - 1
+
+        self.__seed: int = 0
+        self.__keys: list[int] = []
+        self.__position: int = position
+        self.__used: bytearray = bytearray(used) if len(used) == (size + 7) // 8 else bytearray((size + 7) // 8)
+        self.__set_seed(seed if seed is not None else randrange(1 << 62))
+
+    @property
+    def seed(self) -> int:
+        return self.__seed
+
+    @property
+    def position(self) -> int:
+        return self.__position
+
+    @property
+    def used(self) -> bytes:
+        return bytes(self.__used)
+
+    def __set_seed(self, seed: int):
+        self.__seed = seed
+        self.__keys = [self.__mix(seed * self.ROUNDS + r) for r in range(self.ROUNDS)]
+
+    @classmethod
+    def __mix(cls, x: int) -> int:
+        """splitmix64 finalizer, round function of the network"""
+        x = (x + 0x9E3779B97F4A7C15) & cls.MASK64
+        x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & cls.MASK64
+        x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & cls.MASK64
+        return x ^ (x >> 31)
+
+    def permute(self, i: int) -> int:
+        """Get i-th element of permutation of range(size)"""
+        half, mask = self.__half, self.__mask
+        while True:
+            left, right = i >> half, i & mask
+            for key in self.__keys:
+                left, right = right, left ^ (self.__mix(right ^ key) & mask)
+            i = (left << half) | right
+            if i < self.__size:
+                return i
+
+    def is_used(self, i: int) -> bool:
+        return bool(self.__used[i >> 3] & (1 << (i & 7)))
+
+    def mark(self, i: int):
+        """Mark answer as used, so it's skipped until next cycle"""
+        self.__used[i >> 3] |= 1 << (i & 7)
+
+    def next(self) -> int:
+        """Get number of next unused answer and mark it as used"""
+        while True:
+            if self.__position >= self.__size:
+                # every answer was given, starting over in different order
+                self.__set_seed(randrange(1 << 62))
+                self.__position = 0
+                self.__used = bytearray(len(self.__used))
+
+            i = self.permute(self.__position)
+            self.__position += 1
+            if not self.is_used(i):
+                self.mark(i)
+                return i
+
+
+class _Renderer:
+    """Coalesces widget updates
+
+    desired options are collected and applied once per frame (after_idle),
+    and only options which differ from what is on screen are passed to config,
+    since every config call is a round trip through tcl"""
+
+    def __init__(self, root: Tk):
+        self.__root: Tk = root
+        self.__shown: dict[object, dict] = {}  # widget: options which are on screen
+        self.__wanted: dict[object, dict] = {}  # widget: options to apply on next flush
+        self.__scheduled: bool = False
+
+    def set(self, widget, **options):
+        """Set desired options of widget, they are applied on next flush"""
+        if widget in self.__wanted:
+            self.__wanted[widget].update(options)
+        else:
+            self.__wanted[widget] = options
 
-        tpl = self.__cur.fetchone()
-        if tpl:
-            return True if tpl[0] else False
+        if not self.__scheduled:
+            self.__scheduled = True
+            self.__root.after_idle(self.flush)
 
-        return False
+    def forget(self, widget):
+        """Drop everything known about widget, used before it's destroyed"""
+        self.__shown.pop(widget, None)
+        self.__wanted.pop(widget, None)
 
-    def close(self):
-        """Close connection to db"""
-        self.__conn.close()
+    def flush(self):
+        """Apply desired options which differ from shown ones"""
+        self.__scheduled = False
+        wanted, self.__wanted = self.__wanted, {}
+        for widget, options in wanted.items():
+            shown = self.__shown.setdefault(widget, {})
+            changed = {key: value for key, value in options.items() if shown.get(key) != value}
+            if changed:
+                widget.config(**changed)
+                shown.update(changed)
 
 
 class _Wordle(Tk):
     """Wordle game itself. Contains all the logic"""
+    # keys of english keyboard by rows, layouts of packs are typed with keys at the same positions
+    ENG_KEYBOARD: list[str] = ["qwertyuiop[]", "asdfghjkl;'`", "zxcvbnm,."]
+    # how often (ms) window checks whether solver built in background is ready
+    SOLVER_POLL: int = 50
+
     # architecture is shit
     def __init__(self, db_name: str):
         super().__init__()
         # sqlite3
-        self.db_handler: DBHandler = DBHandler(db_name)
+        # mutations are committed in batches, so ui doesn't wait for disk after each game
+        self.db_handler: DBHandler = DBHandler(db_name, write_behind=True)
 
         # colors
         self.BASE_COLOR: str = '#f0f0f0'
@@ -292,22 +2382,40 @@ class _Wordle(Tk):
         # var for theme change
         self.__dark_theme_fl: bool = False
 
+        # whether guess journal of current game is started in db
+        self.__journaled: bool = False
+
         # game data
         self.__autosave: bool = self.__load_autosave_opt()
+        # in hard mode every guess must use all revealed hints
+        self.__hard_mode: bool = bool(self.db_handler.get_hard_mode_opt())
+        # hints revealed so far: bit (position * alphabet size + letter code) for each green tile
+        # and bit (letter code) for each yellow or green letter, so checking a guess is two mask tests
+        self.__greens_mask: int = 0
+        self.__required_mask: int = 0
+        # compiled dictionaries and precomputed feedback are mmap'd from cache dir next to db, one subdir per pack
+        self.__cache_dir: str = join(dirname(abspath(db_name)), 'cache')
+        # selected word pack (id, name, alphabet, length, attempts, layout), only its words are loaded
+        self.__pack: tuple = ()
         self.ROW_AMOUNT: int = 6
         self.ROW_LENGTH: int = 5
-        self.__words_list: Optional[list[str]] = self.db_handler.get_words()  # all 5-letters words
-        self.__chosen_word: str = sample(self.__words_list, 1)[0].upper()  # word to guess
-        self.__input_word: list[str] = [str() for _ in range(self.ROW_LENGTH)]
-        self.__cur_row: int = 1
-        self.__label_pointer: int = 0
-        self.__game_flag: bool = True
-        # each number is alphabet position and each array position is keyboard position
-        self.__numerical_keyboard: list[int] = [
-            10, 23, 20, 11, 5, 14, 3, 25, 26, 8, 22, 27,
-            21, 28, 2, 0, 16, 17, 15, 12, 4, 7, 30, 6,
-            32, 24, 18, 13, 9, 19, 29, 1, 31
-        ]
+        self.__alphabet: list[str] = []
+        self.__layout: list[str] = []  # keyboard rows
+        self.__words_list: Optional[WordList] = None  # all words of pack
+        # letter bitsets, built on first use by candidates counter, so start doesn't depend on dictionary size
+        self.__word_index: Optional[WordIndex] = None
+        # bitset of answers which agree with every painted row, narrowed after each guess, None - not counted yet
+        self.__candidates: Optional[int] = None
+        # feedback for every pair of words and solver on top of it, built in background on first hint
+        self.__patterns: Optional[PatternMatrix] = None
+        self.__solver: Optional[Solver] = None
+        self.__solver_builder: Optional[Thread] = None
+        # all game state (word to guess, rows, pointers, keyboard states) lives here, window only shows it
+        self.__engine: Optional[GameEngine] = None
+        self.__load_pack()
+
+        # board and keyboard colors are changed through it, once per frame
+        self.__render: _Renderer = _Renderer(self)
 
         # zero size image, used to make labels quadratic
         self.__image: PhotoImage = PhotoImage()
@@ -330,31 +2438,26 @@ class _Wordle(Tk):
 
         # game field labels
         self.__labels_dict: dict[str, Label] = {}
-        self.__text_vars: list[StringVar] = [StringVar() for _ in range(self.ROW_LENGTH * self.ROW_AMOUNT)]
+        self.__text_vars: list[StringVar] = []
         self.__init_labels()
 
         # buttons and its requirements definition and initialization
-        self.__alphabet: list[str] = [chr(i) for i in range(ord('а'), ord('а') + 6)] + \
-                                     [chr(ord('а') + 33)] + \
-                                     [chr(i) for i in range(ord('а') + 6, ord('а') + 32)]
-
         self.__state_to_color_dict: dict[int, str] = {
             0: self.BASE_BTN_COLOR, 1: self.GREY, 2: self.YELLOW, 3: self.GREEN
         }  # state: color
         self.__dt_state_to_color_dict: dict[int, str] = {
             0: self.DT_BTN_COLOR, 1: self.DT_GREY, 2: self.YELLOW, 3: self.GREEN
         }  # state: color
-        self.__letter_to_button_name_dict: dict[str, str] = {
-            y: f'btn{x}' for x, y in enumerate(self.__alphabet)
-        }  # letter: button name
-        self.__buttons_states: dict[str, int] = dict.fromkeys(self.__alphabet, 0)  # letter (not capital): state
+        self.__letter_to_button_name_dict: dict[str, str] = {}  # letter: button name
         self.__btn_dict: dict[str, Button] = {}  # button name: button object
+        self.__bound_keys: list[str] = []  # physical keys bound to letters of current layout
         self.__clear_button: Optional[Button] = None
         self.__enter_button: Optional[Button] = None
         self.__ng_button: Optional[Button] = None
         self.__stat_button: Optional[Button] = None
         self.__settings_button: Optional[Button] = None
         self.__profile_button: Optional[Button] = None
+        self.__hint_button: Optional[Button] = None
 
         self.__init_buttons()
 
@@ -366,9 +2469,15 @@ class _Wordle(Tk):
         self.protocol("WM_DELETE_WINDOW", self.__on_closing)
 
     def __ask_load_game(self):
-        if self.__autosave:
-            if self.db_handler.check_state():
-                self.__create_ask_load_window()
+        if self.__autosave and self.db_handler.check_state():
+            self.__create_ask_load_window()
+        else:
+            self.start_scheduled_game()
+
+    def start_scheduled_game(self):
+        """Start game with the next word of profile's schedule, used when saved game isn't loaded"""
+        self.__engine.new_game(self.__next_word())
+        self.__reset_candidates()
 
     def __create_ask_load_window(self):
         width, length = 300, 100
@@ -381,14 +2490,26 @@ class _Wordle(Tk):
 
     def init_game_data(self):
         """Load last saved game and substitute current data with loaded"""
-        raw = self.db_handler.get_state()
-        lbl, btn = {}, {}
-        # [:-1] cuts last separator
-        btn_raw, lbl_raw, word = raw[0][:-1].split('|'), raw[1][:-1].split('|'), raw[2]
+        # journal is newer than snapshot, it's written after each guess
+        journal = self.db_handler.get_journal()
+        if journal:
+            self.__engine.replay_journal(journal)
+            self.__journaled = True
+            self.__draw_game()
+            return
 
-        for item in btn_raw:
-            temp = item.split(":")
-            btn[temp[0]] = int(temp[1])
+        self.__journaled = False
+        state = self.db_handler.get_state()
+        if state:
+            self.__engine.restore(state)
+            self.__draw_game()
+            return
+
+        # game was saved by older version as str representations of widgets
+        raw = self.db_handler.get_legacy_state()
+        lbl = {}
+        # [:-1] cuts last separator, keyboard string is not needed, since it's restored from rows
+        lbl_raw, word = raw[1][:-1].split('|'), raw[2]
 
         for item in lbl_raw:
             temp = item.split(":")
@@ -397,34 +2518,87 @@ class _Wordle(Tk):
                 temp[2] = ''
             lbl[temp[0]] = f"{temp[1]}:{temp[2]}"
 
-        pointer = 0
-        for value in lbl.values():
-            if not value.split(":")[1]:
+        # painted rows are accepted words, replaying them restores keyboard states as well
+        guesses = []
+        for i in range(self.ROW_AMOUNT):
+            guess = ''.join(lbl[f'lbl{i}{j}'].split(":")[1] for j in range(self.ROW_LENGTH))
+            if len(guess) < self.ROW_LENGTH:
                 break
 
-            pointer += 1
-
-        self.__cur_row = pointer // self.ROW_LENGTH + 1
-        self.__label_pointer = pointer
-        self.__buttons_states = btn
-        self.__chosen_word = word
+            guesses.append(guess.lower())
+
+        self.__engine.replay(word, guesses)
+        self.__draw_game()
+
+    def __reset_candidates(self):
+        """Forget counted candidates and collect hints for hard mode from rows which are already painted"""
+        self.__candidates = None
+        self.__greens_mask = 0
+        self.__required_mask = 0
+        for row in self.__engine.rows:
+            if row.states[0]:
+                self.__greens_mask |= self.__hint_bits(row.letters, [state == 3 for state in row.states])[0]
+                self.__required_mask |= self.__hint_bits(row.letters, [state > 1 for state in row.states])[1]
+
+    def __hint_bits(self, letters: list[str], selected: list[bool]) -> tuple[int, int]:
+        """Get (position * alphabet size + code) and (code) bitmasks of selected letters"""
+        codes, size = self.__engine.codes, len(self.__alphabet)
+        positions, present = 0, 0
+        for j, letter in enumerate(letters):
+            if selected[j] and letter in codes:
+                positions |= 1 << (j * size + codes[letter])
+                present |= 1 << codes[letter]
+
+        return positions, present
+
+    def __hard_mode_violation(self) -> str:
+        """Get message about first hint which is not used in current row, empty string if all are used"""
+        letters = self.__engine.rows[self.__engine.cur_row - 1].letters
+        positions, present = self.__hint_bits(letters, [True] * len(letters))
+
+        missing = self.__greens_mask & ~positions
+        if missing:
+            bit = (missing & -missing).bit_length() - 1
+            position, code = divmod(bit, len(self.__alphabet))
+            return f'{position + 1}-я буква должна быть {self.__alphabet[code].upper()}'
+
+        missing = self.__required_mask & ~present
+        if missing:
+            return f'В слове должна быть буква {self.__alphabet[(missing & -missing).bit_length() - 1].upper()}'
+
+        return ''
+
+    def __draw_game(self):
+        """Put letters in labels and paint labels and buttons according to engine state"""
+        if self.__dark_theme_fl:
+            state_to_color = self.__dt_state_to_color_dict
+            bg_color = self.DT_LBL_COLOR
+            ltr_color = self.DT_LETTERS_COLOR
+        else:
+            state_to_color = self.__state_to_color_dict
+            bg_color = self.BASE_LBL_COLOR
+            ltr_color = self.BASE_LETTERS_COLOR
 
-        # paint buttons
-        for letter, state in self.__buttons_states.items():
-            btn_name = self.__letter_to_button_name_dict[letter]
-            color = self.__state_to_color_dict[state]
-            self.__btn_dict[btn_name].config(bg=color)
+        # paint buttons, button names are made of letter codes
+        for code, state in enumerate(self.__engine.keyboard.tolist()):
+            self.__render.set(self.__btn_dict[f'btn{code}'], bg=state_to_color[state])
 
         # put letters in labels and paint them
-        for i in range(self.ROW_AMOUNT):
+        for i, row in enumerate(self.__engine.rows):
             for j in range(self.ROW_LENGTH):
-                color, letter = lbl[f'lbl{i}{j}'].split(":")
-                if letter:
-                    ltr_color = self.PAINTED_LETTERS_COLOR
+                if row.states[j]:
+                    self.__render.set(
+                        self.__labels_dict[f'lbl{i}{j}'],
+                        bg=self.__state_to_color_dict[row.states[j]], fg=self.PAINTED_LETTERS_COLOR
+                    )
                 else:
-                    ltr_color = self.BASE_LETTERS_COLOR
-                self.__labels_dict[f'lbl{i}{j}'].config(bg=color, fg=ltr_color)
-                self.__text_vars[self.ROW_LENGTH * i + j].set(letter)
+                    self.__render.set(self.__labels_dict[f'lbl{i}{j}'], bg=bg_color, fg=ltr_color)
+                self.__text_vars[self.ROW_LENGTH * i + j].set(row.letters[j].upper())
+
+        # loaded game may have painted rows
+        self.__reset_candidates()
+        if self.__engine.guesses and not self.__engine.finished:
+            self.__show_candidates()
 
     def __load_autosave_opt(self):
         value = self.db_handler.get_autosave_opt()
@@ -435,6 +2609,10 @@ class _Wordle(Tk):
         self.__autosave = not self.__autosave
         self.db_handler.switch_autosave()
 
+    def on_profile_changed(self):
+        """Start guess journal anew, since journal of previous profile must not be continued by the new one"""
+        self.__journaled = False
+
     def get_current_user(self) -> str:
         """Get current user's username from db
 
@@ -443,6 +2621,20 @@ class _Wordle(Tk):
         current = self.db_handler.get_current_user_nick()
         return current
 
+    def change_hard_mode(self):
+        """Switch hard mode option both in db and wordle app"""
+        self.__hard_mode = not self.__hard_mode
+        self.db_handler.switch_hard_mode()
+
+    def get_hard_mode_opt(self) -> bool:
+        """Get hard mode option
+
+        return:
+            True - enabled
+
+            False - disabled"""
+        return self.__hard_mode
+
     def get_autosave_opt(self) -> bool:
         """Get autosave option
 
@@ -453,33 +2645,19 @@ class _Wordle(Tk):
         return self.__autosave
 
     def __on_closing(self):
-        if self.__autosave and self.__game_flag:
+        if self.__autosave and not self.__engine.finished:
             self.__save_cur_game()
 
         # closing connection to db explicitly just in case
         self.db_handler.close()
         self.destroy()
 
+    @timed
     def __save_cur_game(self):
-        # to save only light mode data
-        if self.__dark_theme_fl:
-            self.__set_theme(self.BASE_COLOR, self.BASE_LETTERS_COLOR, self.BASE_LBL_COLOR, self.BASE_BTN_COLOR)
-
-        colors_letters = {}
-
-        for i in range(self.ROW_AMOUNT):
-            for j in range(self.ROW_LENGTH):
-                colors_letters[f'lbl{i}{j}'] = f"{self.__labels_dict[f'lbl{i}{j}'].cget('bg')}:" \
-                                               f"{self.__labels_dict[f'lbl{i}{j}'].cget('text')}"
-
-        btn, lbl = "", ""
-        for key, value in colors_letters.items():
-            lbl += f'{key}:{value}|'
-
-        for key, value in self.__buttons_states.items():
-            btn += f'{key}:{value}|'
-
-        self.db_handler.save_state(btn, lbl, self.__chosen_word)
+        # snapshot is made from engine state, widgets and theme don't matter
+        # journal is compacted into it
+        self.db_handler.save_state(self.__engine.snapshot())
+        self.__journaled = False
 
     def get_current_theme(self) -> bool:
         """Get current color theme of main wordle window
@@ -501,21 +2679,19 @@ class _Wordle(Tk):
 
     def __set_theme(self, bg_color: str, ltr_color: str, lbl_color: str, btn_color: str):
         for i, item in enumerate(self.__labels_dict.values()):
-            if i < self.__label_pointer:
+            if i < self.__engine.pointer:
                 continue
 
-            item.config(bg=lbl_color, fg=ltr_color)
+            self.__render.set(item, bg=lbl_color, fg=ltr_color)
 
         if self.__dark_theme_fl:
-            for letter, state in self.__buttons_states.items():
-                btn_name = self.__letter_to_button_name_dict[letter]
+            for code, state in enumerate(self.__engine.keyboard.tolist()):
                 color = self.__state_to_color_dict[state]
-                self.__btn_dict[btn_name].config(bg=color, fg=ltr_color)
+                self.__render.set(self.__btn_dict[f'btn{code}'], bg=color, fg=ltr_color)
         else:
-            for letter, state in self.__buttons_states.items():
-                btn_name = self.__letter_to_button_name_dict[letter]
+            for code, state in enumerate(self.__engine.keyboard.tolist()):
                 color = self.__dt_state_to_color_dict[state]
-                self.__btn_dict[btn_name].config(bg=color, fg=ltr_color)
+                self.__render.set(self.__btn_dict[f'btn{code}'], bg=color, fg=ltr_color)
 
         self.config(bg=bg_color)
         self.__menu_frame_left.config(bg=bg_color)
@@ -531,6 +2707,7 @@ class _Wordle(Tk):
         self.__settings_button.config(bg=btn_color, fg=ltr_color)
         self.__ng_button.config(bg=btn_color, fg=ltr_color)
         self.__profile_button.config(bg=btn_color, fg=ltr_color)
+        self.__hint_button.config(bg=btn_color, fg=ltr_color)
 
     @staticmethod
     def center_window(window, w_width: int, w_height: int):
@@ -555,23 +2732,40 @@ class _Wordle(Tk):
         self.grid_columnconfigure(0, weight=1)
 
         # Allowing typing letters from keyboard
-        eng_keyboard = list("qwertyuiop[]asdfghjkl;'`zxcvbnm,.")
-        for i in range(33):
-            self.bind(
-                eng_keyboard[i],
-                lambda event, ru_ltr=self.__alphabet[self.__numerical_keyboard[i]].upper(): self.__button_click(ru_ltr)
-            )
-        # for Caps Lock
-        for i in range(33):
-            self.bind(
-                eng_keyboard[i].upper(),
-                lambda event, ru_ltr=self.__alphabet[self.__numerical_keyboard[i]].upper(): self.__button_click(ru_ltr)
-            )
+        self.__bind_letters()
 
         self.bind("<BackSpace>", lambda event: self.__clear())
         self.bind("<Return>", lambda event: self.__enter())
+        if METRICS is not None:
+            self.bind("<F12>", lambda event: self.__dump_metrics())
+
+    def __dump_metrics(self):
+        METRICS.dump()
+        self.__message_label_var.set(f'Метрики сохранены в {METRICS.path}')
+
+    def __bind_letters(self):
+        # letters of layout are typed with keys at the same positions of english keyboard
+        for key in self.__bound_keys:
+            self.unbind(key)
+        self.__bound_keys = []
+
+        for eng_row, row in zip(self.ENG_KEYBOARD, self.__layout):
+            for eng_ltr, ltr in zip(eng_row, row):
+                # upper one is for Caps Lock
+                for key in dict.fromkeys((eng_ltr, eng_ltr.upper())):
+                    self.bind(key, lambda event, a=ltr.upper(): self.__button_click(a))
+                    self.__bound_keys.append(key)
 
     def __init_labels(self):
+        self.__init_board()
+
+        self.__message_label = Label(
+            self.__messages_frame, width=100, height=2, textvariable=self.__message_label_var,
+            font=('Arial', 10)
+        )
+
+    def __init_board(self):
+        self.__text_vars = [StringVar() for _ in range(self.ROW_LENGTH * self.ROW_AMOUNT)]
         for i in range(self.ROW_AMOUNT):
             for j in range(self.ROW_LENGTH):
                 self.__labels_dict[f'lbl{i}{j}'] = Label(
@@ -580,19 +2774,8 @@ class _Wordle(Tk):
                     textvariable=self.__text_vars[self.ROW_LENGTH * i + j]
                 )
 
-        self.__message_label = Label(
-            self.__messages_frame, width=100, height=2, textvariable=self.__message_label_var,
-            font=('Arial', 10)
-        )
-
     def __init_buttons(self):
-        for i in range(33):
-            letter = self.__alphabet[i].upper()
-
-            self.__btn_dict[f"btn{i}"] = Button(
-                self.__keyboard_frame, text=letter, font=("Arial bold", 11),
-                command=lambda a=letter: self.__button_click(a)
-            )
+        self.__init_letter_buttons()
 
         self.__clear_button = Button(
             self.__keyboard_frame, text="Очистить", font=("Arial bold", 11), command=self.__clear
@@ -608,6 +2791,9 @@ class _Wordle(Tk):
         self.__ng_button = Button(
             self.__menu_frame_left, height=1, width=5, text="Заново", command=self.__new_game
         )
+        self.__hint_button = Button(
+            self.__menu_frame_left, height=1, width=5, text="Подсказка", command=self.__hint
+        )
         self.__stat_button = Button(
             self.__menu_frame_right, height=1, width=5, text="Статистика", command=self.__show_stats
         )
@@ -615,6 +2801,16 @@ class _Wordle(Tk):
             self.__menu_frame_right, height=1, width=5, text="Параметры", command=self.__show_settings
         )
 
+    def __init_letter_buttons(self):
+        self.__letter_to_button_name_dict = {y: f'btn{x}' for x, y in enumerate(self.__alphabet)}
+        for i, letter in enumerate(self.__alphabet):
+            letter = letter.upper()
+
+            self.__btn_dict[f"btn{i}"] = Button(
+                self.__keyboard_frame, text=letter, font=("Arial bold", 11),
+                command=lambda a=letter: self.__button_click(a)
+            )
+
     # seems like ctrl+c ctrl+v, but im not sure that i should have
     # 1 func and pass params to it to create windows rather that
     # have several distinct funcs, one for each window, even though they are similar
@@ -654,212 +2850,210 @@ class _Wordle(Tk):
         self.__keyboard_frame.grid(sticky="S")
 
     def __place_labels(self):
+        self.__place_board()
+        self.__message_label.grid()
+
+    def __place_board(self):
         for i in range(self.ROW_AMOUNT):
             for j in range(self.ROW_LENGTH):
                 self.__labels_dict[f'lbl{i}{j}'].grid(column=j, row=i, padx=10, pady=10)
 
-        self.__message_label.grid()
-
     def __place_buttons(self):
         # keyboard frame
-        # one button = 2 colons as default
-        for i in range(0, 48, 2):
-            self.__btn_dict[f"btn{self.__numerical_keyboard[i // 2]}"].grid(
-                padx=10, pady=10, ipadx=10, ipady=10, column=i % 24, row=i // 24, columnspan=2
-            )
-        self.__enter_button.grid(padx=10, pady=10, ipadx=10, ipady=10, column=0, row=2, columnspan=3, sticky='W')
-
-        for i in range(50, 68, 2):
-            self.__btn_dict[f"btn{self.__numerical_keyboard[i // 2 - 1]}"].grid(
-                padx=10, pady=10, ipadx=10, ipady=10, column=i % 24 + 1, row=i // 24, columnspan=2
-            )
-        self.__clear_button.grid(padx=10, pady=10, ipadx=10, ipady=10, column=21, row=2, columnspan=3, sticky='E')
+        self.__place_letter_buttons()
 
         # menu frame
         self.__ng_button.grid(ipadx=20, ipady=5, column=0, row=0)
         self.__stat_button.grid(ipadx=20, ipady=5, column=0, row=0)
         self.__settings_button.grid(ipadx=20, ipady=5, column=1, row=0)
         self.__profile_button.grid(ipadx=20, ipady=5, column=1, row=0)
+        self.__hint_button.grid(ipadx=20, ipady=5, column=2, row=0)
+
+    def __place_letter_buttons(self):
+        # one button = 2 colons as default, rows are centered on 24 colons
+        *rows, last = self.__layout
+        for i, row in enumerate(rows):
+            start = max(0, 12 - len(row))
+            for j, letter in enumerate(row):
+                self.__btn_dict[self.__letter_to_button_name_dict[letter]].grid(
+                    padx=10, pady=10, ipadx=10, ipady=10, column=start + j * 2, row=i, columnspan=2
+                )
 
-    @staticmethod
-    def __to_dict(word: Union[list, str]) -> dict:
-        s = {}
-        for i, item in enumerate(word):
-            if item not in s.keys():
-                s[item] = []
-                s[item].append(i)
-            else:
-                s[item].append(i)
-
-        return s
-
-    def __alg_cmp(self, a: Union[list, str], b: Union[list, str]) -> list[int]:
-        """
-        :param a: hidden word
-        :param b: input word
-        :return: state
-        """
-        # that shit works
-        s = [1 for _ in range(len(a))]
-        a_dict = self.__to_dict(a)
-        b_dict = self.__to_dict(b)
-        d = []
-        for key, value in b_dict.items():
-            # looking for all 3s:
-            if key in a_dict.keys():
-                for b_item in value:
-                    if b_item in a_dict[key]:
-                        s[b_item] = 3
-                        d.append(b_item)
-
-                for item in d:
-                    a_dict[key].remove(item)
-                    b_dict[key].remove(item)
-
-                d = []
-
-                # looking for all 2s:
-                if not b_dict[key]:
-                    continue
-                else:
-                    a_i = len(a_dict[key])
-                    b_i = len(b_dict[key])
-                    i = 0
-                    while min(a_i, b_i) > 0:
-                        s[b_dict[key][i]] = 2
-                        i += 1
-                        b_i -= 1
-                        a_i -= 1
-
-        return s
+        # last row is between enter and clear buttons
+        self.__enter_button.grid(
+            padx=10, pady=10, ipadx=10, ipady=10, column=0, row=len(rows), columnspan=3, sticky='W'
+        )
+        for j, letter in enumerate(last):
+            self.__btn_dict[self.__letter_to_button_name_dict[letter]].grid(
+                padx=10, pady=10, ipadx=10, ipady=10, column=3 + j * 2, row=len(rows), columnspan=2
+            )
+        self.__clear_button.grid(
+            padx=10, pady=10, ipadx=10, ipady=10, column=max(21, 3 + len(last) * 2), row=len(rows), columnspan=3,
+            sticky='E'
+        )
 
     def __paint_row(self, states: list):
-        i = self.__label_pointer // self.ROW_LENGTH - 1
+        i = self.__engine.pointer // self.ROW_LENGTH - 1
         for j in range(len(states)):
             state = states[j]
             color = self.__state_to_color_dict[state]
-            self.__labels_dict[f"lbl{i}{j}"].config(bg=color, fg=self.PAINTED_LETTERS_COLOR)
-
-    def __unlock_next_row(self):
-        # increment coefficient for allowing typing in the next row
-        # and disallowing erasing previous one
-        self.__cur_row += 1
-
-    def __paint_keyboard_letters(self, states: list[int]):
-        # creating better representation of states
-        # which shows it in a way: letter: state
-        # since higher states override lower ones
-        # for the same letter
-        st_dict = {}
-        for i, item in enumerate(self.__input_word):
-            if item not in st_dict.keys():
-                st_dict[item] = states[i]
-            elif st_dict[item] < states[i]:
-                st_dict[item] = states[i]
-
-        # changing button_states dict
-        # 0 - not pressed, always to be overridden
-        # 1 - grey letter, not presented in the word, never to be overridden
-        # 2 - yellow letter, presented, but in the wrong place, may be overridden only by green state (3)
-        # 3 - green letter, presented in the word, in the exact place, never to be overridden
-        for letter, state in st_dict.items():
-            letter = letter.lower()
-            if self.__buttons_states[letter] == 0:
-                self.__buttons_states[letter] = state
-            elif self.__buttons_states[letter] == 2:
-                if state == 3:
-                    self.__buttons_states[letter] = 3
-
-            # now to reconfigure button color
+            self.__render.set(self.__labels_dict[f"lbl{i}{j}"], bg=color, fg=self.PAINTED_LETTERS_COLOR)
+
+        # green tiles must stay in place in hard mode
+        self.__greens_mask |= self.__hint_bits(self.__engine.rows[i].letters, [state == 3 for state in states])[0]
+
+    @timed
+    def __paint_keyboard_letters(self, letters: str):
+        # engine has already merged states, only letters of the last word could change
+        keyboard, codes = self.__engine.keyboard, self.__engine.codes
+        for letter in set(letters):
+            abs_state = int(keyboard[codes[letter]])
+            # yellow and green letters must be used in hard mode
+            if abs_state > 1:
+                self.__required_mask |= 1 << codes[letter]
             if self.__dark_theme_fl:
-                abs_state = self.__buttons_states[letter]
                 color = self.__dt_state_to_color_dict[abs_state]
-                btn_name = self.__letter_to_button_name_dict[letter]
-                self.__btn_dict[btn_name].configure(bg=color)
             else:
-                abs_state = self.__buttons_states[letter]
                 color = self.__state_to_color_dict[abs_state]
-                btn_name = self.__letter_to_button_name_dict[letter]
-                self.__btn_dict[btn_name].configure(bg=color)
+            btn_name = self.__letter_to_button_name_dict[letter]
+            self.__render.set(self.__btn_dict[btn_name], bg=color)
 
+    @timed
     def __valid_word(self):
-        # comparing words
-        states = self.__alg_cmp(self.__chosen_word, self.__input_word)
-        print(f'chosen | guess: {self.__chosen_word} | {"".join(self.__input_word)}')
+        # engine has already moved to the next row, so taking the last accepted one
+        states = self.__engine.last_states
+        guess = self.__engine.guesses[-1]
+        print(f'chosen | guess: {self.__engine.word.upper()} | {guess.upper()}')
 
         # painting everything
         self.__paint_row(states)
-        self.__paint_keyboard_letters(states)
+        self.__paint_keyboard_letters(guess)
+        if self.__candidates is not None:
+            self.__candidates &= self.__word_index.consistent(guess, states)
+        self.__show_candidates()
 
-        # checking whether its a win, a loss, or to proceed to the next row
-        if states == [3, 3, 3, 3, 3]:
+        self.__write_journal(guess)
+
+        # checking whether its a win or a loss
+        if self.__engine.won:
             self.__congratulate()
-        elif self.__cur_row == 6:
+        elif self.__engine.lost:
             self.__game_over()
+
+    def __show_candidates(self):
+        if self.__candidates is None:
+            # first count in game, starting from all answers and narrowing them by painted rows
+            if self.__word_index is None:
+                self.__word_index = WordIndex(self.__words_list)
+            self.__candidates = self.__word_index.bitset(self.__engine.answers)
+            for row in self.__engine.rows:
+                if row.states[0]:
+                    self.__candidates &= self.__word_index.consistent(''.join(row.letters), row.states)
+
+        self.__message_label_var.set(f'Подходящих слов осталось: {WordIndex.count(self.__candidates)}')
+
+    def __write_journal(self, guess: str):
+        # a few bytes per guess, so game isn't lost if app crashes
+        if not self.__autosave or self.db_handler.current_id is None or self.__engine.finished:
+            return
+
+        if self.__journaled:
+            self.db_handler.append_journal(self.__engine.journal_guess(guess))
         else:
-            self.__unlock_next_row()
+            # first record is the whole game so far, it replaces any saved game
+            self.db_handler.clear_state()
+            self.db_handler.append_journal(self.__engine.journal_base())
+            self.__journaled = True
 
-    def __check_full_row(self):
-        if self.__label_pointer == 0:
-            return False
+    @timed
+    def __enter(self):
+        # hints are checked only for full rows, so "not enough letters" is shown as usual
+        if self.__hard_mode and not self.__engine.finished and self.__engine.row_full():
+            message = self.__hard_mode_violation()
+            if message:
+                self.__message_label_var.set(message)
+                return
 
-        if self.__label_pointer % self.ROW_LENGTH == 0 and self.__cur_row == self.__label_pointer // self.ROW_LENGTH:
-            return True
-        return False
+        result = self.__engine.submit()
 
-    def __check_word_in_dict(self):
-        word = ''.join(self.__input_word).lower()
-        if word in self.__words_list:
-            return True
-        return False
+        # if current row is not full
+        if result == GameEngine.NOT_FULL:
+            self.__message_label_var.set('Мало букв')
 
-    def __get_input_word(self):
-        for i in range((self.__cur_row - 1) * self.ROW_LENGTH, self.__cur_row * self.ROW_LENGTH):
-            self.__input_word[i % self.ROW_LENGTH] = self.__text_vars[i].get()
+        # if row is full, but word is not valid
+        elif result == GameEngine.NOT_IN_DICT:
+            self.__message_label_var.set('Такого слова нет в словаре')
 
-    def __enter(self):
-        if self.__game_flag:
-            # if current row is not full
-            if not self.__check_full_row():
-                self.__message_label_var.set('Мало букв')
-            else:
-                self.__get_input_word()
+        # if row is full and word is valid
+        elif result == GameEngine.ACCEPTED:
+            self.__valid_word()
 
-                # if row is full, but word is not valid
-                if not self.__check_word_in_dict():
-                    self.__message_label_var.set('Такого слова нет в словаре')
+    def __hint(self):
+        if self.__engine.finished:
+            return
 
-                # if row is full and word is valid
-                else:
-                    self.__valid_word()
+        if self.__solver is None:
+            # matrix is N x N, so it's built (or mmap'd) only when hints are actually used,
+            # and not in mainloop, since window would freeze for the whole build
+            if self.__solver_builder is None:
+                result = []
+                self.__solver_builder = Thread(
+                    target=self.__build_solver, args=(self.__pack[0], self.__words_list, self.__engine.alphabet, result),
+                    daemon=True
+                )
+                self.__solver_builder.start()
+                self.after(self.SOLVER_POLL, self.__wait_solver, self.__solver_builder, result)
+            self.__message_label_var.set('Подсказка готовится...')
+            return
+
+        # opening move is read from cache, others are computed over remaining words
+        word = self.__solver.suggest(self.__engine)
+        self.__message_label_var.set(f'Попробуйте слово: {word.upper()}')
+
+    def __build_solver(self, pack_id: int, words_list: WordList, alphabet: str, result: list):
+        # runs in builder thread, so it touches nothing of window and gets everything by params
+        cache_dir = join(self.__cache_dir, f'pack_{pack_id}')
+        patterns = PatternMatrix(words_list, cache_dir, words_list.checksum)
+        solver = Solver(patterns, cache_dir, alphabet=alphabet)
+        solver.opener()
+        result.append((patterns, solver))
+
+    def __wait_solver(self, builder: Thread, result: list):
+        if builder is not self.__solver_builder:
+            # pack was switched while building, solver of previous pack is not needed
+            return
+
+        if builder.is_alive():
+            self.after(self.SOLVER_POLL, self.__wait_solver, builder, result)
+            return
+
+        self.__solver_builder = None
+        if not result:
+            self.__message_label_var.set('Не удалось подготовить подсказку')
+            return
+
+        self.__patterns, self.__solver = result[0]
+        self.__hint()
 
     def __clear(self):
-        if self.__game_flag:
+        if not self.__engine.finished:
             # clearing message label
             self.__message_label_var.set('')
 
-            # Checking if its allowed to erase
-            # (label pointer points at label within range + 1 of current row)
-            if (self.__cur_row - 1) * self.ROW_LENGTH < self.__label_pointer <= self.__cur_row * self.ROW_LENGTH:
-                # clearing single letter label
-                current = self.__label_pointer - 1
+            # clearing single letter label if its allowed to erase
+            current = self.__engine.erase()
+            if current >= 0:
                 self.__text_vars[current].set('')
 
-                # decrementing label pointer
-                self.__label_pointer -= 1
-
     def __button_click(self, letter: str):
-        if self.__game_flag:
+        if not self.__engine.finished:
             # erase message in message label
             self.__message_label_var.set('')
 
-            # checking whether its allowed to type in the next row
-            if self.__label_pointer < self.__cur_row * 5:
-                # putting letter in the label
-                self.__text_vars[self.__label_pointer].set(letter)
-
-                # incrementing label pointer
-                self.__label_pointer += 1
+            # putting letter in the label if its allowed to type in the next row
+            current = self.__engine.type_letter(letter)
+            if current >= 0:
+                self.__text_vars[current].set(letter)
 
     def __re_init_labels(self):
         for item in self.__text_vars:
@@ -873,7 +3067,7 @@ class _Wordle(Tk):
             ltr_color = self.BASE_LETTERS_COLOR
 
         for item in self.__labels_dict.values():
-            item.config(bg=bg_color, fg=ltr_color)
+            self.__render.set(item, bg=bg_color, fg=ltr_color)
 
         self.__message_label_var.set('')
 
@@ -886,24 +3080,97 @@ class _Wordle(Tk):
             ltr_color = self.BASE_LETTERS_COLOR
 
         for item in self.__btn_dict.values():
-            item.config(bg=bg_color, fg=ltr_color)
+            self.__render.set(item, bg=bg_color, fg=ltr_color)
 
     def __congratulate(self):
         # deleting last game
-        self.db_handler.add_win(self.__cur_row)
+        self.db_handler.add_win(self.__engine.cur_row, self.__engine.word)
+
+        self.db_handler.clear_state()
+        self.__message_label_var.set(f'Поздраляю! Загадано было слово: {self.__engine.word.upper()}\nДля начала '
+                                     f'новой игры нажмите кнопку "заново".')
+
+    def __load_pack(self):
+        """Load words of selected pack, other packs are not touched
+
+        word of the next game is drawn from schedule only when it starts (see start_scheduled_game),
+        since saved game may be loaded instead"""
+        self.__pack = self.db_handler.get_pack(self.db_handler.get_current_pack()) or self.db_handler.get_pack(1)
+        pack_id, _, alphabet, self.ROW_LENGTH, self.ROW_AMOUNT, layout = self.__pack
+        self.__alphabet = list(alphabet)
+        self.__layout = layout.split('|')
+
+        # each pack has its own dir, since stale files are removed per dir
+        cache_dir = join(self.__cache_dir, f'pack_{pack_id}')
+        self.__words_list = WordList(self.db_handler, cache_dir, pack_id)
+        self.__word_index = None
+        self.__patterns = None
+        self.__solver = None
+        self.__solver_builder = None
+        self.__engine = GameEngine(self.__words_list, None, None, self.ROW_LENGTH, self.ROW_AMOUNT, alphabet)
+        self.__reset_candidates()
+
+    def get_packs(self) -> list[tuple[int, str]]:
+        """Get all word packs from db
+
+        return:
+            list with tuples (id, name)"""
+        return [pack[:2] for pack in self.db_handler.get_packs()]
+
+    def get_current_pack(self) -> int:
+        """Get id of selected word pack"""
+        return self.__pack[0]
+
+    def change_pack(self, pack_id: int):
+        """Switch word pack: board and keyboard are rebuilt for its word length, attempts and layout
+
+        current game is saved if autosave is enabled, saved game of new pack is offered to load"""
+        if pack_id == self.__pack[0]:
+            return
+
+        if self.__autosave and not self.__engine.finished:
+            self.__save_cur_game()
+
+        for widget in [*self.__labels_dict.values(), *self.__btn_dict.values()]:
+            self.__render.forget(widget)
+            widget.destroy()
+        self.__labels_dict.clear()
+        self.__btn_dict.clear()
+
+        self.db_handler.set_current_pack(pack_id)
+        self.__load_pack()
+        self.__journaled = False
 
-        self.db_handler.save_state("", "", "")
-        self.__message_label_var.set(f'Поздраляю! Загадано было слово: {self.__chosen_word}\nДля начала новой игры '
-                                     f'нажмите кнопку "заново".')
-        self.__game_flag = False
+        self.__init_board()
+        self.__init_letter_buttons()
+        self.__place_board()
+        self.__place_letter_buttons()
+        self.__bind_letters()
+
+        self.__re_init_labels()
+        self.__re_init_buttons()
+        self.__ask_load_game()
+
+    def __next_word(self) -> str:
+        """Get next word of current profile's schedule, words don't repeat until all of them were given"""
+        answers = self.__engine.answers
+        checksum = self.__words_list.checksum
+        state = self.db_handler.get_schedule()
+        if state and state[3] == checksum:
+            scheduler = WordScheduler(len(answers), state[0], state[1], state[2])
+        else:
+            # no schedule yet or dictionary was changed, so old positions mean nothing
+            scheduler = WordScheduler(len(answers))
+
+        word = answers[scheduler.next()]
+        self.db_handler.save_schedule(scheduler.seed, scheduler.position, scheduler.used, checksum)
+        return word
 
     def __new_game(self):
         # resetting game variables
-        self.__game_flag = True
-        self.__label_pointer = 0
-        self.__chosen_word = sample(self.__words_list, 1)[0].upper()
-        self.__cur_row = 1
-        self.__buttons_states = dict.fromkeys(self.__alphabet, 0)
+        self.__engine.new_game(self.__next_word())
+        self.__reset_candidates()
+        self.__journaled = False
 
         # clear labels
         self.__re_init_labels()
@@ -912,13 +3179,15 @@ class _Wordle(Tk):
         self.__re_init_buttons()
 
         # deleting last game
-        self.db_handler.save_state("", "", "")
+        self.db_handler.clear_state()
 
     def __game_over(self):
-        self.db_handler.add_loss()
-        self.__message_label_var.set(f'Какая жалость! Загадано было слово: {self.__chosen_word}\nДля начала новой игры '
-                                     f'нажмите кнопку "Заново".')
-        self.__game_flag = False
+        self.db_handler.add_loss(self.__engine.word, len(self.__engine.guesses))
+
+        # deleting last game
+        self.db_handler.clear_state()
+        self.__message_label_var.set(f'Какая жалость! Загадано было слово: {self.__engine.word.upper()}\nДля начала '
+                                     f'новой игры нажмите кнопку "Заново".')
 
     def run(self):
         """Start mainloop and places everything"""
@@ -952,8 +3221,13 @@ class _Statistics(Toplevel):
         self.BASE_BAR_COLOR: str = '#959595'
         self.DT_BAR_COLOR: str = '#656565'
 
+        self.DISTRIBUTION_KEYS: list[str] = [
+            "first_try", "second_try", "third_try", "fourth_try", "fifth_try", "sixth_try"
+        ]
+
         # frames
         self.__upper_frame: Frame = Frame(self)
+        self.__compare_frame: Frame = Frame(self)
         self.__lower_frame: Frame = Frame(self)
 
         # upper frame labels and vars
@@ -997,9 +3271,15 @@ class _Statistics(Toplevel):
         )
         self.__max_streak_text_lbl: Label = Label(self.__upper_frame, text="Макс.серия\nпобед")
 
+        # comparison with other profiles
+        self.__compare_head_lbl: Label = Label(self.__compare_frame, text="СРЕДИ ВСЕХ ПРОФИЛЕЙ", font=("Arial bold", 14))
+        self.__winrate_place_lbl: Label = Label(self.__compare_frame, text=self.__winrate_place_text())
+        self.__streak_place_lbl: Label = Label(self.__compare_frame, text=self.__streak_place_text())
+
         # lower frame labels and vars
         self.__lower_head_lbl: Label = Label(self.__lower_frame, text="РАСПРЕДЕЛЕНИЕ ПОПЫТОК", font=("Arial bold", 18))
         self.__barchart_canvas: Canvas = self.__make_barchart()
+        self.__legend_lbl: Label = Label(self.__lower_frame, text="контур - все профили", font=("Arial", 8))
 
         self.__place_upper_frame_and_labels()
         self.__place_lower_frame_and_labels()
@@ -1018,8 +3298,35 @@ class _Statistics(Toplevel):
             "second_try": raw[8], "third_try": raw[9], "fourth_try": raw[10],
             "fifth_try": raw[11], "sixth_try": raw[12]
         }
+
+        # aggregates over all profiles, empty if there is no current profile
+        comparison = self.root.db_handler.get_comparison()
+        if comparison:
+            d["lower_winrate"], d["played_users"], d["streak_place"], d["users"], d["global"] = comparison
+        else:
+            d["lower_winrate"], d["played_users"], d["streak_place"], d["users"], d["global"] = 0, 0, 1, 1, (0,) * 6
+
         return d
 
+    def __winrate_place_text(self) -> str:
+        others = self.__data["played_users"] - 1
+        if self.__data["played"] == 0 or others < 1:
+            return "Процент побед: сравнивать не с кем"
+
+        return f"Процент побед выше, чем у {self.__data['lower_winrate'] * 100 // others}% профилей"
+
+    def __streak_place_text(self) -> str:
+        return f"Макс. серия побед: {self.__data['streak_place']} место из {self.__data['users']}"
+
+    def __global_scores(self) -> list[float]:
+        """Global distribution scaled to amount of wins of current profile, to draw it over its bars"""
+        wins = sum(self.__data[key] for key in self.DISTRIBUTION_KEYS)
+        total = sum(self.__data["global"])
+        if not total:
+            return [0] * 6
+
+        return [wins * score / total for score in self.__data["global"]]
+
     def set_theme(self):
         dark = self.root.get_current_theme()
         if dark:
@@ -1048,11 +3355,17 @@ class _Statistics(Toplevel):
         self.__max_streak_number_lbl.grid(row=1, column=9, columnspan=3, padx=10, pady=3)
         self.__max_streak_text_lbl.grid(row=2, column=9, columnspan=3, padx=10)
 
+        self.__compare_frame.grid(row=1, column=0, padx=10)
+        self.__compare_head_lbl.grid(row=0, column=0, pady=5)
+        self.__winrate_place_lbl.grid(row=1, column=0)
+        self.__streak_place_lbl.grid(row=2, column=0)
+
     def __place_lower_frame_and_labels(self):
-        self.__lower_frame.grid(row=1, column=0, padx=10, pady=10)
+        self.__lower_frame.grid(row=2, column=0, padx=10, pady=10)
         self.__lower_frame.grid_columnconfigure(0, weight=1)
         self.__lower_head_lbl.grid(row=0, padx=10, pady=10)
         self.__barchart_canvas.grid(row=1)
+        self.__legend_lbl.grid(row=2)
 
     def __make_barchart(self) -> Canvas:
         # checking current theme
@@ -1066,6 +3379,14 @@ class _Statistics(Toplevel):
             bbc = self.BASE_BAR_COLOR
             txt = self.BASE_LETTERS_COLOR
 
+        # matplotlib is heavy, so it's loaded only when this window is opened for the first time,
+        # and it's optional: bars are drawn on plain canvas without it
+        try:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        except ImportError:
+            return self.__make_native_barchart(bg, bbc, txt)
+
         # the Figure class represents the drawing area on which matplotlib charts will be drawn
         figure = Figure(figsize=(2.5, 2.5), dpi=100)
         figure.patch.set_facecolor(bg)
@@ -1082,6 +3403,7 @@ class _Statistics(Toplevel):
                   self.__data["fourth_try"], self.__data["fifth_try"], self.__data["sixth_try"]]
 
         bars = axes.barh(attempts, scores, color=bbc)
+        axes.barh(attempts, self.__global_scores(), color='none', edgecolor=txt, linewidth=1)
 
         axes.set_facecolor(bg)
         axes.invert_yaxis()
@@ -1107,15 +3429,50 @@ class _Statistics(Toplevel):
 
         return figure_canvas.get_tk_widget()
 
+    def __make_native_barchart(self, bg: str, bbc: str, txt: str) -> Canvas:
+        # same size and look as matplotlib figure: horizontal bars, attempt numbers on the left
+        # and values on the right of the bars
+        width, height = 250, 250
+        canvas = Canvas(self.__lower_frame, width=width, height=height, bg=bg, highlightthickness=0)
+
+        scores = [self.__data["first_try"], self.__data["second_try"], self.__data["third_try"],
+                  self.__data["fourth_try"], self.__data["fifth_try"], self.__data["sixth_try"]]
+        global_scores = self.__global_scores()
+        top = max(max(scores), max(global_scores), 1)
+
+        # space for attempt numbers on the left and values on the right
+        left, right, pad = 25, 30, 10
+        bar_space = (height - 2 * pad) / len(scores)
+        for i, score in enumerate(scores):
+            y0 = pad + i * bar_space + bar_space * 0.1
+            y1 = y0 + bar_space * 0.8
+            x1 = left + (width - left - right) * score / top
+
+            canvas.create_text(left - 8, (y0 + y1) / 2, text=f'{i + 1}', fill=txt, anchor='e')
+            if score > 0:
+                canvas.create_rectangle(left, y0, x1, y1, fill=bbc, width=0)
+                canvas.create_text(x1 + 4, (y0 + y1) / 2, text=f'{score}', fill=txt, anchor='w')
+            if global_scores[i] > 0:
+                gx1 = left + (width - left - right) * global_scores[i] / top
+                canvas.create_rectangle(left, y0, gx1, y1, outline=txt)
+
+        return canvas
+
     def __set_theme(self, bg_color: str, txt_color: str):
         self.config(bg=bg_color)
 
         self.__upper_frame.config(bg=bg_color)
+        self.__compare_frame.config(bg=bg_color)
         self.__lower_frame.config(bg=bg_color)
 
         self.__upper_head_lbl.config(bg=bg_color, fg=txt_color)
+        self.__compare_head_lbl.config(bg=bg_color, fg=txt_color)
         self.__lower_head_lbl.config(bg=bg_color, fg=txt_color)
 
+        self.__winrate_place_lbl.config(bg=bg_color, fg=txt_color)
+        self.__streak_place_lbl.config(bg=bg_color, fg=txt_color)
+        self.__legend_lbl.config(bg=bg_color, fg=txt_color)
+
         self.__g_played_number_lbl.config(bg=bg_color, fg=txt_color)
         self.__g_played_text_lbl.config(bg=bg_color, fg=txt_color)
         self.__winrate_number_lbl.config(bg=bg_color, fg=txt_color)
@@ -1154,10 +3511,27 @@ class _Settings(Toplevel):
         if self.root.get_autosave_opt():
             self.__autosave_button.select()
 
+        self.__hard_mode_button = Checkbutton(
+            self.__frame, text="Сложный режим", font=("Arial bold", 15), command=self.__switch_hard_mode
+        )
+
+        if self.root.get_hard_mode_opt():
+            self.__hard_mode_button.select()
+
         self.__dark_theme_button = Checkbutton(
             self.__frame, text="Темный режим", font=("Arial bold", 15), command=self.__switch_theme
         )
 
+        # word packs, switching one starts new game with its words
+        self.__packs: dict[str, int] = {name: pack_id for pack_id, name in self.root.get_packs()}  # name: id
+        current = next(name for name, pack_id in self.__packs.items() if pack_id == self.root.get_current_pack())
+        self.__pack_var: StringVar = StringVar(self, current)
+        self.__pack_lbl: Label = Label(self.__frame, text="Набор слов:", font=("Arial bold", 15))
+        self.__pack_menu: OptionMenu = OptionMenu(
+            self.__frame, self.__pack_var, *self.__packs, command=self.__switch_pack
+        )
+        self.__pack_menu.config(font=("Arial bold", 12))
+
         self.__place()
         self.__bind_keys()
         self.set_theme()
@@ -1165,6 +3539,9 @@ class _Settings(Toplevel):
     def __switch_autosave(self):
         self.root.change_autosave()
 
+    def __switch_hard_mode(self):
+        self.root.change_hard_mode()
+
     def set_theme(self):
         dark = self.root.get_current_theme()
         if dark:
@@ -1176,6 +3553,9 @@ class _Settings(Toplevel):
         self.root.change_color_theme()
         self.set_theme()
 
+    def __switch_pack(self, name: str):
+        self.root.change_pack(self.__packs[name])
+
     def __bind_keys(self):
         self.bind("<Escape>", lambda event: self.destroy())
 
@@ -1183,12 +3563,18 @@ class _Settings(Toplevel):
         self.__frame.grid(padx=10, pady=10)
         self.__dark_theme_button.grid(row=0, sticky="W")
         self.__autosave_button.grid(row=1, sticky="W")
+        self.__hard_mode_button.grid(row=2, sticky="W")
+        self.__pack_lbl.grid(row=3, sticky="W", pady=(10, 0))
+        self.__pack_menu.grid(row=4, sticky="W")
 
     def __set_theme(self, bg_color: str, txt_color: str):
         self.config(bg=bg_color)
         self.__frame.config(bg=bg_color)
         self.__dark_theme_button.config(bg=bg_color, activebackground=bg_color, fg=txt_color)
         self.__autosave_button.config(bg=bg_color, activebackground=bg_color, fg=txt_color)
+        self.__hard_mode_button.config(bg=bg_color, activebackground=bg_color, fg=txt_color)
+        self.__pack_lbl.config(bg=bg_color, fg=txt_color)
+        self.__pack_menu.config(bg=bg_color, activebackground=bg_color, fg=txt_color, highlightthickness=0)
 
 
 class _Profiles(Toplevel):
@@ -1216,6 +3602,21 @@ class _Profiles(Toplevel):
 
         self.CURRENT_PROFILE: str = '#5EA83D'
 
+        # same as max nick length, so rows don't change width while scrolling
+        self.NICK_WIDTH: int = 24
+
+        # only visible rows have widgets, they are refilled while scrolling,
+        # profiles are loaded from db by pages and only few pages are kept
+        self.ROWS: int = 6
+        self.PAGE: int = 50
+        self.MAX_PAGES: int = 8
+
+        self.__pages: dict[int, list[str]] = {}  # page number: nick names
+        self.__total: int = 0  # amount of profiles matching search
+        self.__top: int = 0  # number of profile in the first visible row
+        self.__shown: list[Optional[str]] = [None] * self.ROWS
+        self.__current: Optional[str] = None
+
         self.__frame: Frame = Frame(self)
         self.__btn_frame: Frame = Frame(self.__frame)
         self.__btn_frame.grid_columnconfigure(0, weight=1)
@@ -1224,25 +3625,29 @@ class _Profiles(Toplevel):
 
         self.__head_label: Label = Label(self.__frame, text="ПРОФИЛИ", font=("Arial bold", 20))
 
-        self.__profiles_canvas: Canvas = Canvas(self.__frame, width=300, height=200)
-
-        self.__prof_scrollbar: Scrollbar = Scrollbar(
-            self.__frame, orient=VERTICAL, command=self.__profiles_canvas.yview
-        )
-
-        # bind canvas and scroll bar together
-        self.__profiles_canvas.config(yscrollcommand=self.__prof_scrollbar.set)
-        self.__profiles_canvas.bind(
-            "<Configure>", lambda event: self.__profiles_canvas.configure(
-                scrollregion=self.__profiles_canvas.bbox("all")
-            )
-        )
-
-        # set and bind a container for canvas to put shit inside it
-        self.__canvas_frame: Frame = Frame(self.__profiles_canvas)
-        self.__canvas_frame_id: int = self.__profiles_canvas.create_window(
-            (0, 0), window=self.__canvas_frame, anchor="nw"
-        )
+        self.__list_frame: Frame = Frame(self.__frame)
+        self.__prof_scrollbar: Scrollbar = Scrollbar(self.__frame, orient=VERTICAL, command=self.__scroll)
+
+        self.__rows: list[tuple[Label, Button, Button]] = []
+        for i in range(self.ROWS):
+            label = Label(self.__list_frame, width=self.NICK_WIDTH, anchor="w")
+            ch_button = Button(self.__list_frame, text="Выбрать", command=lambda k=i: self.__choose(self.__shown[k]))
+            del_button = Button(self.__list_frame, text="Удалить", command=lambda k=i: self.__delete(self.__shown[k]))
+            label.grid(row=i, column=0, columnspan=2, pady=5, sticky="W")
+            ch_button.grid(row=i, column=2, pady=5, padx=50, sticky="E")
+            del_button.grid(row=i, column=3, pady=5, sticky="E")
+            self.__rows.append((label, ch_button, del_button))
+
+        # mouse wheel on windows / on linux
+        self.bind("<MouseWheel>", lambda event: self.__scroll('scroll', -1 if event.delta > 0 else 1, 'units'))
+        self.bind("<Button-4>", lambda event: self.__scroll('scroll', -1, 'units'))
+        self.bind("<Button-5>", lambda event: self.__scroll('scroll', 1, 'units'))
+
+        # search by beginning of nick name
+        self.__search_label: Label = Label(self.__btn_frame, text="Поиск:")
+        self.__search_var: StringVar = StringVar()
+        self.__search_var.trace_add('write', lambda *args: self.__search())
+        self.__search_entry: Entry = Entry(self.__btn_frame, textvariable=self.__search_var, width=20)
 
         self.__p_add_button: Button = Button(self.__btn_frame, text="Создать", command=self.__add_profile)
 
@@ -1258,8 +3663,10 @@ class _Profiles(Toplevel):
             self.root.db_handler.unset_current_user(current)
 
         self.root.db_handler.set_current_user(p_name)
+        self.root.on_profile_changed()
 
-        self.update_profiles()
+        self.__current = p_name
+        self.__render_rows()
 
     def __delete(self, p_name: str):
         """Delete provided username from db"""
@@ -1271,18 +3678,47 @@ class _Profiles(Toplevel):
 
         if really:
             self.root.db_handler.delete_user(p_name)
+            self.root.on_profile_changed()
             self.update_profiles()
 
-    def __clear_canvas(self):
-        for item in self.__canvas_frame.winfo_children():
-            self.__canvas_frame.nametowidget(item).destroy()
-
     def update_profiles(self):
-        """Updates profile canvas: clear->fill in with updated data"""
-        # clear canvas
-        self.__clear_canvas()
-        current = self.root.get_current_user()
+        """Updates profile list: drop loaded pages->count matching profiles->fill in visible rows"""
+        self.__pages.clear()
+        self.__total = self.root.db_handler.count_users(self.__search_var.get())
+        self.__current = self.root.get_current_user()
+        self.__top = max(0, min(self.__top, self.__total - self.ROWS))
+        self.__render_rows()
+
+    def __search(self):
+        """Show profiles matching new search from the first one"""
+        self.__top = 0
+        self.update_profiles()
+
+    def __load_page(self, n: int) -> list[str]:
+        """Get page of profiles from db, keyset of the neighbour page is used if it's loaded"""
+        prefix = self.__search_var.get()
+        if self.__pages.get(n - 1):
+            page = self.root.db_handler.get_users_page(prefix, after=self.__pages[n - 1][-1], limit=self.PAGE)
+        elif self.__pages.get(n + 1):
+            page = self.root.db_handler.get_users_page(prefix, before=self.__pages[n + 1][0], limit=self.PAGE)
+        else:
+            page = self.root.db_handler.get_users_page(prefix, offset=n * self.PAGE, limit=self.PAGE)
+
+        # forgetting the page which is the farthest from this one
+        if len(self.__pages) >= self.MAX_PAGES:
+            del self.__pages[max(self.__pages, key=lambda k: abs(k - n))]
 
+        self.__pages[n] = page
+        return page
+
+    def __get_profile(self, i: int) -> Optional[str]:
+        """Get nick name of i-th profile matching search"""
+        n, pos = divmod(i, self.PAGE)
+        page = self.__pages[n] if n in self.__pages else self.__load_page(n)
+        return page[pos] if pos < len(page) else None
+
+    def __render_rows(self):
+        """Fill in visible rows with profiles starting from top one"""
         # get and apply current theme
         dark = self.root.get_current_theme()
         if dark:
@@ -1294,27 +3730,41 @@ class _Profiles(Toplevel):
             btn_color = self.BASE_BTN_COLOR
             txt_color = self.BASE_LETTERS_COLOR
 
-        # fill canvas with profiles
-        p = self.__get_profiles()
-        for i, profile in enumerate(p):
-            if profile == current:
-                Label(
-                    self.__canvas_frame, name=f"label{i}", text=profile, bg=self.CURRENT_PROFILE, fg=txt_color
-                ).grid(row=i, column=0, columnspan=2, pady=5, sticky="W")
-            else:
-                Label(
-                    self.__canvas_frame, name=f"label{i}", text=profile, bg=lbl_color, fg=txt_color
-                ).grid(row=i, column=0, columnspan=2, pady=5, sticky="W")
+        for k, (label, ch_button, del_button) in enumerate(self.__rows):
+            profile = self.__get_profile(self.__top + k) if self.__top + k < self.__total else None
+            self.__shown[k] = profile
+            if profile is None:
+                label.grid_remove()
+                ch_button.grid_remove()
+                del_button.grid_remove()
+                continue
 
-            Button(
-                self.__canvas_frame, name=f"btn_ch{i}", text="Выбрать", command=lambda a=profile: self.__choose(a),
-                bg=btn_color, fg=txt_color
-            ).grid(row=i, column=2, pady=5, padx=50, sticky="E")
+            color = self.CURRENT_PROFILE if profile == self.__current else lbl_color
+            label.config(text=profile, bg=color, fg=txt_color)
+            ch_button.config(bg=btn_color, fg=txt_color)
+            del_button.config(bg=btn_color, fg=txt_color)
+            label.grid()
+            ch_button.grid()
+            del_button.grid()
 
-            Button(
-                self.__canvas_frame, name=f"btn_del{i}", text="Удалить", command=lambda a=profile: self.__delete(a),
-                bg=btn_color, fg=txt_color
-            ).grid(row=i, column=3, pady=5, sticky="E")
+        if self.__total:
+            self.__prof_scrollbar.set(self.__top / self.__total, (self.__top + self.ROWS) / self.__total)
+        else:
+            self.__prof_scrollbar.set(0, 1)
+
+    def __scroll(self, action: str, amount: str, what: Optional[str] = None):
+        """Scrollbar and mouse wheel handler, args are the same as for yview of tkinter widgets"""
+        if action == 'moveto':
+            top = int(float(amount) * self.__total)
+        elif what == 'pages':
+            top = self.__top + int(amount) * self.ROWS
+        else:
+            top = self.__top + int(amount)
+
+        top = max(0, min(top, self.__total - self.ROWS))
+        if top != self.__top:
+            self.__top = top
+            self.__render_rows()
 
     def __add_profile(self):
         """Create new window to add new profile"""
@@ -1324,18 +3774,15 @@ class _Profiles(Toplevel):
 
         p_window.grab_set()
 
-    def __get_profiles(self) -> list[str]:
-        users_raw = self.root.db_handler.get_users()
-        users = [item[1] for item in users_raw]
-        return users
-
     def __place(self):
         self.__frame.grid(padx=10, pady=10)
         self.__head_label.grid(row=0, column=0, padx=10, pady=10)
-        self.__profiles_canvas.grid(row=1, column=0)
+        self.__list_frame.grid(row=1, column=0, sticky="NW")
         self.__prof_scrollbar.grid(row=1, column=1, sticky="NS")
         self.__btn_frame.grid(row=2, sticky='EW')
         self.__p_add_button.grid(row=0, column=0, pady=10, sticky="W")
+        self.__search_label.grid(row=0, column=1, pady=10, sticky="E")
+        self.__search_entry.grid(row=0, column=2, pady=10, sticky="E")
 
     def set_theme(self):
         dark = self.root.get_current_theme()
@@ -1348,10 +3795,11 @@ class _Profiles(Toplevel):
         self.config(bg=bg_color)
         self.__frame.config(bg=bg_color)
         self.__btn_frame.config(bg=bg_color)
-        self.__profiles_canvas.config(bg=bg_color)
-        self.__canvas_frame.config(bg=bg_color)
+        self.__list_frame.config(bg=bg_color)
         self.__head_label.config(bg=lbl_color, fg=txt_color)
         self.__p_add_button.config(bg=btn_color, fg=txt_color)
+        self.__search_label.config(bg=lbl_color, fg=txt_color)
+        self.__search_entry.config(bg=lbl_color, fg=txt_color)
 
 
 class _ProfileGetterWindow(Toplevel):
@@ -1449,18 +3897,22 @@ class _OkCancelWindow(Toplevel):
 
         self.__lbl = Label(self, text="Загрузить последнюю игру?", font=("Arial bold", 12))
         self.__ok_btn = Button(self, text="Ок", command=self.__ok)
-        self.__cancel_btn = Button(self, text="Отмена", command=self.destroy)
+        self.__cancel_btn = Button(self, text="Отмена", command=self.__cancel)
 
         self.__lbl.grid(row=0, column=0, columnspan=3, sticky="NSEW", pady=20)
         self.__ok_btn.grid(row=1, column=0, sticky="W", ipadx=20, padx=10)
         self.__cancel_btn.grid(row=1, column=2, sticky="E", ipadx=10, padx=10)
 
-        self.protocol("WM_DELETE_WINDOW", self.destroy)
+        self.protocol("WM_DELETE_WINDOW", self.__cancel)
 
     def __ok(self):
         self.root.init_game_data()
         self.destroy()
 
+    def __cancel(self):
+        self.root.start_scheduled_game()
+        self.destroy()
+
 
 class WordleGame:
     """Wordle game
@@ -1473,3 +3925,8 @@ class WordleGame:
 
     def run(self):
         self.__wordle.run()
+
+
+# processes for hints are spawned on windows, they import this module and must not start the game
+if __name__ == '__main__':
+    WordleGame().run()
@@ -0,0 +1,44 @@
+"""Word pack import
+
+Adds word pack described by JSON file to db:
+    {
+        "name": "English, 5 letters",
+        "alphabet": "abcdefghijklmnopqrstuvwxyz",
+        "length": 5,
+        "attempts": 6,
+        "layout": "qwertyuiop|asdfghjkl|zxcvbnm",
+        "words": ["crane", "slate", ...]
+    }
+layout rows are typed with keys at the same positions of english keyboard, words of other length are skipped
+
+usage:
+    python add_pack.py pack.json [--db data.db]
+"""
+import json
+from argparse import ArgumentParser
+from Wordle import DBHandler
+
+
+def main():
+    parser = ArgumentParser(description='Add word pack to db')
+    parser.add_argument('pack', help='JSON file with pack')
+    parser.add_argument('--db', default='data.db')
+    args = parser.parse_args()
+
+    with open(args.pack, encoding='utf-8') as f:
+        pack = json.load(f)
+
+    db_handler = DBHandler(args.db)
+    pack_id = db_handler.add_pack(
+        pack['name'], pack['alphabet'], pack['length'], pack['attempts'], pack['layout'], pack['words']
+    )
+    db_handler.close()
+
+    if pack_id is None:
+        print(f"pack '{pack['name']}' already exists")
+    else:
+        print(f"pack '{pack['name']}' added with id {pack_id}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""Micro and macro benchmarks for scoring, dictionary and DBHandler hot paths
+
+Results are printed and can be written as JSON, then compared with stored baseline:
+benchmark fails if it became slower than baseline by more than threshold
+
+usage:
+    python benchmarks/bench.py                          # run and compare with benchmarks/baseline.json
+    python benchmarks/bench.py --json out.json          # also write results
+    python benchmarks/bench.py --save-baseline          # store results as new baseline
+    python benchmarks/bench.py --users 10 10000 1000000 --only add_win add_loss
+"""
+import json
+import sys
+from argparse import ArgumentParser, Namespace
+from os.path import abspath, dirname, exists, join
+from shutil import copyfile
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable
+import numpy as np
+
+ROOT: str = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Wordle import DBHandler, PatternMatrix, WordIndex, WordList, GameEngine  # noqa: E402
+from gen_db import generate  # noqa: E402
+
+BASELINE: str = join(ROOT, 'benchmarks', 'baseline.json')
+DBS_DIR: str = join(ROOT, 'benchmarks', 'dbs')
+
+
+def measure(func: Callable[[], int], repeat: int = 5) -> dict:
+    """Run func several times and take the best run
+
+    params:
+        func - does the work and returns amount of operations it made
+
+        repeat - amount of runs
+
+    return:
+        dict with ns per operation and amount of operations in one run"""
+    best, ops = float('inf'), 0
+    for _ in range(repeat):
+        t = perf_counter()
+        ops = func()
+        best = min(best, (perf_counter() - t) / ops)
+
+    return {'ns_per_op': round(best * 1e9, 1), 'ops': ops}
+
+
+def bench_scoring(words: list[str], cache_dir: str, guesses: int) -> dict:
+    """Pure python comparison and matrix lookup over pairs of the first words (as guesses) x all words (as answers)
+
+    params:
+        guesses - amount of the first words taken as guesses, 0 - all of them, so every pair is scored"""
+    patterns = PatternMatrix(words, cache_dir)
+    guesses = min(guesses, len(words)) if guesses else len(words)
+    pairs = [(words[g], words[a]) for g in range(guesses) for a in range(len(words))]
+    # answers in random order, so lookups jump over row like filtering of candidates does
+    answers = np.random.default_rng(0).permutation(len(words))
+
+    def compare():
+        for guess, answer in pairs:
+            PatternMatrix.compare(answer, guess)
+        return len(pairs)
+
+    def lookup():
+        for guess, answer in pairs:
+            patterns.states(guess, answer)
+        return len(pairs)
+
+    def matrix():
+        # patterns of all answers of guess at once, the way simulations and solver use it
+        m = patterns.matrix
+        for g in range(guesses):
+            m[g, answers]
+        return len(pairs)
+
+    return {
+        'alg_cmp_pure_python': measure(compare, 1),
+        'alg_cmp_matrix_states': measure(lookup, 1),
+        'alg_cmp_matrix_lookup': measure(matrix),
+    }
+
+
+def bench_dictionary(db: str, words: list[str]) -> dict:
+    with TemporaryDirectory() as cache_dir:
+        return _bench_dictionary(db, words, cache_dir)
+
+
+def _bench_dictionary(db: str, words: list[str], cache_dir: str) -> dict:
+    db_handler = DBHandler(db)
+    index = WordIndex(words)
+    sample = words[::7] + [word[::-1] for word in words[::7]]
+    word_list = WordList(db_handler, cache_dir)
+
+    def get_words():
+        db_handler.get_words()
+        return 1
+
+    def build_index():
+        WordIndex(words)
+        return 1
+
+    def membership():
+        for word in sample:
+            _ = word in index
+        return len(sample)
+
+    def open_word_list():
+        # compiled file already exists, so it's only validated and mmap'd
+        WordList(db_handler, cache_dir)
+        return 1
+
+    def word_list_membership():
+        for word in sample:
+            _ = word in word_list
+        return len(sample)
+
+    results = {
+        'get_words': measure(get_words),
+        'word_index_build': measure(build_index),
+        'word_index_contains': measure(membership),
+        'word_list_open': measure(open_word_list),
+        'word_list_contains': measure(word_list_membership),
+    }
+    db_handler.close()
+    return results
+
+
+def bench_state(db: str, words: list[str], rounds: int) -> dict:
+    db_handler = DBHandler(db)
+    if db_handler.current_id is None:
+        db_handler.add_user('bench')
+        db_handler.set_current_user('bench')
+
+    engine = GameEngine(words)
+    engine.replay(engine.answers[0], engine.answers[1:4])
+    state = engine.snapshot()
+
+    def round_trip():
+        for _ in range(rounds):
+            db_handler.save_state(state)
+            engine.restore(db_handler.get_state())
+        return rounds
+
+    results = {'save_state_get_state': measure(round_trip)}
+    db_handler.close()
+    return results
+
+
+def bench_users(users: int, rounds: int) -> dict:
+    """add_win and add_loss on db with provided amount of users"""
+    path = join(DBS_DIR, f'users_{users}.db')
+    if not exists(path):
+        generate(path, users)
+
+    # each run changes stats, so working on a copy keeps generated db the same
+    with TemporaryDirectory() as tmp:
+        db = join(tmp, 'bench.db')
+        copyfile(path, db)
+        return _bench_users(db, rounds, users)
+
+
+def _bench_users(db: str, rounds: int, users: int) -> dict:
+    results = {}
+    for mode, write_behind in (('', False), ('_write_behind', True)):
+        db_handler = DBHandler(db, write_behind=write_behind)
+
+        def add_win():
+            for i in range(rounds):
+                db_handler.add_win(i % 6 + 1)
+            db_handler.flush()
+            return rounds
+
+        def add_loss():
+            for _ in range(rounds):
+                db_handler.add_loss()
+            db_handler.flush()
+            return rounds
+
+        results[f'add_win{mode}[{users}]'] = measure(add_win)
+        results[f'add_loss{mode}[{users}]'] = measure(add_loss)
+        db_handler.close()
+
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Get names of benchmarks which are slower than baseline by more than threshold"""
+    slower = []
+    for name, data in results.items():
+        if name in baseline and data['ns_per_op'] > baseline[name]['ns_per_op'] * (1 + threshold):
+            slower.append(name)
+    return slower
+
+
+def run_benchmarks(args: Namespace, db: str) -> dict:
+    """Run benchmarks selected by command line arguments on provided copy of db"""
+    db_handler = DBHandler(db)
+    words = db_handler.get_words()
+    db_handler.close()
+    cache_dir = join(dirname(abspath(args.db)), 'cache')
+
+    groups = [
+        ('alg_cmp', lambda: bench_scoring(words, cache_dir, args.guesses)),
+        ('get_words word_index word_list', lambda: bench_dictionary(db, words)),
+        ('save_state', lambda: bench_state(db, words, args.rounds)),
+    ] + [
+        ('add_win add_loss', lambda users=users: bench_users(users, args.rounds)) for users in args.users
+    ]
+
+    results = {}
+    for prefixes, run in groups:
+        if args.only and not any(p.startswith(o) for p in prefixes.split() for o in args.only):
+            continue
+
+        for name, data in run().items():
+            results[name] = data
+            print(f"{name:<40}{data['ns_per_op']:>15,.1f} ns/op")
+
+    return results
+
+
+def main():
+    parser = ArgumentParser(description='Run benchmarks')
+    parser.add_argument('--db', default=join(ROOT, 'data.db'), help='db with words')
+    parser.add_argument('--users', type=int, nargs='*', default=[10, 10_000, 1_000_000],
+                        help='amount of users in synthetic dbs')
+    parser.add_argument('--guesses', type=int, default=100,
+                        help='amount of the first words scored against all words, 0 - all pairs (slow in pure python)')
+    parser.add_argument('--rounds', type=int, default=200, help='operations per run for db benchmarks')
+    parser.add_argument('--only', nargs='*', help='run only benchmarks which names start with one of these')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown, 0.2 = 20%%')
+    args = parser.parse_args()
+
+    # benchmarks write to db, so real one is never touched
+    with TemporaryDirectory() as tmp:
+        db = join(tmp, 'data.db')
+        copyfile(args.db, db)
+        results = run_benchmarks(args, db)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+        return
+
+    if exists(args.baseline):
+        with open(args.baseline) as f:
+            slower = compare(results, json.load(f), args.threshold)
+        if slower:
+            print(f"\nslower than baseline by more than {args.threshold:.0%}: {', '.join(slower)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Synthetic db generator for benchmarks
+
+Creates db with words from data.db and provided amount of users with random stats,
+one of them is current
+
+usage:
+    python benchmarks/gen_db.py 10000 -o benchmarks/dbs/users_10000.db
+"""
+import sqlite3
+import sys
+from argparse import ArgumentParser
+from os import makedirs, remove
+from os.path import abspath, dirname, exists, join
+from random import Random
+
+ROOT: str = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Wordle import DBHandler  # noqa: E402
+
+BATCH: int = 50_000  # users inserted per executemany
+
+
+def generate(path: str, users: int, source: str = join(ROOT, 'data.db'), seed: int = 0) -> str:
+    """Create db with provided amount of users
+
+    params:
+        path - where to put db, existing file is replaced
+
+        users - amount of users
+
+        source - db to copy words from
+
+        seed - seed for stats
+
+    return:
+        path to db"""
+    makedirs(dirname(abspath(path)), exist_ok=True)
+    if exists(path):
+        remove(path)
+
+    # words table is the only one DBHandler doesn't create
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE words (word TEXT)")
+    src = sqlite3.connect(source)
+    conn.executemany("INSERT INTO words (word) VALUES (?)", src.execute("SELECT word FROM words"))
+    src.close()
+    conn.commit()
+    conn.close()
+
+    # schema, indexes and migrations are the same as in real db
+    DBHandler(path).close()
+
+    rnd = Random(seed)
+    conn = sqlite3.connect(path)
+    for start in range(0, users, BATCH):
+        ids = range(start + 1, min(start + BATCH, users) + 1)
+        conn.executemany("INSERT INTO user (id, nick_name, is_current) VALUES (?, ?, 0)", (
+            (i, f'user{i:07}') for i in ids
+        ))
+
+        stats, distribution = [], []
+        for i in ids:
+            tries = [rnd.randrange(20) for _ in range(6)]
+            lost = rnd.randrange(10)
+            won = sum(tries)
+            streak = rnd.randrange(won + 1)
+            stats.append((i, won + lost, won, lost, streak, streak + rnd.randrange(won - streak + 1)))
+            distribution.append((i, *tries))
+
+        conn.executemany(
+            "INSERT INTO stats (user_id, played, games_won, games_lost, current_streak, max_streak) "
+            "VALUES (?, ?, ?, ?, ?, ?)", stats
+        )
+        conn.executemany(
+            "INSERT INTO distribution (user_id, first_try, second_try, third_try, fourth_try, fifth_try, "
+            "sixth_try) VALUES (?, ?, ?, ?, ?, ?, ?)", distribution
+        )
+        conn.executemany(
+            "INSERT INTO game_state (user_id, k_state_string, l_state_string, word) VALUES (?, '', '', '')",
+            ((i,) for i in ids)
+        )
+        conn.commit()
+
+    # user in the middle, so lookups without index have to scan half of the table
+    conn.execute("UPDATE user SET is_current = 1 WHERE id = ?", (users // 2 + 1,))
+    conn.commit()
+    conn.close()
+    return path
+
+
+def main():
+    parser = ArgumentParser(description='Generate db with synthetic users')
+    parser.add_argument('users', type=int)
+    parser.add_argument('-o', '--out', help='path to db, benchmarks/dbs/users_<amount>.db by default')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    path = args.out or join(ROOT, 'benchmarks', 'dbs', f'users_{args.users}.db')
+    print(generate(path, args.users, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""Load generator for game server
+
+Starts server.py on a copy of db (or uses already running one) and opens many concurrent connections,
+each plays games with random words until it's done. Latency of every request is measured on client side
+
+usage:
+    python benchmarks/loadgen.py                                   # 1000 http clients, 3 games each
+    python benchmarks/loadgen.py --clients 5000 --games 2 --mode ws
+    python benchmarks/loadgen.py --max-memory 0.1                  # most games are spilled to db and loaded back
+    python benchmarks/loadgen.py --port 8080 --no-spawn            # server is already running
+"""
+import asyncio
+import json
+import subprocess
+import sys
+from argparse import ArgumentParser, Namespace
+from base64 import b64encode
+from os import urandom
+from os.path import abspath, dirname, join
+from random import Random
+from shutil import copyfile
+from statistics import quantiles
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+ROOT: str = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from Wordle import DBHandler  # noqa: E402
+
+
+class HTTPClient:
+    """Keep-alive http connection"""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.__reader: asyncio.StreamReader = reader
+        self.__writer: asyncio.StreamWriter = writer
+
+    async def request(self, op: str, params: dict) -> dict:
+        if op == 'new':
+            method, path = 'POST', '/games'
+        elif op == 'stats':
+            method, path = 'GET', '/stats'
+        elif op == 'state':
+            method, path = 'GET', f"/games/{params['game']}"
+        else:
+            method, path = 'POST', f"/games/{params['game']}/guess"
+
+        body = json.dumps(params, ensure_ascii=False).encode()
+        self.__writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: loadgen\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await self.__writer.drain()
+
+        head = await self.__reader.readuntil(b'\r\n\r\n')
+        length = 0
+        for line in head.decode('latin-1').split('\r\n')[1:]:
+            key, _, value = line.partition(':')
+            if key.strip().lower() == 'content-length':
+                length = int(value)
+        return json.loads(await self.__reader.readexactly(length))
+
+    def close(self):
+        self.__writer.close()
+
+
+class WSClient:
+    """Websocket connection, client frames are masked as RFC 6455 requires"""
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.__reader: asyncio.StreamReader = reader
+        self.__writer: asyncio.StreamWriter = writer
+
+    async def handshake(self):
+        key = b64encode(urandom(16)).decode()
+        self.__writer.write(
+            f"GET /ws HTTP/1.1\r\nHost: loadgen\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode()
+        )
+        await self.__writer.drain()
+        await self.__reader.readuntil(b'\r\n\r\n')
+
+    async def request(self, op: str, params: dict) -> dict:
+        data = json.dumps({'op': op, **params}, ensure_ascii=False).encode()
+        length = len(data)
+        mask = urandom(4)
+        key = int.from_bytes((mask * (length // 4 + 1))[:length], 'little')
+        masked = (int.from_bytes(data, 'little') ^ key).to_bytes(length, 'little')
+        if length < 126:
+            head = bytes((0x81, 0x80 | length))
+        else:
+            head = bytes((0x81, 0x80 | 126)) + length.to_bytes(2, 'big')
+        self.__writer.write(head + mask + masked)
+        await self.__writer.drain()
+
+        _, b2 = await self.__reader.readexactly(2)
+        length = b2 & 0x7F
+        if length == 126:
+            length = int.from_bytes(await self.__reader.readexactly(2), 'big')
+        elif length == 127:
+            length = int.from_bytes(await self.__reader.readexactly(8), 'big')
+        return json.loads(await self.__reader.readexactly(length))
+
+    def close(self):
+        self.__writer.close()
+
+
+async def client(number: int, host: str, port: int, mode: str, games: int, words: list[str],
+                 latencies: list[float]):
+    """Play games on one connection, every request latency is appended to latencies"""
+    rnd = Random(number)
+    reader, writer = await asyncio.open_connection(host, port)
+    conn = HTTPClient(reader, writer) if mode == 'http' else WSClient(reader, writer)
+    if mode == 'ws':
+        await conn.handshake()
+
+    async def timed(op: str, params: dict) -> dict:
+        t = perf_counter()
+        response = await conn.request(op, params)
+        latencies.append(perf_counter() - t)
+        return response
+
+    try:
+        for i in range(games):
+            # half of games are saved to stats of user, other half is anonymous
+            params = {'user': f'load{number:06}'} if i % 2 == 0 else {}
+            game = (await timed('new', params))['game']
+            finished = False
+            while not finished:
+                finished = (await timed('guess', {'game': game, 'word': rnd.choice(words)}))['finished']
+    finally:
+        conn.close()
+
+
+async def run(host: str, port: int, mode: str, clients: int, games: int, words: list[str]) -> dict:
+    latencies: list[float] = []
+    t = perf_counter()
+    results = await asyncio.gather(
+        *[client(i, host, port, mode, games, words, latencies) for i in range(clients)], return_exceptions=True
+    )
+    elapsed = perf_counter() - t
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    q = quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+
+    # session store counters of server
+    reader, writer = await asyncio.open_connection(host, port)
+    conn = HTTPClient(reader, writer)
+    stats = await conn.request('stats', {})
+    conn.close()
+
+    return {
+        'mode': mode, 'clients': clients, 'requests': len(latencies), 'errors': len(errors),
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(q[49] * 1000, 2), 'p99_ms': round(q[98] * 1000, 2),
+        'max_ms': round(max(latencies, default=0) * 1000, 2),
+        'server': stats,
+    }
+
+
+def run_load(args: Namespace, db: str) -> dict:
+    """Spawn server on provided db copy unless it's already running and put load on it"""
+    db_handler = DBHandler(db)
+    words = [word for word in db_handler.get_words() if len(word) == 5]
+    db_handler.close()
+
+    server = None
+    if not args.no_spawn:
+        server = subprocess.Popen(
+            [sys.executable, join(ROOT, 'server.py'), '--db', db, '--host', args.host, '--port', str(args.port),
+             '--max-memory', str(args.max_memory)],
+            stdout=subprocess.PIPE, text=True
+        )
+        # server prints a line once it listens
+        server.stdout.readline()
+
+    try:
+        return asyncio.run(run(args.host, args.port, args.mode, args.clients, args.games, words))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = ArgumentParser(description='Measure game server latency under many concurrent clients')
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--games', type=int, default=3, help='games per client')
+    parser.add_argument('--mode', choices=('http', 'ws'), default='http')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--db', default=join(ROOT, 'data.db'), help='db with words, server works on its copy')
+    parser.add_argument('--no-spawn', action='store_true', help="don't start server, use running one")
+    parser.add_argument('--max-memory', type=float, default=64, help='memory cap of spawned server, MB')
+    args = parser.parse_args()
+
+    # server writes stats, so real db is never touched, its copy and server cache are removed at the end
+    with TemporaryDirectory() as tmp:
+        db = join(tmp, 'data.db')
+        copyfile(args.db, db)
+        results = run_load(args, db)
+
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+"""Stats recomputation
+
+Rebuilds stats and distribution of every profile which has games history, stats of other profiles
+are left untouched. Games are streamed by chunks, so it works in constant memory on any amount of games
+
+usage:
+    python rebuild_stats.py [--db data.db] [--chunk 10000]
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+from Wordle import DBHandler
+
+
+def main():
+    parser = ArgumentParser(description='Rebuild stats and distribution from games history')
+    parser.add_argument('--db', default='data.db')
+    parser.add_argument('--chunk', type=int, default=10_000, help='amount of games fetched at once')
+    args = parser.parse_args()
+
+    db_handler = DBHandler(args.db)
+    t = perf_counter()
+    games = db_handler.rebuild_stats(args.chunk)
+    db_handler.close()
+    print(f'{games} games processed in {perf_counter() - t:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
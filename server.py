@@ -0,0 +1,616 @@
+"""Network game server
+
+Serves headless games to many players at once from one asyncio event loop, without thread per client.
+Guesses are scored by GameEngine (same rules as in the window), finished games go to db through DBHandler,
+every db call runs on a single worker thread, so event loop never waits for sqlite
+
+HTTP, JSON bodies and responses, keep-alive connections:
+    POST /games                 {"user": "nick"} -> new game, anonymous games (without user) aren't saved
+    GET  /games/<id>            -> state of game
+    POST /games/<id>/guess      {"word": "..."} -> result of guess, finished games are forgotten after it
+    GET  /stats                 -> amount of games in memory, memory used, hit, miss and eviction counters
+
+WebSocket on /ws, one JSON text frame per request, same requests as above,
+"id" of request (if any) is sent back with response:
+    {"op": "new", "user": "nick"}, {"op": "state", "game": 1}, {"op": "guess", "game": 1, "word": "..."},
+    {"op": "stats"}
+
+games are kept in memory up to memory cap, least recently used ones are spilled to db and loaded back
+on their next request, games in memory are spilled on shutdown as well, so they survive restart.
+Spilled games which weren't requested for --session-ttl days are deleted
+
+usage:
+    python server.py [--host 127.0.0.1] [--port 8080] [--db data.db] [--pack 1] [--max-memory 64] [--session-ttl 7]
+"""
+import asyncio
+import json
+import signal
+import sys
+from argparse import ArgumentParser
+from base64 import b64encode
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import sha1
+from os.path import join, dirname, abspath
+from struct import Struct
+from time import time
+from typing import Callable, Optional
+from Wordle import DBHandler, WordList, GameEngine
+
+MAX_BODY: int = 64 * 1024  # bigger requests and frames are rejected
+
+# RFC 6455: guid is appended to client key in handshake, frame lengths are big endian
+WS_GUID: bytes = b'258EAFA5-E914-47DA-95CA-C5AB0DC11B65'
+WS_TEXT: int = 0x1
+WS_CLOSE: int = 0x8
+WS_PING: int = 0x9
+WS_PONG: int = 0xA
+U16: Struct = Struct('>H')
+U64: Struct = Struct('>Q')
+
+# submit() result: name in responses
+RESULTS: dict[int, str] = {
+    GameEngine.INACTIVE: 'finished',
+    GameEngine.NOT_FULL: 'not_full',
+    GameEngine.NOT_IN_DICT: 'not_in_dict',
+    GameEngine.ACCEPTED: 'accepted',
+}
+
+REASONS: dict[int, str] = {
+    101: 'Switching Protocols', 200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found',
+    413: 'Payload Too Large',
+}
+
+
+class RequestError(Exception):
+    """Request can't be served, status is sent to client"""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status: int = status
+
+
+class _Session:
+    """Game of one player, kept as snapshot, so thousands of them take little memory"""
+    __slots__ = ('user_id', 'state')
+
+    def __init__(self, user_id: Optional[int], state: bytes):
+        self.user_id: Optional[int] = user_id
+        self.state: bytes = state
+
+
+class SessionStore:
+    """Games in progress with memory cap
+
+    games are kept in LRU order, when memory cap is exceeded least recently used ones are spilled
+    to game_state table and loaded back on next request. Memory of game is estimated
+    as size of its record and snapshot plus ENTRY_SIZE"""
+
+    # dict entry, LRU links and int key, counted for each game on top of its record
+    ENTRY_SIZE: int = 120
+
+    def __init__(self, db_handler: DBHandler, db_worker: ThreadPoolExecutor, pack_id: int,
+                 max_bytes: int = 64 * 1024 * 1024):
+        """params:
+            db_handler - db to spill games to
+
+            db_worker - thread which runs db calls
+
+            pack_id - word pack of games
+
+            max_bytes - memory cap"""
+        self.__db_handler: DBHandler = db_handler
+        self.__db_worker: ThreadPoolExecutor = db_worker
+        self.__pack_id: int = pack_id
+        self.__max_bytes: int = max_bytes
+        self.__bytes: int = 0
+        self.__sessions: OrderedDict[int, _Session] = OrderedDict()  # game id: session, least recent first
+        # game id: load from db in progress, so concurrent requests of spilled game share it
+        self.__loading: dict[int, asyncio.Future] = {}
+
+        self.hits: int = 0  # game was in memory
+        self.misses: int = 0  # game was loaded from db (or wasn't found anywhere)
+        self.evictions: int = 0  # game was spilled to db
+
+    def __len__(self) -> int:
+        return len(self.__sessions)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'sessions': len(self.__sessions), 'memory': self.__bytes, 'max_memory': self.__max_bytes,
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+        }
+
+    def __size(self, session: _Session) -> int:
+        return self.ENTRY_SIZE + sys.getsizeof(session) + sys.getsizeof(session.state)
+
+    def add(self, game: int, session: _Session):
+        """Put game in memory as the most recent one, least recent ones are spilled if cap is exceeded"""
+        self.__sessions[game] = session
+        self.__bytes += self.__size(session)
+        self.__evict()
+
+    def update(self, game: int, state: bytes):
+        """Replace snapshot of game which is in memory"""
+        session = self.__sessions[game]
+        self.__bytes -= self.__size(session)
+        session.state = state
+        self.__bytes += self.__size(session)
+        self.__evict()
+
+    def remove(self, game: int):
+        """Forget game which is in memory"""
+        self.__bytes -= self.__size(self.__sessions.pop(game))
+
+    async def get(self, game: int) -> Optional[_Session]:
+        """Get game from memory or load it from db, None if there is no such game"""
+        session = self.__sessions.get(game)
+        if session is not None:
+            self.__sessions.move_to_end(game)
+            self.hits += 1
+            return session
+
+        load = self.__loading.get(game)
+        if load is None:
+            self.misses += 1
+            # spill of this game (if any) is queued on the same thread before, so it's already in db
+            load = self.__loading[game] = asyncio.get_running_loop().run_in_executor(
+                self.__db_worker, self.__db_handler.take_session, self.__pack_id, game
+            )
+        try:
+            row = await load
+        finally:
+            # failed load isn't kept either, so next request of game tries again
+            self.__loading.pop(game, None)
+
+        # the first of waiting requests puts game in memory, others find it there
+        session = self.__sessions.get(game)
+        if session is None and row:
+            session = _Session(*row)
+            self.add(game, session)
+        return session
+
+    def __evict(self):
+        if self.__bytes <= self.__max_bytes:
+            return
+
+        spilled = []
+        # the most recent game stays even if it alone exceeds cap
+        while self.__bytes > self.__max_bytes and len(self.__sessions) > 1:
+            game, session = self.__sessions.popitem(last=False)
+            self.__bytes -= self.__size(session)
+            spilled.append((game, session.user_id, session.state))
+
+        self.evictions += len(spilled)
+        # nobody waits for spill, it's only queued
+        self.__db_worker.submit(self.__db_handler.spill_sessions, self.__pack_id, spilled)
+
+    def spill_all(self):
+        """Queue spill of all games in memory, used on shutdown"""
+        spilled = [(game, session.user_id, session.state) for game, session in self.__sessions.items()]
+        self.__sessions.clear()
+        self.__bytes = 0
+        self.__db_worker.submit(self.__db_handler.spill_sessions, self.__pack_id, spilled)
+
+
+class GameServer:
+    """Games of all players
+
+    single engine is shared by all games: game is restored from snapshot, played and snapshotted again.
+    Handlers don't await in between, so event loop never switches to another game in the middle"""
+
+    # game ids are reserved in db by blocks, so only one of that many new games waits for db
+    ID_BLOCK: int = 1000
+    # how often (s) spilled games which outlived their ttl are deleted
+    EXPIRE_INTERVAL: int = 3600
+
+    def __init__(self, db_handler: DBHandler, cache_dir: str, pack_id: int = 1, max_bytes: int = 64 * 1024 * 1024,
+                 session_ttl: float = 7 * 24 * 3600):
+        """params:
+            db_handler - db with word packs, finished games are saved to it
+
+            cache_dir - directory with compiled word lists
+
+            pack_id - word pack to play
+
+            max_bytes - memory cap for games in progress, least recently used ones are spilled to db
+
+            session_ttl - seconds after which spilled game which wasn't requested is deleted"""
+        pack = db_handler.get_pack(pack_id)
+        if not pack:
+            raise ValueError(f"No word pack with id {pack_id}")
+
+        _, _, alphabet, self.__length, self.__attempts, _ = pack
+        self.__alphabet: str = alphabet
+        self.__db_handler: DBHandler = db_handler
+        # one thread, so db calls are serialized and sqlite is never touched by event loop
+        self.__db_worker: ThreadPoolExecutor = ThreadPoolExecutor(1, thread_name_prefix='db')
+
+        words = WordList(db_handler, join(cache_dir, f'pack_{pack_id}'), pack_id)
+        # compiled list is searched directly, so start doesn't depend on dictionary size
+        self.__engine: GameEngine = GameEngine(words, None, None, self.__length, self.__attempts, alphabet)
+        self.__sessions: SessionStore = SessionStore(db_handler, self.__db_worker, pack_id, max_bytes)
+        self.__pack_id: int = pack_id
+        # reserved game ids are [next, last], ids are never given twice, even after restart
+        self.__next_id: int = 1
+        self.__last_id: int = 0
+        self.__id_lock: asyncio.Lock = asyncio.Lock()
+        self.__session_ttl: float = session_ttl
+        # nick name: user id, so only first game of user waits for db
+        self.__user_ids: dict[str, int] = {}
+
+    @property
+    def sessions(self) -> SessionStore:
+        """Games in progress"""
+        return self.__sessions
+
+    async def __db(self, func: Callable, *args):
+        """Run db call on worker thread and wait for its result without blocking event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self.__db_worker, func, *args)
+
+    async def __new_id(self) -> int:
+        # only one request reserves next block, others wait for it
+        async with self.__id_lock:
+            if self.__next_id > self.__last_id:
+                self.__last_id = await self.__db(self.__db_handler.reserve_session_ids, self.__pack_id, self.ID_BLOCK)
+                self.__next_id = self.__last_id - self.ID_BLOCK + 1
+
+            game = self.__next_id
+            self.__next_id += 1
+            return game
+
+    def __get_user_id(self, user: str) -> int:
+        # runs on worker thread
+        self.__db_handler.add_user(user)
+        return self.__db_handler.get_user_id(user)
+
+    async def __restore(self, game: int) -> _Session:
+        session = await self.__sessions.get(game)
+        if session is None:
+            raise RequestError(404, f"No game {game}")
+
+        self.__engine.restore(session.state)
+        return session
+
+    def __describe(self, game: int) -> dict:
+        engine = self.__engine
+        guesses = engine.guesses
+        data = {
+            'game': game, 'guesses': guesses, 'states': [row.states for row in engine.rows[:len(guesses)]],
+            'finished': engine.finished, 'won': engine.won,
+        }
+        if engine.finished:
+            data['word'] = engine.word
+        return data
+
+    async def new_game(self, user: Optional[str] = None) -> dict:
+        """Start new game, it's saved to stats of user if provided (user is created if needed)"""
+        if user is not None and (not isinstance(user, str) or not user.strip()):
+            raise RequestError(400, "Wrong user")
+
+        user_id = None
+        if user:
+            user = user.strip()
+            user_id = self.__user_ids.get(user)
+            if user_id is None:
+                user_id = self.__user_ids[user] = await self.__db(self.__get_user_id, user)
+
+        game = await self.__new_id()
+        self.__engine.new_game()
+        self.__sessions.add(game, _Session(user_id, self.__engine.snapshot()))
+        return {'game': game, 'length': self.__length, 'attempts': self.__attempts}
+
+    async def state(self, game: int) -> dict:
+        """Get guesses and their states of game"""
+        await self.__restore(game)
+        return self.__describe(game)
+
+    async def guess(self, game: int, word: str) -> dict:
+        """Submit word in game"""
+        if not isinstance(word, str) or len(word) != self.__length:
+            raise RequestError(400, f"Word must have {self.__length} letters")
+
+        session = await self.__restore(game)
+        engine = self.__engine
+        word = word.lower()
+        if any(ltr not in self.__alphabet for ltr in word):
+            result = GameEngine.NOT_IN_DICT
+        else:
+            result = engine.play(word)
+
+        data = self.__describe(game)
+        data['result'] = RESULTS[result]
+        if result != GameEngine.ACCEPTED:
+            return data
+
+        if engine.finished:
+            self.__sessions.remove(game)
+            # nobody waits for stats, so write is only queued
+            if session.user_id is not None:
+                if engine.won:
+                    self.__db_worker.submit(self.__db_handler.add_win, engine.cur_row, engine.word, session.user_id)
+                else:
+                    self.__db_worker.submit(
+                        self.__db_handler.add_loss, engine.word, len(engine.guesses), session.user_id
+                    )
+        else:
+            self.__sessions.update(game, engine.snapshot())
+        return data
+
+    async def request(self, op: str, params: dict) -> tuple[int, dict]:
+        """Serve request of any transport
+
+        params:
+            op - one of new, state, guess
+
+            params - request body
+
+        return:
+            tuple (status, response)"""
+        try:
+            if op == 'new':
+                return 201, await self.new_game(params.get('user'))
+            if op == 'stats':
+                return 200, self.__sessions.stats
+
+            game = params.get('game')
+            if not isinstance(game, int):
+                raise RequestError(400, "Wrong game")
+            if op == 'state':
+                return 200, await self.state(game)
+            if op == 'guess':
+                return 200, await self.guess(game, params.get('word'))
+
+            raise RequestError(404, f"Unknown op {op}")
+        except RequestError as e:
+            return e.status, {'error': str(e)}
+
+    async def __http(self, method: str, path: str, body: bytes) -> tuple[int, dict]:
+        try:
+            params = json.loads(body) if body else {}
+        except ValueError:
+            params = None
+        if not isinstance(params, dict):
+            return 400, {'error': "Body must be JSON object"}
+
+        parts = path.split('?')[0].strip('/').split('/')
+        if method == 'POST' and parts == ['games']:
+            return await self.request('new', params)
+        if method == 'GET' and parts == ['stats']:
+            return await self.request('stats', params)
+
+        if len(parts) >= 2 and parts[0] == 'games' and parts[1].isdigit():
+            params['game'] = int(parts[1])
+            if method == 'GET' and len(parts) == 2:
+                return await self.request('state', params)
+            if method == 'POST' and parts[2:] == ['guess']:
+                return await self.request('guess', params)
+
+        return 404, {'error': f"No route {method} {path}"}
+
+    @staticmethod
+    def __response(status: int, data: dict, keep_alive: bool) -> bytes:
+        payload = json.dumps(data, ensure_ascii=False).encode()
+        head = (
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+        )
+        if not keep_alive:
+            head += "Connection: close\r\n"
+        return (head + "\r\n").encode() + payload
+
+    async def __client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests of one connection until it's closed"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, path, version = lines[0].split(' ')
+                except ValueError:
+                    writer.write(self.__response(400, {'error': "Wrong request line"}, False))
+                    await writer.drain()
+                    return
+
+                headers = {}
+                for line in lines[1:]:
+                    key, _, value = line.partition(':')
+                    headers[key.strip().lower()] = value.strip()
+
+                if headers.get('upgrade', '').lower() == 'websocket':
+                    await self.__websocket(reader, writer, headers)
+                    return
+
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    writer.write(self.__response(400, {'error': "Wrong Content-Length"}, False))
+                    await writer.drain()
+                    return
+                if length > MAX_BODY:
+                    writer.write(self.__response(413, {'error': "Body is too large"}, False))
+                    await writer.drain()
+                    return
+
+                body = await reader.readexactly(length) if length else b''
+                status, data = await self.__http(method, path, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                writer.write(self.__response(status, data, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+        except asyncio.CancelledError:
+            # server is stopped, connection task ends quietly instead of being reported by asyncio
+            return
+        finally:
+            writer.close()
+
+    @staticmethod
+    def __frame(opcode: int, data: bytes) -> bytes:
+        """Make unmasked websocket frame, server frames are never masked"""
+        length = len(data)
+        if length < 126:
+            head = bytes((0x80 | opcode, length))
+        elif length < 1 << 16:
+            head = bytes((0x80 | opcode, 126)) + U16.pack(length)
+        else:
+            head = bytes((0x80 | opcode, 127)) + U64.pack(length)
+        return head + data
+
+    @staticmethod
+    async def __read_frame(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+        """Read one websocket frame, fragmented messages are not supported
+
+        return:
+            tuple (opcode, unmasked payload)"""
+        b1, b2 = await reader.readexactly(2)
+        length = b2 & 0x7F
+        if length == 126:
+            length = U16.unpack(await reader.readexactly(2))[0]
+        elif length == 127:
+            length = U64.unpack(await reader.readexactly(8))[0]
+        if length > MAX_BODY:
+            raise RequestError(413, "Frame is too large")
+
+        mask = await reader.readexactly(4) if b2 & 0x80 else b''
+        data = await reader.readexactly(length)
+        if mask and length:
+            # xor of whole payload at once instead of byte by byte
+            key = int.from_bytes((mask * (length // 4 + 1))[:length], 'little')
+            data = (int.from_bytes(data, 'little') ^ key).to_bytes(length, 'little')
+        return b1 & 0x0F, data
+
+    async def __websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: dict):
+        key = headers.get('sec-websocket-key')
+        if not key:
+            writer.write(self.__response(400, {'error': "No Sec-WebSocket-Key"}, False))
+            await writer.drain()
+            return
+
+        accept = b64encode(sha1(key.encode() + WS_GUID).digest()).decode()
+        writer.write(
+            f"HTTP/1.1 101 {REASONS[101]}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n".encode()
+        )
+        await writer.drain()
+
+        while True:
+            try:
+                opcode, data = await self.__read_frame(reader)
+            except RequestError:
+                writer.write(self.__frame(WS_CLOSE, (1009).to_bytes(2, 'big')))
+                await writer.drain()
+                return
+
+            if opcode == WS_CLOSE:
+                writer.write(self.__frame(WS_CLOSE, data[:2]))
+                await writer.drain()
+                return
+            if opcode == WS_PING:
+                writer.write(self.__frame(WS_PONG, data))
+                await writer.drain()
+                continue
+            if opcode != WS_TEXT:
+                continue
+
+            try:
+                message = json.loads(data)
+            except ValueError:
+                message = None
+            if isinstance(message, dict):
+                status, response = await self.request(message.get('op'), message)
+                if 'id' in message:
+                    response['id'] = message['id']
+            else:
+                status, response = 400, {'error': "Message must be JSON object"}
+
+            response['status'] = status
+            writer.write(self.__frame(WS_TEXT, json.dumps(response, ensure_ascii=False).encode()))
+            await writer.drain()
+
+    async def serve(self, host: str = '127.0.0.1', port: int = 8080, ready: Optional[Callable] = None):
+        """Accept connections until cancelled
+
+        params:
+            host, port - address to listen on
+
+            ready - called with bound port once server listens"""
+        server = await asyncio.start_server(self.__client, host, port, limit=MAX_BODY, backlog=4096)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[1])
+
+        expiry = asyncio.create_task(self.__expire_sessions())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            expiry.cancel()
+
+    async def __expire_sessions(self):
+        while True:
+            # nobody waits for deletion, it's only queued
+            self.__db_worker.submit(
+                self.__db_handler.expire_sessions, self.__pack_id, time() - self.__session_ttl
+            )
+            await asyncio.sleep(self.EXPIRE_INTERVAL)
+
+    def close(self):
+        """Spill games in memory and wait for queued db calls, db itself is closed by its owner"""
+        self.__sessions.spill_all()
+        self.__db_worker.shutdown(wait=True)
+
+
+async def run(game_server: GameServer, host: str, port: int):
+    """Serve until ctrl+c or terminate, queued stats are written after it"""
+    task = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, task.cancel)
+        except NotImplementedError:
+            # windows, ctrl+c raises KeyboardInterrupt there
+            pass
+
+    try:
+        await game_server.serve(host, port, lambda bound: print(f'listening on {host}:{bound}', flush=True))
+    except asyncio.CancelledError:
+        pass
+
+
+def main():
+    parser = ArgumentParser(description='Serve wordle games over HTTP and WebSocket')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--db', default='data.db')
+    parser.add_argument('--pack', type=int, default=1, help='id of word pack')
+    parser.add_argument('--max-memory', type=float, default=64, help='memory cap for games in progress, MB')
+    parser.add_argument('--session-ttl', type=float, default=7,
+                        help='days after which spilled game which was not requested is deleted')
+    args = parser.parse_args()
+
+    # mutations are committed in batches, so finished games don't wait for disk one by one
+    db_handler = DBHandler(args.db, write_behind=True)
+    game_server = GameServer(
+        db_handler, join(dirname(abspath(args.db)), 'cache'), args.pack, int(args.max_memory * 1024 * 1024),
+        args.session_ttl * 24 * 3600
+    )
+    try:
+        asyncio.run(run(game_server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        game_server.close()
+        db_handler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Batch game simulator
+
+Plays games headlessly with GameEngine across all cores and streams results to JSONL
+
+usage:
+    python simulate.py --all --strategy random --out results.jsonl
+    python simulate.py -n 10000 --strategy my_module:my_strategy --workers 4
+"""
+import json
+from argparse import ArgumentParser
+from importlib import import_module
+from multiprocessing import Pool, cpu_count
+from os.path import join, dirname, abspath
+from random import Random
+from typing import Callable, Optional
+import numpy as np
+from Wordle import DBHandler, PatternMatrix, WordIndex, GameEngine
+
+# strategy gets engine with current game, indexes of words which are still possible and patterns matrix,
+# and returns next word to try. It must be importable by name, since it's loaded in each worker process
+Strategy = Callable[[GameEngine, np.ndarray, PatternMatrix, Random], str]
+
+# same column names as in distribution table
+DISTRIBUTION_KEYS: list[str] = ['first_try', 'second_try', 'third_try', 'fourth_try', 'fifth_try', 'sixth_try']
+
+
+def random_strategy(engine: GameEngine, candidates: np.ndarray, patterns: PatternMatrix, rnd: Random) -> str:
+    """Random word which is consistent with all painted rows"""
+    return patterns.words[candidates[rnd.randrange(len(candidates))]]
+
+
+def first_strategy(engine: GameEngine, candidates: np.ndarray, patterns: PatternMatrix, rnd: Random) -> str:
+    """First word (in dictionary order) which is consistent with all painted rows"""
+    return patterns.words[candidates[0]]
+
+
+STRATEGIES: dict[str, Strategy] = {
+    'random': random_strategy,
+    'first': first_strategy,
+}
+
+
+def load_strategy(name: str) -> Strategy:
+    """Get strategy by its name or by 'module:function' path
+
+    raises:
+        ValueError - there is no such strategy"""
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+
+    module, _, func = name.partition(':')
+    if not func:
+        raise ValueError(f"Unknown strategy: {name}")
+
+    try:
+        return getattr(import_module(module), func)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"Can't load strategy {name}: {e}") from e
+
+
+# per-process state, filled by _init_worker
+_worker: dict = {}
+
+
+def _init_worker(words: list[str], cache_dir: str, strategy: str, seed: int):
+    # matrix is already built by parent, so it's only mmap'd here and shared between processes by os
+    patterns = PatternMatrix(words, cache_dir)
+    index = WordIndex(words)
+    _worker['patterns'] = patterns
+    _worker['engine'] = GameEngine(words, index, patterns)
+    _worker['strategy'] = load_strategy(strategy)
+    _worker['seed'] = seed
+
+
+def play(task: tuple[int, str]) -> dict:
+    """Play single game in worker process
+
+    params:
+        task - (game number, word to guess)
+
+    return:
+        dict with game result"""
+    number, word = task
+    engine: GameEngine = _worker['engine']
+    patterns: PatternMatrix = _worker['patterns']
+    strategy: Strategy = _worker['strategy']
+    # every game has its own random, so results don't depend on how games are spread between workers
+    rnd = Random(_worker['seed'] * 1_000_003 + number)
+
+    engine.new_game(word)
+    answer = patterns.index(word)
+    candidates = np.arange(len(patterns.words))
+    while not engine.finished:
+        guess = strategy(engine, candidates, patterns, rnd)
+        for ltr in guess:
+            engine.type_letter(ltr)
+
+        if engine.submit() != GameEngine.ACCEPTED:
+            # strategy gave word which is not in dictionary, game can't go on
+            break
+
+        # leaving only words which would give the same pattern
+        g = patterns.index(guess)
+        candidates = candidates[patterns.matrix[g, candidates] == patterns.matrix[g, answer]]
+
+    return {
+        'game': number, 'word': word, 'won': engine.won,
+        'attempts': len(engine.guesses), 'guesses': engine.guesses,
+    }
+
+
+def simulate(words: list[str], cache_dir: str, strategy: str = 'random', games: Optional[int] = None,
+             workers: Optional[int] = None, out: Optional[str] = None, seed: int = 0) -> dict:
+    """Play games in process pool
+
+    params:
+        words - dictionary
+
+        cache_dir - directory with patterns matrix
+
+        strategy - strategy name or 'module:function' path
+
+        games - amount of games with random words, every word to guess is played once if not provided
+
+        workers - amount of processes, all cores are used if not provided
+
+        out - path to JSONL file for per-game results
+
+        seed - seed for words choice and strategy
+
+    return:
+        dict with aggregate stats in the same shape as stats and distribution tables"""
+    # workers load strategy in initializer, where error would make pool respawn them forever
+    load_strategy(strategy)
+
+    # building matrix once here, workers only load it
+    PatternMatrix(words, cache_dir)
+    answers = GameEngine(words).answers
+    if games is None:
+        tasks = list(enumerate(answers))
+    else:
+        rnd = Random(seed)
+        tasks = [(i, answers[rnd.randrange(len(answers))]) for i in range(games)]
+
+    total = {'played': 0, 'games_won': 0, 'games_lost': 0}
+    total.update(dict.fromkeys(DISTRIBUTION_KEYS, 0))
+
+    workers = workers or cpu_count()
+    f = open(out, 'w', encoding='utf-8') if out else None
+    try:
+        with Pool(workers, _init_worker, (words, cache_dir, strategy, seed)) as pool:
+            chunk = max(1, len(tasks) // (workers * 16))
+            for result in pool.imap_unordered(play, tasks, chunksize=chunk):
+                total['played'] += 1
+                if result['won']:
+                    total['games_won'] += 1
+                    total[DISTRIBUTION_KEYS[result['attempts'] - 1]] += 1
+                else:
+                    total['games_lost'] += 1
+
+                if f:
+                    f.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        if f:
+            f.close()
+
+    return total
+
+
+def main():
+    parser = ArgumentParser(description='Play wordle games headlessly')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('-n', '--games', type=int, help='amount of games with random words')
+    group.add_argument('--all', action='store_true', help='play every word once (default)')
+    parser.add_argument('--strategy', default='random', help=f"one of {', '.join(STRATEGIES)} or module:function")
+    parser.add_argument('--workers', type=int, help='amount of processes, all cores by default')
+    parser.add_argument('--out', help='JSONL file for per-game results')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--db', default='data.db')
+    args = parser.parse_args()
+
+    db_handler = DBHandler(args.db)
+    words = db_handler.get_words()
+    db_handler.close()
+
+    try:
+        load_strategy(args.strategy)
+    except ValueError as e:
+        parser.error(str(e))
+
+    cache_dir = join(dirname(abspath(args.db)), 'cache')
+    total = simulate(words, cache_dir, args.strategy, args.games, args.workers, args.out, args.seed)
+    print(json.dumps(total, indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Cold start measurement
+
+Imports Wordle in fresh interpreters and prints median time and peak memory,
+then does the same with matplotlib loaded on top (what opening statistics window costs)
+
+usage:
+    python startup_time.py [-n 10]
+"""
+import json
+import subprocess
+import sys
+from argparse import ArgumentParser
+from statistics import median
+
+# runs in child process, prints time of imports and peak rss
+CHILD: str = """
+import json, resource, sys, time
+t = time.perf_counter()
+import Wordle
+if sys.argv[1] == 'matplotlib':
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+elapsed = time.perf_counter() - t
+# ru_maxrss is in kilobytes on linux
+print(json.dumps({'time': elapsed, 'rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def measure(what: str, runs: int) -> dict:
+    """Get median import time (ms) and peak memory (MB) over several fresh processes"""
+    times, rss = [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', CHILD, what], capture_output=True, text=True, check=True)
+        data = json.loads(out.stdout)
+        times.append(data['time'] * 1000)
+        rss.append(data['rss'] / 1024)
+
+    return {'time_ms': round(median(times), 1), 'peak_mb': round(median(rss), 1)}
+
+
+def main():
+    parser = ArgumentParser(description='Measure cold start of Wordle module')
+    parser.add_argument('-n', '--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    results = {
+        'import Wordle': measure('wordle', args.runs),
+        'import Wordle + matplotlib': measure('matplotlib', args.runs),
+    }
+    for name, data in results.items():
+        print(f"{name:<30}{data['time_ms']:>10} ms{data['peak_mb']:>10} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+"""Solver tournament
+
+Plays every answer of dictionary with several strategies across all cores and compares them by average
+amount of guesses, failure rate and worst case. Result of every game is cached on disk by
+(strategy, strategy version, dictionary checksum), so after a strategy is changed only its games are
+played again. Any dictionary edit, even of one word, changes candidates and guesses of every game,
+so it invalidates cached games of all strategies and they are played from scratch.
+Strategies built on Solver include hash of its code in version, so solver changes invalidate them as well
+
+usage:
+    python tournament.py                                        # all built-in strategies
+    python tournament.py --strategies max_entropy minimax --workers 4
+    python tournament.py --strategies my_module:my_strategy --json results.json
+"""
+import json
+from argparse import ArgumentParser
+from collections import Counter
+from hashlib import sha1
+from inspect import getsource
+from multiprocessing import Pool, cpu_count
+from os import listdir, makedirs, remove
+from os.path import abspath, dirname, exists, join
+from random import Random
+from typing import Optional
+import numpy as np
+from Wordle import DBHandler, PatternMatrix, WordIndex, GameEngine, Solver
+from simulate import Strategy, load_strategy
+
+CACHE_SUBDIR: str = 'tournament'
+
+# solver lives in Wordle.py, so its strategies would be served from stale cache without this
+SOLVER_VERSION: str = sha1(getsource(Solver).encode('utf-8')).hexdigest()[:8]
+
+
+def fixed_opener_strategy(engine: GameEngine, candidates: np.ndarray, patterns: PatternMatrix, rnd: Random) -> str:
+    """Best opening move of solver, then first word (in dictionary order) consistent with all painted rows"""
+    if not engine.guesses:
+        return _worker['solver'].opener()
+    return patterns.words[candidates[0]]
+
+
+def max_entropy_strategy(engine: GameEngine, candidates: np.ndarray, patterns: PatternMatrix, rnd: Random) -> str:
+    """Word which gives the highest expected information, same as hints in game"""
+    if not engine.guesses:
+        return _worker['solver'].opener()
+    return _worker['solver'].best(candidates)
+
+
+def minimax_strategy(engine: GameEngine, candidates: np.ndarray, patterns: PatternMatrix, rnd: Random) -> str:
+    """Word which leaves the least candidates in the worst case"""
+    words = patterns.words
+    if len(candidates) <= 2:
+        return words[candidates[0]]
+
+    matrix = patterns.matrix
+    worst = np.concatenate([
+        largest_buckets(matrix[i:i + Solver.BLOCK], candidates) for i in range(0, len(words), Solver.BLOCK)
+    ]).astype(np.float64)
+
+    # among equal guesses the one which may be the answer is better
+    worst[candidates] -= 0.5
+    worst[~_worker['allowed']] = np.inf
+    return words[int(np.argmin(worst))]
+
+
+def frequency_strategy(engine: GameEngine, candidates: np.ndarray, patterns: PatternMatrix, rnd: Random) -> str:
+    """Candidate which letters are the most common among candidates, every letter is counted once per word"""
+    words = patterns.words
+    frequency = Counter(ltr for i in candidates for ltr in set(words[i]))
+    scores = [sum(frequency[ltr] for ltr in set(words[i])) for i in candidates]
+    return words[candidates[int(np.argmax(scores))]]
+
+
+# name: (version, strategy), version must be increased when strategy starts to play differently,
+# otherwise cached results of its previous version are shown
+STRATEGIES: dict[str, tuple[str, Strategy]] = {
+    'fixed_opener': (f'1.{SOLVER_VERSION}', fixed_opener_strategy),
+    'max_entropy': (f'1.{SOLVER_VERSION}', max_entropy_strategy),
+    'minimax': ('1', minimax_strategy),
+    'frequency': ('1', frequency_strategy),
+}
+
+
+def largest_buckets(rows: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+    """Get size of the most common pattern over candidates for each row (guess) of matrix"""
+    sub = np.asarray(rows[:, candidates], dtype=np.int64)
+    n = sub.shape[0]
+    amount = int(sub.max()) + 1
+
+    # counting patterns of all rows at once by giving each row its own range of values
+    sub += (np.arange(n) * amount)[:, None]
+    return np.bincount(sub.ravel(), minlength=n * amount).reshape(n, amount).max(axis=1)
+
+
+def get_strategy(name: str) -> tuple[str, Strategy]:
+    """Get (version, strategy) by name or by 'module:function' path, version of function is its VERSION attribute"""
+    if name in STRATEGIES:
+        return STRATEGIES[name]
+
+    strategy = load_strategy(name)
+    return str(getattr(strategy, 'VERSION', 1)), strategy
+
+
+def cache_path(cache_dir: str, name: str, version: str, checksum: str) -> str:
+    """Get path to JSONL file with cached games of strategy"""
+    return join(cache_dir, f"{name.replace(':', '.')}_v{version}_{checksum}.jsonl")
+
+
+def load_cache(cache_dir: str, name: str, version: str, checksum: str) -> dict[str, dict]:
+    """Get cached games of strategy and remove files of its other versions and dictionaries
+
+    return:
+        dict word: game result"""
+    path = cache_path(cache_dir, name, version, checksum)
+    prefix = f"{name.replace(':', '.')}_v"
+    if exists(cache_dir):
+        for item in listdir(cache_dir):
+            if item.startswith(prefix) and join(cache_dir, item) != path:
+                remove(join(cache_dir, item))
+
+    games, broken = {}, False
+    if exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                # last line may be cut if previous run was interrupted
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:
+                    broken = True
+                    continue
+                games[result['word']] = result
+
+    if broken:
+        # new results are appended, so cut line must not stay in the middle of file
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(result, ensure_ascii=False) + '\n' for result in games.values())
+
+    return games
+
+
+# per-process state, filled by _init_worker
+_worker: dict = {}
+
+
+def _init_worker(words: list[str], cache_dir: str, strategies: list[str]):
+    # matrix and opening move are already built by parent, so they are only loaded here
+    patterns = PatternMatrix(words, cache_dir)
+    engine = GameEngine(words, WordIndex(words), patterns)
+    _worker['patterns'] = patterns
+    _worker['engine'] = engine
+    _worker['solver'] = Solver(patterns, cache_dir, 1)
+    _worker['allowed'] = np.array([all(ltr in engine.alphabet for ltr in word) for word in words], dtype=bool)
+    _worker['start'] = np.array([patterns.index(word) for word in engine.answers], dtype=np.int64)
+    _worker['strategies'] = {name: get_strategy(name)[1] for name in strategies}
+    # strategies play the same way for the same painted rows, so every decision is made once per process
+    _worker['memo'] = {name: {} for name in strategies}
+
+
+def play(task: tuple[str, str]) -> dict:
+    """Play single game in worker process
+
+    params:
+        task - (strategy name, word to guess)
+
+    return:
+        dict with game result"""
+    name, word = task
+    engine: GameEngine = _worker['engine']
+    patterns: PatternMatrix = _worker['patterns']
+    strategy: Strategy = _worker['strategies'][name]
+    memo: dict[tuple, str] = _worker['memo'][name]
+
+    engine.new_game(word)
+    answer = patterns.index(word)
+    candidates = _worker['start']
+    history = ()  # (guess index, pattern) of painted rows
+    while not engine.finished:
+        guess = memo.get(history)
+        if guess is None:
+            guess = memo[history] = strategy(engine, candidates, patterns, Random(0))
+
+        if engine.play(guess) != GameEngine.ACCEPTED:
+            # strategy gave word which is not in dictionary, game can't go on
+            break
+
+        # leaving only words which would give the same pattern
+        g = patterns.index(guess)
+        pattern = patterns.matrix[g, answer]
+        candidates = candidates[patterns.matrix[g, candidates] == pattern]
+        history += ((g, int(pattern)),)
+
+    return {'strategy': name, 'word': word, 'won': engine.won, 'guesses': engine.guesses}
+
+
+def summarize(games: list[dict]) -> dict:
+    """Get average amount of guesses in won games, failure rate and the worst won game"""
+    won = [game for game in games if game['won']]
+    worst = max(won, key=lambda game: len(game['guesses']), default=None)
+    return {
+        'played': len(games),
+        'avg_guesses': round(sum(len(game['guesses']) for game in won) / len(won), 4) if won else None,
+        'failure_rate': round(1 - len(won) / len(games), 4) if games else None,
+        'failed': sorted(game['word'] for game in games if not game['won']),
+        'worst': len(worst['guesses']) if worst else None,
+        'worst_word': worst['word'] if worst else None,
+    }
+
+
+def tournament(words: list[str], cache_dir: str, strategies: list[str], workers: Optional[int] = None) -> dict:
+    """Play every answer with every strategy, games cached by previous runs are not played again
+
+    params:
+        words - dictionary
+
+        cache_dir - directory with patterns matrix and opening move, results are kept in its subdirectory
+
+        strategies - strategy names or 'module:function' paths
+
+        workers - amount of processes, all cores are used if not provided
+
+    return:
+        dict strategy name: summary (see summarize)"""
+    workers = workers or cpu_count()
+    # building matrix and opening move once here, workers only load them
+    patterns = PatternMatrix(words, cache_dir)
+    Solver(patterns, cache_dir, workers).opener()
+    answers = GameEngine(words, patterns=patterns).answers
+
+    results_dir = join(cache_dir, CACHE_SUBDIR)
+    makedirs(results_dir, exist_ok=True)
+    games, files = {}, {}
+    for name in strategies:
+        version, _ = get_strategy(name)
+        games[name] = load_cache(results_dir, name, version, patterns.dict_checksum)
+        files[name] = cache_path(results_dir, name, version, patterns.dict_checksum)
+
+    tasks = [(name, word) for name in strategies for word in answers if word not in games[name]]
+    if tasks:
+        handles = {name: open(files[name], 'a', encoding='utf-8') for name in strategies}
+        try:
+            with Pool(workers, _init_worker, (words, cache_dir, strategies)) as pool:
+                chunk = max(1, len(tasks) // (workers * 16))
+                for result in pool.imap_unordered(play, tasks, chunksize=chunk):
+                    games[result['strategy']][result['word']] = result
+                    handles[result['strategy']].write(json.dumps(result, ensure_ascii=False) + '\n')
+        finally:
+            for f in handles.values():
+                f.close()
+
+    return {name: summarize([games[name][word] for word in answers]) for name in strategies}
+
+
+def main():
+    parser = ArgumentParser(description='Compare guessing strategies on every answer of dictionary')
+    parser.add_argument('--strategies', nargs='*', default=list(STRATEGIES),
+                        help=f"some of {', '.join(STRATEGIES)} or module:function")
+    parser.add_argument('--workers', type=int, help='amount of processes, all cores by default')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--db', default='data.db')
+    args = parser.parse_args()
+
+    db_handler = DBHandler(args.db)
+    words = db_handler.get_words()
+    db_handler.close()
+
+    cache_dir = join(dirname(abspath(args.db)), 'cache')
+    results = tournament(words, cache_dir, args.strategies, args.workers)
+
+    def order(item: tuple[str, dict]) -> tuple:
+        # strategies which won nothing have no average, they go last
+        summary = item[1]
+        return (
+            summary['failure_rate'] is None, summary['failure_rate'] or 0,
+            summary['avg_guesses'] is None, summary['avg_guesses'] or 0,
+        )
+
+    print(f"{'strategy':<20}{'avg guesses':>12}{'failed':>10}{'worst':>8}")
+    for name, summary in sorted(results.items(), key=order):
+        avg = '-' if summary['avg_guesses'] is None else f"{summary['avg_guesses']:.4f}"
+        failed = '-' if summary['failure_rate'] is None else f"{summary['failure_rate']:.2%}"
+        worst = '-' if summary['worst'] is None else summary['worst']
+        print(f"{name:<20}{avg:>12}{failed:>10}{worst:>8}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=4, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()